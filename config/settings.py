@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 # Middleware
 # --------------------------------------------------
 MIDDLEWARE = [
+    # วัดเวลาแต่ละ request (Server-Timing) ต้องอยู่บนสุดเพื่อให้เวลารวมครอบคลุม Middleware ทุกตัว
+    "portfolios.instrumentation.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -67,9 +69,9 @@ if DEBUG:
     INSTALLED_APPS.append("django_browser_reload")
     MIDDLEWARE.append("django_browser_reload.middleware.BrowserReloadMiddleware")
 else:
-    # ถ้าขึ้น Production แนะนำให้ใช้ Whitenoise ช่วยเสิร์ฟไฟล์ Static (Optional)
-    # MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")
-    pass
+    # Production: เสิร์ฟไฟล์ Static (ชื่อมี hash + .br/.gz ที่บีบอัดไว้แล้ว) ต่อจาก SecurityMiddleware
+    # ไม่ต้องผ่าน Session / Auth (ดูการตั้งค่าใน section Static / Media)
+    MIDDLEWARE.insert(2, "portfolios.static_assets.StaticFilesMiddleware")
 
 
 # ==========================================
@@ -112,7 +114,8 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates ที่จับเวลา render ให้ PerformanceMiddleware
+        "BACKEND": "portfolios.instrumentation.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -129,6 +132,8 @@ TEMPLATES = [
 
 
 WSGI_APPLICATION = "config.wsgi.application"
+# ASGI (เช่น uvicorn config.asgi:application): หน้า Public / รูปย่อ / QR Code เป็น async view
+ASGI_APPLICATION = "config.asgi.application"
 
 
 # --------------------------------------------------
@@ -138,6 +143,16 @@ DATABASES = {
     "default": env.db(),
 }
 
+# Cache: ค่าเริ่มต้นเป็น Memory ของแต่ละ Process (Production ที่มีหลาย Process ควรใช้ Redis/Memcached
+# เช่น CACHE_URL=redis://127.0.0.1:6379/1 เพื่อให้ Cache และตัวนับ Hit/Miss ใช้ร่วมกัน
+# ถ้าเป็น locmem Page Cache ของหน้า Public จะปิดอยู่ เพราะการล้าง Cache จาก Process อื่น เช่น Worker ไม่ข้าม Process)
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+# อายุของหน้า Public Portfolio ใน Cache (วินาที) / ข้อมูลเปลี่ยนเมื่อไหร่ Cache จะถูกล้างทันทีอยู่แล้ว
+PAGE_CACHE_TIMEOUT = env.int("PAGE_CACHE_TIMEOUT", default=60 * 60)
+
 
 # --------------------------------------------------
 # 6 Password validation
@@ -166,9 +181,95 @@ STATIC_URL = "/static/"
 # จำเป็นสำหรับ Production (คำสั่ง collectstatic จะรวมไฟล์มาที่นี่)
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    # collectstatic: ตั้งชื่อไฟล์ตาม hash ของเนื้อหา (styles.3f2a9c1b.css) + เขียน .br / .gz ไว้ข้างกัน
+    "staticfiles": {
+        "BACKEND": "portfolios.static_assets.CompressedManifestStaticFilesStorage",
+    },
+}
+# ไฟล์ที่ชื่อมี hash เนื้อหาไม่มีวันเปลี่ยน ให้ browser / CDN cache ได้ 1 ปี (immutable)
+STATIC_IMMUTABLE_MAX_AGE = env.int("STATIC_IMMUTABLE_MAX_AGE", default=60 * 60 * 24 * 365)
+# ไฟล์ที่อ้างด้วยชื่อเดิม (ไม่มี hash) cache สั้นๆ แล้วถามกลับด้วย ETag
+STATIC_MAX_AGE = env.int("STATIC_MAX_AGE", default=60 * 5)
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# ไฟล์ MEDIA เสิร์ฟผ่าน View (เช็ค is_public ของเจ้าของ) ถ้ามี proxy อยู่ด้านหน้าให้ proxy ส่งไฟล์เอง:
+# "x-accel-redirect" (nginx: ต้องมี location แบบ internal ที่ MEDIA_ACCEL_REDIRECT_PREFIX ชี้ไปที่ MEDIA_ROOT)
+# "x-sendfile" (Apache mod_xsendfile / lighttpd) / เว้นว่าง = Django ส่งไฟล์เอง
+MEDIA_SENDFILE = env("MEDIA_SENDFILE", default="")
+MEDIA_ACCEL_REDIRECT_PREFIX = env("MEDIA_ACCEL_REDIRECT_PREFIX", default="/protected-media/")
+# เวลาที่ browser / CDN cache ไฟล์ของเจ้าของที่เปิด Public (ถ้าเจ้าของปิด Public ไฟล์จะหายจาก cache ภายในเวลานี้)
+MEDIA_MAX_AGE = env.int("MEDIA_MAX_AGE", default=60 * 60)
+# manage.py gc_media ไม่แตะไฟล์ที่ใหม่กว่านี้ (วินาที) แม้ยังไม่มีแถวอ้างถึง
+# (ไฟล์ที่เพิ่งอัปโหลด / เพิ่งบีบอัดจะถูกเขียนลง Storage ก่อนบันทึกแถวใน DB)
+MEDIA_GC_GRACE_SECONDS = env.int("MEDIA_GC_GRACE_SECONDS", default=60 * 60 * 24)
+
+
+# --------------------------------------------------
+# Background Worker (manage.py runworker)
+# --------------------------------------------------
+# จำนวน Process ที่ใช้ทำงานหนัก (สร้าง PDF, บีบอัดรูป) พร้อมกัน
+WORKER_PROCESSES = env.int("WORKER_PROCESSES", default=2)
+
+# จำนวน Thread ที่ async view ใช้ทำงานหนักระหว่าง request (ย่อรูป / สร้าง QR Code) ต่อ 1 Process
+# งานที่เกินจะรอคิว ไม่แย่ง Thread ที่ view แบบ sync / ORM ใช้ (ดู portfolios/executors.py)
+BLOCKING_EXECUTOR_WORKERS = env.int("BLOCKING_EXECUTOR_WORKERS", default=2)
+
+# รูปที่อัปโหลดจะถูกบีบอัดโดย Worker (ตั้งเป็น off ถ้าไม่ได้เปิด Worker จะบีบอัดหลังบันทึกเลย)
+PROCESS_IMAGES_IN_BACKGROUND = env.bool("PROCESS_IMAGES_IN_BACKGROUND", default=True)
+
+# host ภายนอกที่ WeasyPrint โหลดได้ตอนสร้าง PDF (รูปใน MEDIA/STATIC อ่านจาก Storage โดยตรงเสมอ)
+# ค่าเริ่มต้นอนุญาตเฉพาะ Google Fonts ที่ใช้ใน pdf_template.html
+PDF_FETCH_ALLOWED_HOSTS = env.list(
+    "PDF_FETCH_ALLOWED_HOSTS", default=["fonts.googleapis.com", "fonts.gstatic.com"]
+)
+
+
+# --------------------------------------------------
+# Image Ingestion (บีบอัดรูปที่อัปโหลด)
+# --------------------------------------------------
+# จำนวน pixel สูงสุดของรูปต้นฉบับ (กว้าง x สูง) ที่ยอมรับ กันรูปใหญ่ผิดปกติ / Decompression Bomb
+IMAGE_MAX_PIXELS = env.int("IMAGE_MAX_PIXELS", default=60_000_000)
+# หน่วยความจำสูงสุด (bytes) ที่ยอมให้ใช้ถอดรหัสรูป 1 รูป (หลังย่อขนาดตอน decode แล้ว)
+IMAGE_MAX_DECODE_BYTES = env.int("IMAGE_MAX_DECODE_BYTES", default=256 * 1024 * 1024)
+# อัปโหลดรูปทีละ chunk (/portfolio/uploads/): ขนาดไฟล์สูงสุด (bytes) และเวลาที่เก็บไว้หลังแก้ไขล่าสุด (วินาที)
+# ไฟล์ที่หมดอายุ (ส่งไม่ครบ / ไม่ได้ใช้ในฟอร์ม) ถูกลบโดย manage.py gc_media
+CHUNKED_UPLOAD_MAX_SIZE = env.int("CHUNKED_UPLOAD_MAX_SIZE", default=50 * 1024 * 1024)
+CHUNKED_UPLOAD_EXPIRY_SECONDS = env.int("CHUNKED_UPLOAD_EXPIRY_SECONDS", default=60 * 60 * 24)
+
+
+# --------------------------------------------------
+# Performance Instrumentation (PerformanceMiddleware)
+# --------------------------------------------------
+# request ที่ใช้เวลานานกว่านี้ (ms) จะ log SQL ทั้งหมดของ request นั้นออกมา (0 = ปิด)
+PERF_SLOW_REQUEST_MS = env.int("PERF_SLOW_REQUEST_MS", default=0)
+# จำนวนตัวอย่างล่าสุดที่เก็บต่อชื่อ URL สำหรับคำนวณ percentile
+PERF_SAMPLES_PER_URL = env.int("PERF_SAMPLES_PER_URL", default=500)
+# แต่ละ Process เก็บตัวอย่างไว้ใน Memory แล้วส่งขึ้น Cache ทุกกี่วินาที / ตัวอย่างของ Process ที่หยุดส่งหมดอายุเมื่อไหร่
+PERF_FLUSH_SECONDS = env.int("PERF_FLUSH_SECONDS", default=10)
+PERF_SAMPLES_TIMEOUT = env.int("PERF_SAMPLES_TIMEOUT", default=60 * 60)
+
+# log ของแต่ละ request (JSON) ออกที่ console / ตั้ง PERF_LOG_LEVEL=WARNING ให้เหลือแค่ slow request
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "portfolios.performance": {
+            "handlers": ["console"],
+            "level": env("PERF_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 
 # --------------------------------------------------
 # Custom User
@@ -182,13 +283,16 @@ AUTH_USER_MODEL = "users.User"
 LOGIN_REDIRECT_URL = "dashboard"
 LOGOUT_REDIRECT_URL = "home"
 
+# ใช้ Backend ของ Django / allauth ที่โหลด Profile มาพร้อม User ในทุก request (users/backends.py)
 AUTHENTICATION_BACKENDS = (
-    "django.contrib.auth.backends.ModelBackend",
-    "allauth.account.auth_backends.AuthenticationBackend",
+    "users.backends.ProfileModelBackend",
+    "users.backends.ProfileAuthenticationBackend",
 )
 
 
 SITE_ID = 1
+# ใช้คู่กับโดเมนใน Sites framework เพื่อสร้างลิงก์เต็ม (เช่น QR Code ใน PDF) ในที่ที่ไม่มี request
+SITE_URL_SCHEME = env("SITE_URL_SCHEME", default="https")
 TAILWIND_APP_NAME = "theme"
 
 
@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from portfolios.views import ( home, dashboard, edit_profile, create_portfolio,
                               portfolio_view, edit_portfolio, delete_portfolio,
-                              portfolio_detail, download_portfolio_pdf )
+                              portfolio_detail, download_portfolio_pdf,
+                              pdf_export_status, pdf_export_download,
+                              portfolio_qr_code, image_derivative, portfolio_image_status,
+                              portfolio_category_items, page_cache_stats_view,
+                              performance_stats_view, search, serve_media,
+                              export_portfolio_archive, image_uploads, image_upload )
 
 
 
@@ -20,11 +24,26 @@ urlpatterns = [
     path('', home, name='home'),
     path('dashboard/', dashboard, name='dashboard'),
     path('dashboard/download-pdf/', download_portfolio_pdf, name='download_portfolio_pdf'),
+    path('dashboard/export.zip', export_portfolio_archive, name='export_portfolio_archive'),
+    path('dashboard/pdf-exports/<int:pk>/status/', pdf_export_status, name='pdf_export_status'),
+    path('dashboard/pdf-exports/<int:pk>/download/', pdf_export_download, name='pdf_export_download'),
+    path('dashboard/page-cache/stats/', page_cache_stats_view, name='page_cache_stats'),
+    path('dashboard/performance/', performance_stats_view, name='performance_stats'),
     path('profile/edit/', edit_profile, name='edit_profile'),
+    path('search/', search, name='search'),
+    path('img/<int:width>/<str:fmt>/<path:path>', image_derivative, name='image_derivative'),
+    # ไฟล์ที่ผู้ใช้อัปโหลด (ทั้ง Dev และ Production: เช็ค is_public + รองรับ 304 / Range)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", serve_media, name='media'),
     path('portfolio/create/', create_portfolio, name='create_portfolio'),
     path('portfolio/edit/<int:pk>/', edit_portfolio, name='edit_portfolio'),
     path('portfolio/delete/<int:pk>/', delete_portfolio, name='delete_portfolio'),
+    path('portfolio/<int:pk>/images/status/', portfolio_image_status, name='portfolio_image_status'),
+    # อัปโหลดรูปทีละ chunk (tus) ต่อจากจุดที่เน็ตหลุดได้ แล้วส่งฟอร์มด้วย token
+    path('portfolio/uploads/', image_uploads, name='image_uploads'),
+    path('portfolio/uploads/<str:token>/', image_upload, name='image_upload'),
     path('<str:username>/item/<int:pk>/', portfolio_detail, name='portfolio_detail'),
+    path('<str:username>/items/', portfolio_category_items, name='portfolio_category_items'),
+    path('<str:username>/qr.png', portfolio_qr_code, name='portfolio_qr_code'),
 
 
 
@@ -32,7 +51,3 @@ urlpatterns = [
     # --- วางไว้ล่างสุดเสมอ ---
     path('<str:username>/', portfolio_view, name='public_portfolio'),
 ]
-
-# สำหรับแสดงรูปภาพในโหมด Debug (Dev mode)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, PortfolioItem
+from .models import Category, ImageUpload, MediaGcRun, PortfolioImportRun, PortfolioItem, PdfExportJob, StoredImage
+from .search import search_items
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -10,4 +11,41 @@ class CategoryAdmin(admin.ModelAdmin):
 class PortfolioItemAdmin(admin.ModelAdmin):
     list_display = ('title', 'owner', 'category', 'event_date', 'created_at')
     list_filter = ('category', 'event_date') # ตัวกรองด้านขวา
-    search_fields = ('title', 'description', 'owner__email') # ช่องค้นหา
\ No newline at end of file
+    search_fields = ('title', 'description', 'owner__email') # ช่องค้นหา
+
+    def get_search_results(self, request, queryset, search_term):
+        # ค้นด้วยอีเมลเจ้าของใช้วิธีเดิม / ข้อความอื่นใช้ Full-text Search (มี index ไม่ต้อง LIKE ทั้งตาราง)
+        if not search_term.strip() or '@' in search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return search_items(queryset, search_term), False
+
+@admin.register(PdfExportJob)
+class PdfExportJobAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'status', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+@admin.register(PortfolioImportRun)
+class PortfolioImportRunAdmin(admin.ModelAdmin):
+    list_display = ('archive_name', 'status', 'lines_done', 'items_created', 'images_created', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('archive_sha256', 'started_at', 'updated_at', 'finished_at')
+
+@admin.register(StoredImage)
+class StoredImageAdmin(admin.ModelAdmin):
+    list_display = ('file', 'size', 'refcount', 'created_at')
+    list_filter = ('refcount',)
+    search_fields = ('content_hash', 'source_hash')
+    readonly_fields = ('content_hash', 'source_hash', 'file', 'size', 'refcount', 'created_at')
+
+@admin.register(MediaGcRun)
+class MediaGcRunAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'status', 'dry_run', 'files_scanned', 'orphans', 'bytes_reclaimed', 'started_at', 'finished_at')
+    list_filter = ('status', 'dry_run')
+    readonly_fields = ('last_name', 'started_at', 'updated_at', 'finished_at')
+
+@admin.register(ImageUpload)
+class ImageUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'owner', 'upload_offset', 'upload_length', 'file_status', 'updated_at')
+    list_filter = ('file_status',)
+    readonly_fields = ('token', 'sha256', 'created_at', 'updated_at')
@@ -3,3 +3,18 @@ from django.apps import AppConfig
 
 class PortfoliosConfig(AppConfig):
     name = 'portfolios'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import checks  # noqa: F401 (ตรวจโดเมนของเว็บตอน check --deploy)
+        from . import signals  # noqa: F401 (ลงทะเบียน signal ล้าง Page Cache)
+        from .instrumentation import install_sql_timer
+        from .search import ensure_search_index
+
+        # จับเวลา SQL ของทุก connection ให้ PerformanceMiddleware
+        connection_created.connect(install_sql_timer, dispatch_uid='portfolios_sql_timer')
+
+        # SQLite: สร้าง trigger ของ Full-text Search คืนหลัง migration ที่สร้างตารางผลงานใหม่
+        post_migrate.connect(ensure_search_index, sender=self, dispatch_uid='portfolios_search_index')
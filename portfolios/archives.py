@@ -0,0 +1,411 @@
+import hashlib
+import io
+import json
+import logging
+import zipfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import page_cache
+from .image_store import find_by_source_hash, store_image
+from .models import (Category, ImageStatus, PortfolioImage, PortfolioImportRun, PortfolioItem, StoredImage,
+                     compress_image)
+from .stats import rebuild_stats
+
+logger = logging.getLogger(__name__)
+
+# ไฟล์ ZIP ทั้งขาเข้า (import) และขาออก (export) ใช้รูปแบบเดียวกัน:
+#   manifest.jsonl  ผลงาน 1 ชิ้นต่อบรรทัด
+#   media/...       ไฟล์รูป (path ใน manifest อ้างจาก root ของ ZIP)
+# ตัวอย่างบรรทัดของ manifest:
+#   {"username": "somchai", "title": "...", "description": "...", "category": "web",
+#    "event_date": "2024-03-01", "video_link": null,
+#    "cover_image": "media/portfolio_covers/a.jpg", "images": ["media/portfolio_gallery/b.jpg"]}
+MANIFEST_NAME = 'manifest.jsonl'
+PROFILE_NAME = 'profile.json'
+MEDIA_PREFIX = 'media/'
+
+# จำนวนบรรทัดของ manifest ที่บันทึกลง DB ต่อ 1 transaction (= ระยะห่างของ checkpoint)
+IMPORT_BATCH_SIZE = 100
+
+# ขนาดที่อ่าน/เขียนไฟล์รูปแต่ละรอบตอน export
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+# ==========================================
+# 1. Import: ZIP + manifest.jsonl -> PortfolioItem / PortfolioImage (bulk_create ทีละ batch)
+# ==========================================
+
+class ImportLineError(ValueError):
+    """บรรทัดของ manifest ที่ import ไม่ได้ (ข้ามไปและบันทึกไว้ใน PortfolioImportRun.errors)"""
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def compress_archive_image(data, name):
+    """(รันใน Process ลูก) บีบอัดรูปจาก ZIP แบบเดียวกับรูปที่อัปโหลดผ่านเว็บ คืนค่าเป็น bytes ของ JPEG"""
+    return compress_image(ContentFile(data, name=name)).read()
+
+
+def compress_in_parallel(pool, jobs, max_in_flight):
+    """
+    jobs: generator ของ (key, ชื่อไฟล์, bytes) อ่านจาก ZIP ตอนจะส่งเข้า pool เท่านั้น
+    yield (key, bytes ที่บีบอัดแล้ว หรือ Exception) ตามลำดับที่เสร็จ
+    มีรูปดิบค้างอยู่ใน memory ไม่เกิน max_in_flight รูป / pool=None ทำทีละรูปใน Process นี้
+    """
+    if pool is None:
+        for key, name, data in jobs:
+            try:
+                yield key, compress_archive_image(data, name)
+            except Exception as e:
+                yield key, e
+        return
+
+    def result_of(future):
+        try:
+            return future.result()
+        except Exception as e:
+            return e
+
+    pending = {}
+    for key, name, data in jobs:
+        if len(pending) >= max_in_flight:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), result_of(future)
+        pending[pool.submit(compress_archive_image, data, name)] = key
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), result_of(future)
+
+
+class PortfolioImporter:
+    """
+    import ไฟล์ ZIP หนึ่งไฟล์ อ่าน manifest ทีละบรรทัด (ไม่แตกไฟล์ทั้ง ZIP) บีบอัดรูปใน Process Pool
+    แล้วบันทึกทีละ batch พร้อมเลื่อน checkpoint (PortfolioImportRun.lines_done) ใน transaction เดียวกัน
+    ไฟล์รูปตั้งชื่อตาม hash ของเนื้อหา (images/) ถ้าพังหลังเขียนไฟล์แต่ก่อน commit รอบถัดไปจะใช้ไฟล์เดิม ไม่มีไฟล์ซ้ำสะสม
+    """
+
+    def __init__(self, path, pool=None, workers=1, batch_size=IMPORT_BATCH_SIZE, create_users=False, log=None):
+        self.path = path
+        self.pool = pool
+        # ส่งรูปเข้า pool ล่วงหน้าได้ 2 รูปต่อ Process (Process ไม่ต้องรอ แต่ไม่อ่านรูปดิบทั้ง batch มากองใน memory)
+        self.max_in_flight = 2 * max(workers, 1)
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self.log = log or logger.info
+
+        self.user_ids = {}
+        self.category_ids = dict(Category.objects.values_list('slug', 'pk'))
+
+    def get_run(self):
+        """หา run เดิมของไฟล์นี้ (ทำต่อจาก checkpoint) หรือเริ่มใหม่"""
+        run, created = PortfolioImportRun.objects.get_or_create(
+            archive_sha256=file_sha256(self.path),
+            defaults={'archive_name': str(self.path)[-255:]},
+        )
+        if not created and run.status == PortfolioImportRun.Status.FAILED:
+            run.status = PortfolioImportRun.Status.RUNNING
+            run.save(update_fields=['status', 'updated_at'])
+        return run
+
+    def run(self):
+        run = self.get_run()
+        if run.status == PortfolioImportRun.Status.DONE:
+            self.log(f"ไฟล์นี้ import เสร็จไปแล้ว ({run.items_created} ผลงาน)")
+            return run
+        if run.lines_done:
+            self.log(f"ทำต่อจาก checkpoint: บรรทัดที่ {run.lines_done + 1}")
+
+        try:
+            with zipfile.ZipFile(self.path) as archive:
+                self.members = set(archive.namelist())
+                if MANIFEST_NAME not in self.members:
+                    raise ValueError(f"ไม่พบ {MANIFEST_NAME} ใน ZIP")
+
+                batch = []
+                for line_no, entry in self.read_manifest(archive):
+                    if line_no <= run.lines_done:
+                        continue
+                    batch.append((line_no, entry))
+                    if len(batch) >= self.batch_size:
+                        self.import_batch(run, archive, batch)
+                        batch = []
+                if batch:
+                    self.import_batch(run, archive, batch)
+        except Exception:
+            PortfolioImportRun.objects.filter(pk=run.pk).update(status=PortfolioImportRun.Status.FAILED)
+            raise
+
+        run.status = PortfolioImportRun.Status.DONE
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'finished_at', 'updated_at'])
+        return run
+
+    def read_manifest(self, archive):
+        """yield (เลขบรรทัด, dict หรือ ImportLineError) อ่านทีละบรรทัดจาก ZIP"""
+        with archive.open(MANIFEST_NAME) as raw:
+            for line_no, line in enumerate(io.TextIOWrapper(raw, encoding='utf-8-sig'), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    yield line_no, ImportLineError(f"JSON ไม่ถูกต้อง: {e}")
+                    continue
+                yield line_no, entry if isinstance(entry, dict) else ImportLineError("แต่ละบรรทัดต้องเป็น JSON object")
+
+    # ------------------------------------------
+    # ตรวจข้อมูล 1 บรรทัด
+    # ------------------------------------------
+
+    def load_users(self, entries):
+        User = get_user_model()
+        usernames = {e.get('username') for e in entries if isinstance(e, dict) and e.get('username')}
+        missing = usernames - self.user_ids.keys()
+        self.user_ids.update(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+
+        if self.create_users:
+            for entry in entries:
+                username = isinstance(entry, dict) and entry.get('username')
+                if not username or username in self.user_ids or not entry.get('email'):
+                    continue
+                # ยังไม่มีรหัสผ่าน: ให้นักเรียนตั้งเองผ่าน "ลืมรหัสผ่าน" (login ด้วยอีเมล)
+                try:
+                    with transaction.atomic():
+                        user = User.objects.create_user(username=username, email=entry['email'])
+                except IntegrityError:
+                    continue  # อีเมลนี้เป็นของผู้ใช้คนอื่น -> บรรทัดนี้จะถูกข้ามเพราะไม่พบผู้ใช้
+                self.user_ids[username] = user.pk
+
+    def image_members(self, entry):
+        cover = entry.get('cover_image')
+        if not cover:
+            raise ImportLineError("ต้องมี cover_image")
+        images = entry.get('images') or []
+        if not isinstance(images, list):
+            raise ImportLineError("images ต้องเป็น list")
+        members = [cover, *images]
+        for member in members:
+            if member not in self.members:
+                raise ImportLineError(f"ไม่พบไฟล์ {member} ใน ZIP")
+        return members
+
+    def build_item(self, entry):
+        if isinstance(entry, ImportLineError):
+            raise entry
+        owner_id = self.user_ids.get(entry.get('username'))
+        if owner_id is None:
+            raise ImportLineError(f"ไม่พบผู้ใช้ {entry.get('username')!r}")
+
+        category_id = None
+        if entry.get('category'):
+            category_id = self.category_ids.get(entry['category'])
+            if category_id is None:
+                raise ImportLineError(f"ไม่พบหมวดหมู่ {entry['category']!r}")
+
+        item = PortfolioItem(
+            owner_id=owner_id,
+            title=entry.get('title') or '',
+            description=entry.get('description') or '',
+            category_id=category_id,
+            event_date=entry.get('event_date') or None,
+            video_link=entry.get('video_link') or None,
+            cover_image_status=ImageStatus.READY,  # บีบอัดตอน import แล้ว
+        )
+        item.update_video_fields()  # bulk_create ไม่ผ่าน save()
+        try:
+            item.full_clean(exclude=['owner', 'category', 'cover_image'])
+        except ValidationError as e:
+            raise ImportLineError('; '.join(f"{field}: {' '.join(msgs)}" for field, msgs in e.message_dict.items()))
+        return item
+
+    # ------------------------------------------
+    # บันทึก 1 batch
+    # ------------------------------------------
+
+    def import_batch(self, run, archive, batch):
+        self.load_users([entry for _, entry in batch])
+
+        records = {}  # line_no -> (item, [member ของรูปปก, รูป Gallery...])
+        errors = {}
+        for line_no, entry in batch:
+            try:
+                item = self.build_item(entry)
+                records[line_no] = (item, self.image_members(entry))
+            except ImportLineError as e:
+                errors[line_no] = str(e)
+
+        stored = {}  # (line_no, index) -> StoredImage
+        source_hashes = {}
+
+        def jobs():
+            for line_no, (_, members) in records.items():
+                for index, member in enumerate(members):
+                    data = archive.read(member)
+                    source_hash = hashlib.sha256(data).hexdigest()
+                    # รูปต้นฉบับเดิมที่เคยประมวลผลแล้ว (เช่นรูปหมู่ที่ทุกคนในรุ่นใส่มา) ไม่ต้องส่งไปบีบอัดอีก
+                    existing = find_by_source_hash(source_hash)
+                    if existing is not None:
+                        stored[line_no, index] = existing
+                        continue
+                    source_hashes[line_no, index] = source_hash
+                    yield (line_no, index), member.rsplit('/', 1)[-1], data
+
+        for (line_no, index), result in compress_in_parallel(self.pool, jobs(), self.max_in_flight):
+            if isinstance(result, Exception):
+                errors.setdefault(line_no, f"{records[line_no][1][index]}: {result}")
+            else:
+                stored[line_no, index] = store_image(result, 'jpg', source_hashes[line_no, index])
+
+        items, gallery = [], []
+        for line_no, (item, members) in records.items():
+            if line_no in errors:
+                continue
+            item.cover_image.name = stored[line_no, 0].file.name
+            items.append(item)
+            gallery.extend((item, stored[line_no, index].file.name) for index in range(1, len(members)))
+
+        with transaction.atomic():
+            PortfolioItem.objects.bulk_create(items)
+            PortfolioImage.objects.bulk_create([
+                PortfolioImage(portfolio_item=item, image=name, image_status=ImageStatus.READY)
+                for item, name in gallery
+            ])
+            # bulk_create ไม่ผ่าน signal: นับการอ้างถึงไฟล์เอง (commit พร้อม checkpoint)
+            references = Counter([item.cover_image.name for item in items] + [name for _, name in gallery])
+            for name, count in references.items():
+                StoredImage.retain(name, count)
+            run.lines_done = batch[-1][0]
+            run.items_created += len(items)
+            run.images_created += len(gallery)
+            run.errors += [{'line': line_no, 'error': error} for line_no, error in sorted(errors.items())]
+            run.save()
+
+        # bulk_create ไม่ผ่าน signal: คำนวณสถิติ + ล้าง cache หน้าของเจ้าของเอง
+        for owner_id in {item.owner_id for item in items}:
+            rebuild_stats(owner_id)
+            page_cache.invalidate_user(owner_id)
+
+        self.log(f"บรรทัด {batch[0][0]}-{batch[-1][0]}: เพิ่ม {len(items)} ผลงาน {len(gallery)} รูป ข้าม {len(errors)} บรรทัด")
+
+# ==========================================
+# 2. Export: ZIP ของผลงานทั้งหมดของ user แบบ stream (ไม่สร้างทั้งไฟล์ใน memory / บน disk)
+# ==========================================
+
+class ZipStream:
+    """
+    ปลายทางของ zipfile ที่ไม่ต้อง seek (zipfile จะเขียน data descriptor ต่อท้ายแต่ละไฟล์แทน)
+    เก็บ bytes ที่เขียนแล้วไว้ชั่วคราว ให้ generator ดึงออกไปส่งทีละก้อน
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def write_media(archive, stream, name):
+    """
+    คัดลอกไฟล์จาก Storage ลง ZIP ทีละ chunk (yield ส่วนที่เขียนแล้วออกไประหว่างทาง)
+    รูปบีบอัดมาแล้ว เก็บแบบไม่บีบซ้ำ (ZIP_STORED)
+    """
+    try:
+        source = default_storage.open(name, 'rb')
+    except OSError:
+        logger.warning("Export: ไม่พบไฟล์ %s", name)
+        return False
+
+    with source:
+        info = zipfile.ZipInfo(MEDIA_PREFIX + name, date_time=timezone.localtime().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        info.file_size = source.size
+        with archive.open(info, 'w') as target:
+            for chunk in source.chunks(EXPORT_CHUNK_SIZE):
+                target.write(chunk)
+                yield stream.take()
+    yield stream.take()
+    return True
+
+
+def export_entry(item, cover, images):
+    return {
+        'username': item.owner.username,
+        'title': item.title,
+        'description': item.description,
+        'category': item.category.slug if item.category else None,
+        'event_date': item.event_date.isoformat() if item.event_date else None,
+        'video_link': item.video_link,
+        'cover_image': cover,
+        'images': images,
+    }
+
+
+def stream_portfolio_archive(user):
+    """generator ของ bytes ไฟล์ ZIP: profile.json + manifest.jsonl (import กลับได้) + รูปต้นฉบับทั้งหมด"""
+    return (chunk for chunk in portfolio_archive_chunks(user) if chunk)
+
+
+def portfolio_archive_chunks(user):
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        profile = user.profile
+        archive.writestr(PROFILE_NAME, json.dumps({
+            'username': user.username,
+            'bio': profile.bio,
+            'facebook_link': profile.facebook_link,
+            'github_link': profile.github_link,
+            'is_public': profile.is_public,
+        }, ensure_ascii=False, indent=2))
+        yield stream.take()
+
+        # zipfile เขียนได้ทีละไฟล์: เขียนรูปก่อน เก็บบรรทัดของ manifest (ข้อความสั้นๆ) ไว้เขียนตอนท้าย
+        manifest = []
+        written = set()  # รูปเดียวกันใช้ร่วมหลายผลงานได้ (content-addressed) เขียนลง ZIP ครั้งเดียว
+
+        def media(name):
+            if name not in written:
+                if not (yield from write_media(archive, stream, name)):
+                    return None
+                written.add(name)
+            return MEDIA_PREFIX + name
+
+        items = (
+            PortfolioItem.objects.filter(owner=user)
+            .select_related('owner', 'category')
+            .prefetch_related('images')
+        )
+        for item in items.iterator(chunk_size=100):
+            cover = None
+            if item.cover_image:
+                cover = yield from media(item.cover_image.name)
+            images = []
+            for image in item.images.all():
+                path = yield from media(image.image.name)
+                if path:
+                    images.append(path)
+            manifest.append(json.dumps(export_entry(item, cover, images), ensure_ascii=False))
+
+        archive.writestr(MANIFEST_NAME, ''.join(f"{line}\n" for line in manifest))
+    yield stream.take()
@@ -0,0 +1,530 @@
+import asyncio
+import datetime
+import django
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, override_settings, setup_databases,
+                               setup_test_environment, teardown_databases, teardown_test_environment)
+from django.urls import reverse
+from weasyprint import default_url_fetcher
+
+from .jobs import process_pdf_job
+from .models import Category, PdfExportJob, PortfolioImage, PortfolioItem, compress_image
+from .pdf import LocalUrlFetcher, render_portfolio_pdf
+from .search import public_items, search_items
+
+
+# ==========================================
+# ฟังก์ชันวัดประสิทธิภาพ (เรียกผ่าน management command)
+# ==========================================
+
+def summarize(timings):
+    """สรุปผลเวลาที่วัดได้ (วินาที) เป็น ms"""
+    return {
+        'runs': len(timings),
+        'min_ms': round(min(timings) * 1000, 1),
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'max_ms': round(max(timings) * 1000, 1),
+    }
+
+
+def time_calls(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_pdf_fetchers(user, base_url, repeat=3):
+    """
+    เปรียบเทียบเวลา render PDF ของ user
+    - http: แบบเดิม WeasyPrint ยิง HTTP กลับไปที่ base_url เพื่อโหลดทุกรูป (ต้องเปิด Server ไว้)
+    - local: LocalUrlFetcher อ่านรูปจาก Storage โดยตรง
+    """
+    results = {}
+    results['http'] = summarize(time_calls(
+        lambda: render_portfolio_pdf(user, base_url=base_url, url_fetcher=default_url_fetcher), repeat))
+    results['local'] = summarize(time_calls(
+        lambda: render_portfolio_pdf(user, base_url=base_url, url_fetcher=LocalUrlFetcher(base_url)), repeat))
+    return results
+
+
+# ==========================================
+# บีบอัดรูป: หน่วยความจำสูงสุด (Peak RSS) และ Throughput
+# ==========================================
+
+def legacy_compress_image(uploaded_image, max_size=(1200, 1200)):
+    """วิธีเดิม: ถอดรหัสรูปเต็มขนาด แปลงสี แล้วค่อยย่อ (เก็บไว้เทียบผลกับ compress_image)"""
+    img = Image.open(uploaded_image)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail(max_size, Image.LANCZOS)
+    output_io = BytesIO()
+    img.save(output_io, format='JPEG', quality=85, optimize=True)
+    return output_io
+
+
+COMPRESSORS = {
+    'legacy': legacy_compress_image,
+    'bounded': compress_image,
+}
+
+
+def make_sample_jpeg(path, megapixels):
+    """สร้างรูป JPEG ตัวอย่างขนาดประมาณ megapixels ล้าน pixel (สัดส่วน 4:3 แบบกล้องมือถือ)"""
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    # ใส่ noise ให้ขนาดไฟล์ใกล้เคียงรูปถ่ายจริง (รูปสีพื้นบีบอัดได้เล็กผิดปกติ)
+    bands = [Image.effect_noise((width, height), 24) for _ in range(3)]
+    Image.merge('RGB', bands).save(path, format='JPEG', quality=90)
+    return width, height
+
+
+def peak_rss_mb():
+    # Linux: ใช้ VmHWM ของ Process นี้ (ru_maxrss จะติดค่าสูงสุดของ Process แม่มาด้วยหลัง fork/exec)
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux รายงานเป็น KB ส่วน macOS รายงานเป็น bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def measure_compress(mode, path, repeat):
+    """รันใน Process แยก เพื่อให้ Peak RSS เป็นของวิธีบีบอัดนั้นๆ อย่างเดียว"""
+    compress = COMPRESSORS[mode]
+    baseline = peak_rss_mb()
+
+    timings = []
+    for _ in range(repeat):
+        with open(path, 'rb') as f:
+            upload = File(f, name=os.path.basename(path))
+            start = time.perf_counter()
+            compress(upload)
+            timings.append(time.perf_counter() - start)
+
+    peak = peak_rss_mb()
+    return {
+        **summarize(timings),
+        'images_per_sec': round(len(timings) / sum(timings), 2),
+        'peak_rss_mb': peak,
+        'rss_growth_mb': round(peak - baseline, 1),
+    }
+
+
+def bench_compress_image(megapixels=(12, 48), repeat=3, modes=tuple(COMPRESSORS)):
+    """
+    เปรียบเทียบการบีบอัดรูป JPEG ขนาดใหญ่ระหว่างวิธีเดิม (legacy) กับแบบย่อตั้งแต่ decode (bounded)
+    แต่ละวิธี/ขนาดรันใน Process ใหม่ คืนค่าเป็น dict {megapixels: {mode: stats}}
+    """
+    mp_context = multiprocessing.get_context('spawn')
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mp in megapixels:
+            path = os.path.join(tmpdir, f"sample_{mp}mp.jpg")
+            width, height = make_sample_jpeg(path, mp)
+            results[mp] = {'size': f"{width}x{height}", 'file_mb': round(os.path.getsize(path) / 1024 / 1024, 1)}
+
+            for mode in modes:
+                with ProcessPoolExecutor(max_workers=1, mp_context=mp_context,
+                                         initializer=django.setup) as pool:
+                    results[mp][mode] = pool.submit(measure_compress, mode, path, repeat).result()
+
+    return results
+
+
+# ==========================================
+# Benchmark Suite (manage.py benchmark): ข้อมูลจำลอง + วัด View + เทียบกับ Baseline
+# ==========================================
+
+def save_sample_image(name, size, seed):
+    """บันทึกรูป JPEG ตัวอย่างลง Storage (สีต่างกันตาม seed) คืนค่าชื่อไฟล์ใน Storage"""
+    noise = Image.effect_noise(size, 32)
+    tint = Image.new('RGB', size, ((seed * 70) % 256, (seed * 140) % 256, (seed * 210) % 256))
+    img = Image.blend(Image.merge('RGB', [noise] * 3), tint, 0.5)
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=85)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def seed_dataset(users=5, items=20, images=4, categories=5, image_size=(1600, 1200)):
+    """
+    สร้างข้อมูลจำลอง: users คน (Profile สร้างโดย signal), คนละ items ผลงาน กระจายใน categories หมวด
+    และรูป Gallery 0..images รูปต่อผลงาน (ใช้ไฟล์รูปตัวอย่างชุดเดียวกันซ้ำ เพื่อให้ seed เร็ว)
+    คืนค่าเป็น list ของ User
+    """
+    User = get_user_model()
+    category_list = Category.objects.bulk_create([
+        Category(name=f"Category {i}", slug=f"bench-category-{i}") for i in range(categories)
+    ]) or [None]
+
+    covers = [save_sample_image(f"portfolio_covers/bench_{i}.jpg", image_size, i) for i in range(4)]
+    gallery = [save_sample_image(f"portfolio_gallery/bench_{i}.jpg", image_size, i + 4) for i in range(4)]
+
+    owners = []
+    start = datetime.date(2020, 1, 1)
+    for u in range(users):
+        owner = User.objects.create_user(
+            username=f"bench{u}", email=f"bench{u}@example.com", password="bench",
+            first_name="Bench", last_name=f"User {u}",
+        )
+        owner.profile.bio = "Benchmark user " * 10
+        owner.profile.save()
+
+        created = PortfolioItem.objects.bulk_create([
+            PortfolioItem(
+                owner=owner,
+                title=f"Project {i}",
+                description="รายละเอียดผลงาน " * 40,
+                cover_image=covers[i % len(covers)],
+                category=category_list[i % len(category_list)],
+                event_date=start + datetime.timedelta(days=i),
+            )
+            for i in range(items)
+        ])
+        PortfolioImage.objects.bulk_create([
+            PortfolioImage(portfolio_item=item, image=gallery[j % len(gallery)])
+            for i, item in enumerate(created)
+            for j in range(i % (images + 1))
+        ])
+        owners.append(owner)
+    return owners
+
+
+def measure_view(client, url, repeat, warm_cache=False):
+    """เรียก url ผ่าน Test Client repeat ครั้ง วัดเวลาและจำนวน query"""
+    timings, query_counts = [], []
+    for _ in range(repeat):
+        if not warm_cache:
+            cache.clear()  # วัดเส้นทาง render จริง ไม่ใช่หน้าจาก Page Cache
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = client.get(url, secure=True)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            timings.append(time.perf_counter() - start)
+        query_counts.append(len(ctx.captured_queries))
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} ตอบกลับ {response.status_code}")
+    return {**summarize(timings), 'queries': max(query_counts)}
+
+
+def bench_views(owner, repeat=5, warm_cache=False):
+    """วัด dashboard / portfolio_view / portfolio_detail / download_portfolio_pdf ของ owner"""
+    anonymous = Client()
+    logged_in = Client()
+    logged_in.force_login(owner)
+
+    item = PortfolioItem.objects.filter(owner=owner).order_by('pk').first()
+    results = {
+        'dashboard': measure_view(logged_in, reverse('dashboard'), repeat, warm_cache),
+        'portfolio_view': measure_view(anonymous, reverse('public_portfolio', args=[owner.username]), repeat, warm_cache),
+        'portfolio_detail': measure_view(
+            anonymous, reverse('portfolio_detail', args=[owner.username, item.pk]), repeat, warm_cache),
+    }
+
+    # PDF: ครั้งแรกจะเข้าคิว -> สร้างไฟล์ตรงนี้ (แทน Worker) แล้ววัดการดาวน์โหลดไฟล์ที่ Cache ไว้
+    download_url = reverse('download_portfolio_pdf')
+    logged_in.get(download_url, secure=True)
+    job = PdfExportJob.objects.filter(owner=owner).latest('created_at')
+    start = time.perf_counter()
+    process_pdf_job(job.pk)
+    results['pdf_render'] = {**summarize([time.perf_counter() - start]), 'queries': None}
+    results['download_portfolio_pdf'] = measure_view(logged_in, download_url, repeat, warm_cache=True)
+    return results
+
+
+def run_benchmark_suite(users=5, items=20, images=4, categories=5, repeat=5,
+                        megapixels=(12,), compress_repeat=3, warm_cache=False):
+    """seed ข้อมูล + วัดทุกอย่าง คืนค่าเป็น dict ที่เขียนเป็น JSON ได้ (ต้องเรียกใน Test Database)"""
+    owners = seed_dataset(users, items, images, categories)
+    compress = bench_compress_image(megapixels, compress_repeat, modes=('bounded',))
+
+    return {
+        'meta': {
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'params': {
+                'users': users, 'items': items, 'images': images, 'categories': categories,
+                'repeat': repeat, 'warm_cache': warm_cache,
+            },
+        },
+        'views': bench_views(owners[0], repeat, warm_cache),
+        'compress_image': {f"{mp}mp": result['bounded'] for mp, result in compress.items()},
+    }
+
+
+def compare_to_baseline(results, baseline, threshold=0.2):
+    """
+    เทียบผลกับ baseline คืนค่าเป็น list ของข้อความที่แย่ลงเกิน threshold (0.2 = 20%)
+    - View: median ช้าลง / จำนวน query เพิ่มขึ้น (query นับเป๊ะ ไม่มี threshold)
+    - บีบอัดรูป: images/s ลดลง / Peak RSS เพิ่มขึ้น
+    """
+    regressions = []
+
+    for name, stats in results.get('views', {}).items():
+        base = baseline.get('views', {}).get(name)
+        if not base:
+            continue
+        if stats['median_ms'] > base['median_ms'] * (1 + threshold):
+            change = (stats['median_ms'] / max(base['median_ms'], 0.001) - 1) * 100
+            regressions.append(f"{name}: median {base['median_ms']} -> {stats['median_ms']} ms (+{change:.0f}%)")
+        if stats['queries'] is not None and base.get('queries') is not None and stats['queries'] > base['queries']:
+            regressions.append(f"{name}: queries {base['queries']} -> {stats['queries']}")
+
+    for name, stats in results.get('compress_image', {}).items():
+        base = baseline.get('compress_image', {}).get(name)
+        if not base:
+            continue
+        if stats['images_per_sec'] < base['images_per_sec'] * (1 - threshold):
+            regressions.append(
+                f"compress_image {name}: {base['images_per_sec']} -> {stats['images_per_sec']} images/s")
+        if stats['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            regressions.append(
+                f"compress_image {name}: peak RSS {base['peak_rss_mb']} -> {stats['peak_rss_mb']} MB")
+
+    return regressions
+
+
+@contextmanager
+def benchmark_database():
+    """ใช้ Test Database + โฟลเดอร์ MEDIA ชั่วคราวระหว่าง Benchmark (ไม่แตะข้อมูลจริง)"""
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+    try:
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+# ==========================================
+# Full-text Search (manage.py bench_search): index เทียบกับ icontains บนข้อมูลจำนวนมาก
+# ==========================================
+
+SEARCH_WORDS = (
+    "หุ่นยนต์ เว็บไซต์ แอปพลิเคชัน วิทยาศาสตร์ คณิตศาสตร์ ดนตรี กีฬา ศิลปะ ภาษาไทย ภาษาอังกฤษ "
+    "ค่ายอาสา โครงงาน ประกวด แข่งขัน รางวัล ชนะเลิศ ออกแบบ ถ่ายภาพ วิดีโอ สิ่งแวดล้อม "
+    "robotics python django arduino design photography science olympiad hackathon volunteer"
+).split()
+
+
+def seed_search_dataset(total=100_000, owners=50, private_ratio=0.1, batch_size=5000, seed=42):
+    """
+    สร้างผลงาน total ชิ้น กระจายให้ owners คน (ประมาณ private_ratio ของคนปิด Public)
+    ชื่อ/คำอธิบายสุ่มจาก SEARCH_WORDS ด้วย seed คงที่ (ผลลัพธ์ซ้ำได้ทุกครั้ง)
+    คำอธิบายมีรหัส refNNNN ที่พบน้อยปนอยู่ด้วย ไว้วัดกรณีค้นเจอไม่กี่ชิ้น
+    """
+    User = get_user_model()
+    rng = random.Random(seed)
+    category_list = Category.objects.bulk_create([
+        Category(name=f"Search {i}", slug=f"search-category-{i}") for i in range(8)
+    ])
+
+    users = []
+    for u in range(owners):
+        user = User.objects.create_user(username=f"search{u}", email=f"search{u}@example.com", password="bench")
+        if u < owners * private_ratio:
+            user.profile.is_public = False
+            user.profile.save()
+        users.append(user)
+
+    start = datetime.date(2015, 1, 1)
+    for offset in range(0, total, batch_size):
+        PortfolioItem.objects.bulk_create([
+            PortfolioItem(
+                owner=users[i % owners],
+                title=' '.join(rng.sample(SEARCH_WORDS, 3)) + f" #{i}",
+                description=' '.join(rng.choices(SEARCH_WORDS, k=20)) + f" ref{rng.randrange(10_000):04d}",
+                cover_image="portfolio_covers/bench_0.jpg",
+                category=category_list[i % len(category_list)],
+                event_date=start + datetime.timedelta(days=i % 3650),
+            )
+            for i in range(offset, min(offset + batch_size, total))
+        ])
+    return users
+
+
+def bench_search(total=100_000, repeat=5, queries=("หุ่นยนต์", "django", "ชนะเลิศ ถ่ายภาพ", "ref0042")):
+    """
+    วัดการค้นหาแบบที่หน้า search ใช้ (หน้าแรก + COUNT) ระหว่าง Full-text index กับ icontains เดิม
+    (ต้องเรียกใน Test Database) คืนค่าเป็น dict {query: {'index': stats, 'icontains': stats, 'matches': n}}
+    """
+    seed_start = time.perf_counter()
+    seed_search_dataset(total)
+    results = {'items': total, 'seed_sec': round(time.perf_counter() - seed_start, 1), 'queries': {}}
+
+    def first_page(items):
+        return items.count(), list(items.only('title', 'event_date')[:12])
+
+    for text in queries:
+        indexed = search_items(public_items(), text)
+        legacy = public_items().filter(Q(title__icontains=text) | Q(description__icontains=text))
+        results['queries'][text] = {
+            'index': summarize(time_calls(lambda: first_page(indexed.all()), repeat)),
+            'icontains': summarize(time_calls(lambda: first_page(legacy.order_by('-event_date').all()), repeat)),
+            'matches': indexed.count(),
+        }
+    return results
+
+
+# ==========================================
+# WSGI เทียบกับ ASGI (manage.py bench_servers): request/วินาที ของผู้ชมที่ไม่ได้ล็อกอิน เมื่อยิงพร้อมกัน
+# ==========================================
+# เรียก WSGIHandler / ASGIHandler ของ Django ตรงๆ ใน Process นี้ (ไม่ผ่าน network / gunicorn / uvicorn)
+# - WSGI: Thread เท่ากับจำนวน request ที่ยิงพร้อมกัน (เหมือน gunicorn --threads N)
+# - ASGI: Event Loop เดียว ยิงพร้อมกัน N request
+
+def server_urls(owner):
+    """หน้า Public ที่ผู้ชมทั่วไปเปิด: หน้าแรก / Portfolio / รายละเอียดผลงาน"""
+    item = PortfolioItem.objects.filter(owner=owner).order_by('pk').first()
+    return [
+        reverse('home'),
+        reverse('public_portfolio', args=[owner.username]),
+        reverse('portfolio_detail', args=[owner.username, item.pk]),
+    ]
+
+
+def wsgi_get(handler, path):
+    """GET path ผ่าน WSGIHandler คืนค่า status code"""
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '443', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'https', 'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    body = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+    try:
+        b''.join(body)
+    finally:
+        body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(handler, path):
+    """GET path ผ่าน ASGIHandler คืนค่า status code"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'https', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 0), 'server': ('testserver', 443),
+    }
+    body_sent = False
+    status = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Client ไม่ตัดการเชื่อมต่อ (Django จะยกเลิกตัวรอนี้เองเมื่อส่ง response เสร็จ)
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await handler(scope, receive, send)
+    return status[0]
+
+
+def load_summary(latencies, elapsed):
+    return {
+        **summarize(latencies),
+        'p95_ms': round(statistics.quantiles(latencies, n=20)[-1] * 1000, 1) if len(latencies) > 1 else None,
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+    }
+
+
+def check_status(path, status):
+    if status != 200:
+        raise RuntimeError(f"{path} ตอบกลับ {status}")
+
+
+def load_test_wsgi(paths, concurrency):
+    handler = WSGIHandler()
+
+    def timed(path):
+        start = time.perf_counter()
+        check_status(path, wsgi_get(handler, path))
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, paths))
+    return load_summary(latencies, time.perf_counter() - start)
+
+
+def load_test_asgi(paths, concurrency):
+    handler = ASGIHandler()
+
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def timed(path):
+            async with slots:
+                start = time.perf_counter()
+                check_status(path, await asgi_get(handler, path))
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(timed(path) for path in paths))
+        return load_summary(latencies, time.perf_counter() - start)
+
+    return asyncio.run(run())
+
+
+def bench_servers(users=3, items=20, requests=300, concurrency=(1, 8, 32), warm_cache=False):
+    """
+    seed ข้อมูลแล้วยิง request (วนหน้า home / portfolio_view / portfolio_detail) พร้อมกันทีละ concurrency
+    ผ่าน WSGI และ ASGI (ต้องเรียกใน Test Database) คืนค่าเป็น dict {concurrency: {'wsgi': stats, 'asgi': stats}}
+    ค่าเริ่มต้นปิด Page Cache (วัดเส้นทาง render จริง) / warm_cache=True วัดกรณีเสิร์ฟจาก Cache
+    """
+    owners = seed_dataset(users, items, images=2, categories=4, image_size=(640, 480))
+    urls = [url for owner in owners for url in server_urls(owner)]
+    paths = [urls[i % len(urls)] for i in range(requests)]
+
+    results = {'requests': requests, 'urls': urls, 'concurrency': {}}
+    with override_settings(PAGE_CACHE_TIMEOUT=settings.PAGE_CACHE_TIMEOUT if warm_cache else 0):
+        # รอบอุ่นเครื่อง (โหลด template / URL resolver / Cache) ไม่นับเวลา
+        load_test_wsgi(urls, 1)
+        load_test_asgi(urls, 1)
+        for n in concurrency:
+            results['concurrency'][n] = {
+                'wsgi': load_test_wsgi(paths, n),
+                'asgi': load_test_asgi(paths, n),
+            }
+    return results
@@ -0,0 +1,42 @@
+from django.core import checks
+from django.db import DatabaseError
+
+
+@checks.register(checks.Tags.sites, deploy=True)
+def check_site_domain(app_configs, databases=None, **kwargs):
+    """
+    manage.py check --deploy: โดเมนใน Sites framework ต้องตั้งเป็นโดเมนจริง
+    (ลิงก์ใน PDF ที่สร้างด้วย manage.py render_pdfs ไม่มี request ให้ใช้โดเมนแทน / QR Code จะลิงก์ตามโดเมนที่ผู้ใช้เปิดเข้ามา)
+    """
+    from django.contrib.sites.models import Site
+
+    from .qr import DEFAULT_SITE_DOMAIN
+
+    try:
+        domain = Site.objects.get_current().domain
+    except (DatabaseError, Site.DoesNotExist):
+        return []  # ยังไม่ได้ migrate
+    if domain != DEFAULT_SITE_DOMAIN:
+        return []
+    return [checks.Warning(
+        f"โดเมนใน Sites framework ยังเป็น {DEFAULT_SITE_DOMAIN}",
+        hint="ตั้งโดเมนจริงใน Django Admin > Sites ก่อน QR Code และ PDF ที่สร้างใน Background จะลิงก์ไปผิดที่",
+        id='portfolios.W001',
+    )]
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_page_cache_backend(app_configs, **kwargs):
+    """
+    manage.py check --deploy: Page Cache ของหน้า Public ต้องใช้ Cache ที่ทุก Process ใช้ร่วมกัน
+    (locmem: การล้าง Cache จาก Process อื่นมาไม่ถึง Page Cache จึงถูกปิดไว้)
+    """
+    from .page_cache import page_cache_enabled
+
+    if page_cache_enabled():
+        return []
+    return [checks.Warning(
+        "CACHE_URL เป็น locmem (แยกกันในแต่ละ Process) Page Cache ของหน้า Public ถูกปิดอยู่",
+        hint="ตั้ง CACHE_URL เป็น Redis / Memcached เช่น redis://127.0.0.1:6379/1",
+        id='portfolios.W002',
+    )]
@@ -0,0 +1,74 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+
+
+# ==========================================
+# Thread Pool สำหรับงานหนักที่เรียกจาก Async View (Pillow / WeasyPrint)
+# ==========================================
+# ถ้าใช้ sync_to_async ปกติ งานจะไปกินคิว Thread เดียวกับ View แบบ sync ทั้งหมด
+# (รูปย่อ 20 รูปที่สร้างพร้อมกันทำให้หน้า Public ทุกหน้าต้องรอ Thread ว่าง)
+# จึงแยกไว้ใน Pool ที่จำกัดจำนวน Thread (BLOCKING_EXECUTOR_WORKERS) งานที่เกินจะรอคิวใน Pool นี้
+# ส่วน Event Loop ยังรับ request อื่นต่อได้ตามปกติ
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def blocking_executor():
+    """Thread Pool ของ Process นี้ (สร้างตอนใช้ครั้งแรก)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BLOCKING_EXECUTOR_WORKERS, thread_name_prefix='blocking',
+                )
+    return _executor
+
+
+def with_fresh_connections(func):
+    """ปิด DB connection ที่หมดอายุก่อน/หลังงาน เหมือนตอนเริ่ม/จบ request (Thread ใน Pool อยู่ยาวข้าม request)"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+async def run_blocking(func, *args, **kwargs):
+    """เรียก func (sync) ใน blocking_executor() แล้วรอผลโดยไม่บล็อก Event Loop"""
+    return await sync_to_async(
+        with_fresh_connections(func), thread_sensitive=False, executor=blocking_executor(),
+    )(*args, **kwargs)
+
+
+# ==========================================
+# Response แบบ stream ภายใต้ ASGI
+# ==========================================
+# StreamingHttpResponse / FileResponse ที่ได้ iterator แบบ sync จะถูก Django อ่านจนหมดด้วย
+# sync_to_async(list) ก่อนส่งเมื่อรันใต้ ASGI (ZIP ทั้งไฟล์ / ไฟล์รูปทั้งไฟล์อยู่ใน memory)
+# ส่วนใต้ WSGI ถ้าให้ iterator แบบ async ก็จะถูกอ่านจนหมดเหมือนกัน จึงต้องเลือกตามประเภทของ request
+
+async def iterate_in_thread(iterator):
+    """async iterator ที่ดึง chunk ถัดไปจาก iterator (sync) ทีละ chunk ใน Thread ไม่บล็อก Event Loop"""
+    done = object()
+    # thread_sensitive: generator ที่อ่าน DB (เช่น ZIP export) ต้องรันใน Thread เดิมทุก chunk (connection เดิม)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(iterator, done)) is not done:
+        yield chunk
+
+
+def stream_for_server(request, response):
+    """ใต้ ASGI เปลี่ยน streaming_content ของ response เป็น async iterator (ใต้ WSGI คืนค่าเดิม)"""
+    if isinstance(request, ASGIRequest) and not response.is_async:
+        # ตัวปิดไฟล์ / generator เดิมยังอยู่ใน response จะถูกเรียกตอนส่งเสร็จเหมือนเดิม
+        response.streaming_content = iterate_in_thread(iter(response.streaming_content))
+    return response
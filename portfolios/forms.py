@@ -1,7 +1,40 @@
 from django import forms
-from .models import PortfolioItem
+from .models import Category, PortfolioImage, PortfolioItem
+from .uploads import upload_field_value
+
+
+class UploadTokenFormMixin:
+    """
+    ฟอร์มที่รับ token ของรูปที่อัปโหลดทีละ chunk ไว้ก่อน (portfolios/uploads.py) แทนไฟล์ที่แนบมากับ POST
+    upload_fields: {ชื่อ field รูป: ชื่อ field ของ token} / ต้องส่ง user เข้ามาตอนสร้างฟอร์ม
+    """
+    upload_fields = {}
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        for image_field, token_field in self.upload_fields.items():
+            self.fields[token_field] = forms.CharField(required=False, widget=forms.HiddenInput)
+            # ส่ง token มาแทนไฟล์ได้ (ตรวจว่ามีอย่างใดอย่างหนึ่งใน clean)
+            self.fields[image_field].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for image_field, token_field in self.upload_fields.items():
+            token = cleaned_data.get(token_field)
+            if token and self.user is not None:
+                try:
+                    cleaned_data[image_field] = upload_field_value(self.user, token)
+                except forms.ValidationError as e:
+                    self.add_error(image_field, e)  # แสดงใต้ช่องเลือกรูป (field ของ token ซ่อนอยู่)
+            elif not cleaned_data.get(image_field) and not getattr(self.instance, image_field):
+                self.add_error(image_field, self.fields[image_field].error_messages['required'])
+        return cleaned_data
+
+
+class PortfolioItemForm(UploadTokenFormMixin, forms.ModelForm):
+    upload_fields = {'cover_image': 'cover_upload'}
 
-class PortfolioItemForm(forms.ModelForm):
     class Meta:
         model = PortfolioItem
         fields = ['title', 'category', 'description', 'cover_image', 'event_date', 'video_link']
@@ -9,4 +42,29 @@ class PortfolioItemForm(forms.ModelForm):
             'event_date': forms.DateInput(attrs={'type': 'date'}), # ใช้ปฏิทินเลือกวันที่
             'description': forms.Textarea(attrs={'rows': 4}),
             'video_link': forms.URLInput(attrs={'class': 'form-input', 'placeholder': 'เช่น https://www.youtube.com/watch?v=...'}),
-        }
\ No newline at end of file
+        }
+
+
+class PortfolioImageForm(UploadTokenFormMixin, forms.ModelForm):
+    """รูป Gallery 1 รูปใน inline formset ของผลงาน"""
+    upload_fields = {'image': 'upload'}
+
+    class Meta:
+        model = PortfolioImage
+        fields = ['image']
+
+class PortfolioSearchForm(forms.Form):
+    """ฟอร์มค้นหาผลงานสาธารณะ (หน้า search ใช้ GET)"""
+    q = forms.CharField(label="ค้นหา", max_length=100, required=False,
+                        widget=forms.SearchInput(attrs={'placeholder': 'ชื่อผลงาน หรือคำในรายละเอียด'}))
+    category = forms.ModelChoiceField(queryset=Category.objects.all(), to_field_name='slug',
+                                      required=False, empty_label="ทุกหมวดหมู่", label="หมวดหมู่")
+    date_from = forms.DateField(label="ตั้งแต่วันที่", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(label="ถึงวันที่", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("วันที่เริ่มต้นต้องไม่อยู่หลังวันที่สิ้นสุด")
+        return cleaned_data
@@ -0,0 +1,130 @@
+import hashlib
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import STORED_IMAGE_DIR, StoredImage
+
+
+# ==========================================
+# Content-addressed Image Storage: ชื่อไฟล์ = SHA-256 ของเนื้อหา
+# ==========================================
+# - ใบเกียรติบัตร / รูปหมู่ที่อัปโหลดซ้ำหลายผลงาน (หรือเพื่อนหลายคน) เก็บไฟล์เดียว
+# - จำ hash ของไฟล์ต้นฉบับไว้ด้วย อัปโหลดรูปเดิมซ้ำจะไม่ต้องบีบอัดใหม่ (และได้รูปย่อชุดเดิม)
+# - นับจำนวนแถวที่อ้างถึง (refcount) ตอนบันทึก / ลบ (ดู signals.py) ไฟล์ที่เหลือ 0 ลบทิ้งได้
+
+# Model ที่อ้างถึงไฟล์ -> ชื่อ field รูป
+IMAGE_REFERENCES = {
+    'portfolios.PortfolioItem': 'cover_image',
+    'portfolios.PortfolioImage': 'image',
+    'users.Profile': 'avatar',
+    'portfolios.ImageUpload': 'file',
+}
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_sha256(file):
+    """SHA-256 ของไฟล์ (File ของ Django) อ่านทีละ chunk แล้วกลับไปต้นไฟล์"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def stored_image_name(content_hash, extension):
+    # แบ่งโฟลเดอร์ย่อยตาม 2 ตัวแรกของ hash (ไม่ให้ไฟล์นับแสนอยู่ในโฟลเดอร์เดียว)
+    return f"{STORED_IMAGE_DIR}{content_hash[:2]}/{content_hash}.{extension}"
+
+
+def find_by_source_hash(source_hash):
+    """รูปที่เคยประมวลผลจากไฟล์ต้นฉบับเดียวกันไว้แล้ว (ไฟล์ยังอยู่ครบ) หรือ None"""
+    for stored in StoredImage.objects.filter(source_hash=source_hash).order_by('pk'):
+        if default_storage.exists(stored.file.name):
+            return stored
+    return None
+
+
+def store_image(content, extension, source_hash=''):
+    """
+    เก็บรูป (File ของ Django หรือ bytes) แบบ content-addressed คืนค่า StoredImage
+    ถ้ามีรูปเนื้อหาเดียวกันอยู่แล้ว จะไม่เขียนไฟล์ใหม่ (refcount เพิ่มตอนมีแถวอ้างถึง ไม่ใช่ตรงนี้)
+    """
+    if isinstance(content, bytes):
+        content = ContentFile(content)
+    content_hash = content_sha256(content)
+    name = stored_image_name(content_hash, extension)
+
+    stored = StoredImage.objects.filter(content_hash=content_hash).first()
+    if stored is not None and default_storage.exists(stored.file.name):
+        if source_hash and not stored.source_hash:
+            StoredImage.objects.filter(pk=stored.pk, source_hash='').update(source_hash=source_hash)
+        return stored
+
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, content)
+        if saved != name:
+            # Process อื่นเขียนไฟล์เนื้อหาเดียวกันไปก่อนพอดี ใช้ของเขา
+            default_storage.delete(saved)
+
+    if stored is not None:
+        # แถวมีอยู่แต่ไฟล์หายไป (เพิ่งเขียนกลับคืน)
+        return stored
+    try:
+        with transaction.atomic():
+            return StoredImage.objects.create(
+                content_hash=content_hash, source_hash=source_hash, file=name, size=content.size,
+            )
+    except IntegrityError:
+        return StoredImage.objects.get(content_hash=content_hash)
+
+
+def reference_models():
+    """(Model, ชื่อ field) ของทุกที่ที่อ้างถึงไฟล์รูป"""
+    return [(apps.get_model(label), field) for label, field in IMAGE_REFERENCES.items()]
+
+
+def recount_references():
+    """
+    คำนวณ refcount ใหม่จากแถวที่อ้างถึงจริงใน DB (UPDATE เดียว) ใช้ซ่อมค่าที่คลาดเคลื่อน
+    เช่นแถวที่ถูกแก้ด้วย .update() / bulk_create โดยไม่ได้นับ
+    """
+    total = Value(0)
+    for model, field in reference_models():
+        count = (
+            model.objects.filter(**{field: OuterRef('file')})
+            .order_by().values(field).annotate(n=Count('pk')).values('n')
+        )
+        total = total + Coalesce(Subquery(count, output_field=IntegerField()), 0)
+    return StoredImage.objects.update(refcount=total)
+
+
+def storage_report():
+    """สรุปการใช้พื้นที่ของรูปแบบ content-addressed (ตัวเลขเป็น bytes)"""
+    totals = StoredImage.objects.aggregate(
+        files=Count('pk'),
+        stored_bytes=Coalesce(Sum('size'), 0),
+        references=Coalesce(Sum('refcount'), 0),
+        unreferenced_files=Count('pk', filter=Q(refcount=0)),
+        unreferenced_bytes=Coalesce(Sum('size', filter=Q(refcount=0)), 0),
+        shared_files=Count('pk', filter=Q(refcount__gt=1)),
+        # ถ้าทุกการอ้างถึงเก็บไฟล์ของตัวเอง (แบบเดิม) จะใช้พื้นที่เท่านี้
+        logical_bytes=Coalesce(Sum(F('size') * F('refcount')), 0),
+    )
+    used = totals['stored_bytes'] - totals['unreferenced_bytes']
+
+    legacy = 0
+    for model, field in reference_models():
+        legacy += model.objects.exclude(**{f"{field}__startswith": STORED_IMAGE_DIR}).exclude(**{field: ''}).count()
+
+    return {
+        **totals,
+        'saved_bytes': totals['logical_bytes'] - used,
+        'legacy_references': legacy,
+    }
+
@@ -0,0 +1,185 @@
+import logging
+from io import BytesIO
+from PIL import Image
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from .instrumentation import timed
+from .image_store import content_sha256, find_by_source_hash, store_image
+from .models import STORED_IMAGE_DIR, ImageDerivative, ImageStatus, StoredImage, compress_image
+from .signals import invalidate_owner_pages
+
+
+logger = logging.getLogger(__name__)
+
+# Model ที่มีรูปอัปโหลดต้องประมวลผล -> ชื่อ field รูป (สถานะเก็บใน <field>_status)
+UPLOADED_IMAGE_FIELDS = {
+    'portfolios.PortfolioItem': 'cover_image',
+    'portfolios.PortfolioImage': 'image',
+    'portfolios.ImageUpload': 'file',
+}
+
+
+# ==========================================
+# รูปย่อหลายขนาด (Responsive Image Derivatives)
+# ==========================================
+
+# ความกว้างที่สร้างไว้ให้ srcset เลือก (px)
+DERIVATIVE_WIDTHS = (320, 640, 1200)
+
+# format -> (ชื่อ format ของ Pillow, นามสกุลไฟล์, options ตอน save)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# โฟลเดอร์ของรูปที่สร้าง derivative ได้ (กันไม่ให้ view ถูกใช้ประมวลผลไฟล์อื่นใน MEDIA)
+DERIVATIVE_SOURCES = ('portfolio_covers/', 'portfolio_gallery/', STORED_IMAGE_DIR)
+
+
+def derivative_url(source, width, fmt):
+    """URL ของรูปย่อ (ชี้ไปที่ view ที่จะสร้างรูปให้ถ้ายังไม่มี)"""
+    return reverse('image_derivative', args=[width, fmt, source])
+
+
+def encode_image(img, fmt):
+    pil_format, _, options = DERIVATIVE_FORMATS[fmt]
+    buffer = BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def save_derivative(source, width, fmt, data):
+    """บันทึกไฟล์ + แถวใน DB (ถ้ามี process อื่นสร้างตัวเดียวกันไปก่อน จะใช้ของเดิม)"""
+    _, extension, _ = DERIVATIVE_FORMATS[fmt]
+    stem = source.rsplit('.', 1)[0]
+
+    derivative = ImageDerivative(source=source, width=width, format=fmt)
+    # เก็บตามโครงสร้างโฟลเดอร์เดิม เช่น derivatives/portfolio_covers/abc_640w.webp
+    derivative.file.save(f"{stem}_{width}w.{extension}", ContentFile(data), save=False)
+    try:
+        with transaction.atomic():
+            derivative.save()
+    except IntegrityError:
+        derivative.file.delete(save=False)
+        derivative = ImageDerivative.objects.get(source=source, width=width, format=fmt)
+    return derivative
+
+
+def build_derivatives(source, widths=DERIVATIVE_WIDTHS, formats=tuple(DERIVATIVE_FORMATS)):
+    """
+    สร้างรูปย่อของ source ตามความกว้าง/format ที่ระบุ (ข้ามตัวที่มีอยู่แล้ว)
+    ย่อจากขนาดใหญ่ไปเล็กต่อเนื่องกัน จะได้ไม่ต้อง resize จากรูปเต็มทุกครั้ง
+    คืนค่าเป็น dict {(width, format): ImageDerivative}
+    """
+    derivatives = {
+        (d.width, d.format): d
+        for d in ImageDerivative.objects.filter(source=source, width__in=widths, format__in=formats)
+    }
+    missing = [(w, f) for w in widths for f in formats if (w, f) not in derivatives]
+    if not missing:
+        return derivatives
+
+    with timed('image'):
+        return _build_missing(source, formats, derivatives, missing)
+
+
+def _build_missing(source, formats, derivatives, missing):
+    with default_storage.open(source, 'rb') as f:
+        img = Image.open(f)
+        img.load()
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    for width in sorted({w for w, _ in missing}, reverse=True):
+        # ไม่ขยายรูปที่เล็กกว่าความกว้างที่ขอ (ใช้ขนาดเดิม)
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS)
+
+        for fmt in formats:
+            if (width, fmt) in missing:
+                derivatives[(width, fmt)] = save_derivative(source, width, fmt, encode_image(img, fmt))
+
+    return derivatives
+
+
+def get_derivative(source, width, fmt):
+    """หารูปย่อ 1 ขนาด ถ้ายังไม่มีจะสร้างให้ตอนนี้เลย (Lazy) / คืนค่า None ถ้าไม่มีรูปต้นฉบับ"""
+    derivative = ImageDerivative.objects.filter(source=source, width=width, format=fmt).first()
+    if derivative is not None:
+        return derivative
+
+    if not default_storage.exists(source):
+        return None
+    return build_derivatives(source, widths=(width,), formats=(fmt,))[(width, fmt)]
+
+
+# ==========================================
+# ประมวลผลรูปที่อัปโหลด (รันใน Background Worker)
+# ==========================================
+
+def process_uploaded_image(model_label, pk):
+    """
+    บีบอัดรูปต้นฉบับที่อัปโหลดไว้ แทนที่ไฟล์เดิมด้วยไฟล์ที่บีบอัดแล้ว (เก็บใน images/ ตาม hash) แล้วสร้างรูปย่อสำหรับ srcset
+    คืนค่าสถานะสุดท้ายของรูป (ready / failed) หรือ None ถ้าแถวถูกลบไปแล้ว
+    """
+    model = apps.get_model(model_label)
+    field_name = UPLOADED_IMAGE_FIELDS[model_label]
+    status_field = f"{field_name}_status"
+
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+
+    original = getattr(instance, field_name)
+    original_name = original.name
+    storage = original.storage
+
+    try:
+        with original.open('rb'):
+            source_hash = content_sha256(original)
+            # เคยประมวลผลไฟล์ต้นฉบับเดียวกันแล้ว (เช่นใบเกียรติบัตรที่อัปโหลดซ้ำ) -> ใช้ไฟล์เดิม ไม่ต้องบีบอัดใหม่
+            stored = find_by_source_hash(source_hash)
+            if stored is None:
+                compressed = compress_image(original)
+                stored = store_image(compressed, 'jpg', source_hash)
+    except Exception:
+        logger.exception("Image processing failed: %s #%s", model_label, pk)
+        model.objects.filter(pk=pk, **{field_name: original_name}).update(**{status_field: ImageStatus.FAILED})
+        return ImageStatus.FAILED
+
+    new_name = stored.file.name
+
+    # อัปเดตเฉพาะกรณีที่ยังเป็นรูปเดิมอยู่ (ถ้าเจ้าของเปลี่ยนรูปไปแล้วระหว่างนี้ ไฟล์ที่เพิ่งทำจะไม่มีใครอ้างถึง)
+    with transaction.atomic():
+        updated = model.objects.filter(pk=pk, **{field_name: original_name}).update(**{
+            field_name: new_name,
+            status_field: ImageStatus.READY,
+            'updated_at': timezone.now(),
+        })
+        if updated and new_name != original_name:
+            StoredImage.retain(new_name)
+            StoredImage.release(original_name)
+    if not updated:
+        return None
+
+    # ลบไฟล์ที่อัปโหลดมา (ไฟล์ใน images/ อาจมีคนอื่นใช้อยู่ ไม่ลบ)
+    if original_name != new_name and not StoredImage.is_stored_name(original_name):
+        storage.delete(original_name)
+
+    # .update() ไม่ส่ง signal ต้องล้าง Page Cache เอง (หน้าที่ Cache ไว้ยังชี้ไปที่ไฟล์ต้นฉบับที่เพิ่งลบ)
+    invalidate_owner_pages(instance)
+
+    try:
+        build_derivatives(new_name)
+    except Exception:
+        # รูปหลักพร้อมแล้ว รูปย่อที่ขาดจะถูกสร้างตอนมีคนเรียกดู (Lazy)
+        logger.exception("Building derivatives failed: %s", new_name)
+
+    return ImageStatus.READY
@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class DescNullsLastIndex(models.Index):
+    """
+    Index ที่ column แบบ DESC ซึ่งเป็น NULL ได้ (เช่น '-event_date') เรียง NULL ไว้ท้าย
+    ให้ตรงกับ ORDER BY ... DESC NULLS LAST (column ที่ห้าม NULL คงไว้ตามเดิม ให้ตรงกับ ORDER BY ... DESC ปกติ)
+    - PostgreSQL: DESC ปกติจะเอา NULL ขึ้นก่อน ถ้า index ไม่ระบุ NULLS LAST จะใช้ index นี้เรียงไม่ได้
+    - SQLite: DESC เอา NULL ไว้ท้ายอยู่แล้ว (และ CREATE INDEX ไม่รับ NULLS LAST) จึงใช้ SQL ปกติ
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+        index = self.clone()
+        index.fields_orders = [
+            (field_name, 'DESC NULLS LAST' if order == 'DESC' and model._meta.get_field(field_name).null else order)
+            for field_name, order in self.fields_orders
+        ]
+        return super(DescNullsLastIndex, index).create_sql(model, schema_editor, using=using, **kwargs)
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('portfolios.performance')
+
+# ค่าที่วัดได้ของ request ปัจจุบัน (ContextVar ตามไปถึง thread ของ sync_to_async ด้วย จึงใช้ได้ทั้ง WSGI/ASGI)
+current_metrics = ContextVar('current_metrics', default=None)
+
+# ชื่อใน Server-Timing -> คำอธิบาย
+TIMERS = {
+    'sql': 'SQL',
+    'tpl': 'Template render',
+    'image': 'Image processing',
+    'pdf': 'PDF render',
+}
+
+SAMPLES_KEY_PREFIX = 'perf:samples'
+PROCESS_COUNT_KEY = 'perf:processes'
+
+
+# ==========================================
+# 1. เก็บค่าที่วัดได้ของแต่ละ request
+# ==========================================
+
+class RequestMetrics:
+    def __init__(self, record_sql=False):
+        self.started = time.perf_counter()
+        self.durations = {name: 0.0 for name in TIMERS}  # วินาที
+        self.sql_count = 0
+        self.record_sql = record_sql
+        self.queries = []  # (sql, ms) เก็บเฉพาะตอนเปิด PERF_SLOW_REQUEST_MS
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        data = {f'{name}_ms': round(seconds * 1000, 1) for name, seconds in self.durations.items()}
+        data['sql_count'] = self.sql_count
+        data['total_ms'] = round(self.total_ms(), 1)
+        return data
+
+
+@contextmanager
+def timed(name):
+    """จับเวลาส่วนหนึ่งของงาน (image / pdf / ...) ให้ request ปัจจุบัน ถ้าไม่ได้อยู่ใน request จะไม่ทำอะไร"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+def sql_timer(execute, sql, params, many, context):
+    """execute_wrapper ที่ติดไว้กับทุก DB connection (ทำงานเฉพาะตอนมี request ที่กำลังวัดอยู่)"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        metrics.add('sql', duration)
+        metrics.sql_count += 1
+        if metrics.record_sql:
+            metrics.queries.append((sql, round(duration * 1000, 2)))
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    """รับ signal connection_created: ติด sql_timer ให้ connection ใหม่ (ครั้งเดียวต่อ connection)"""
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+# ==========================================
+# 2. Template Backend ที่จับเวลา render
+# ==========================================
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('tpl'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates ที่จับเวลา render ของ template หลัก (include ข้างในนับรวมอยู่แล้ว)"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# ==========================================
+# 3. Middleware
+# ==========================================
+
+class PerformanceMiddleware:
+    """
+    วัดเวลาของแต่ละ request แล้วรายงานใน header Server-Timing + log แบบ JSON (logger portfolios.performance)
+    และเก็บตัวอย่างเวลาแยกตามชื่อ URL ไว้ใน Cache สำหรับดู percentile (performance_stats)
+    ควรวางไว้บนสุดของ MIDDLEWARE เพื่อให้เวลารวมครอบคลุม Middleware ตัวอื่น
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        metrics, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        if self.finish(request, response, metrics):
+            sample_buffer.flush()
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        # finish ไม่แตะ Cache / DB เรียกใน Event Loop ได้เลย ส่วนการส่งตัวอย่างขึ้น Cache (นานๆ ครั้ง)
+        # โยนไปทำใน Thread โดยไม่รอ
+        if self.finish(request, response, metrics):
+            asyncio.get_running_loop().run_in_executor(None, sample_buffer.flush)
+        return response
+
+    def start(self):
+        metrics = RequestMetrics(record_sql=bool(settings.PERF_SLOW_REQUEST_MS))
+        return metrics, current_metrics.set(metrics)
+
+    def finish(self, request, response, metrics):
+        """ใส่ Server-Timing + log + เก็บตัวอย่าง คืนค่า True ถ้าถึงเวลาส่งตัวอย่างขึ้น Cache"""
+        data = metrics.as_dict()
+        url_name = request.resolver_match.view_name if request.resolver_match else None
+
+        response['Server-Timing'] = server_timing_header(data)
+
+        logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            **data,
+        }))
+
+        if settings.PERF_SLOW_REQUEST_MS and data['total_ms'] >= settings.PERF_SLOW_REQUEST_MS:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'url_name': url_name,
+                'total_ms': data['total_ms'],
+                'queries': [{'sql': sql, 'ms': ms} for sql, ms in metrics.queries],
+            }))
+
+        return bool(url_name) and sample_buffer.add(url_name, data)
+
+
+def server_timing_header(data):
+    parts = [f'sql;dur={data["sql_ms"]};desc="{TIMERS["sql"]} ({data["sql_count"]} queries)"']
+    for name in ('tpl', 'image', 'pdf'):
+        if data[f'{name}_ms']:
+            parts.append(f'{name};dur={data[f"{name}_ms"]};desc="{TIMERS[name]}"')
+    parts.append(f'total;dur={data["total_ms"]}')
+    return ', '.join(parts)
+
+
+# ==========================================
+# 4. สถิติแยกตามชื่อ URL
+# ==========================================
+# ตัวอย่างเก็บใน deque ของแต่ละ Process (จำกัด PERF_SAMPLES_PER_URL ต่อชื่อ URL) ไม่แตะ Cache ระหว่าง request
+# ทุก PERF_FLUSH_SECONDS ส่งทั้งชุดขึ้น Cache ด้วย cache.set ครั้งเดียว ใต้ key ของ Process นั้นเอง
+# (ไม่มี Process ไหนอ่าน-แก้-เขียน key เดียวกัน จึงไม่มี lost update) แล้ว performance_stats รวมทุก Process
+# ถ้า Cache เป็น locmem แต่ละ Process จะเห็นแค่ตัวอย่างของตัวเอง (ใช้ Redis/Memcached เพื่อรวมทุก Process)
+
+def process_slot():
+    """เลขประจำ Process สำหรับ key ของตัวอย่าง (incr เป็นคำสั่ง atomic ของ Cache)"""
+    cache.add(PROCESS_COUNT_KEY, 0, None)
+    try:
+        return cache.incr(PROCESS_COUNT_KEY)
+    except ValueError:
+        # key หายไประหว่าง add กับ incr (ถูกไล่ออกจาก Cache) เริ่มนับใหม่
+        cache.set(PROCESS_COUNT_KEY, 1, None)
+        return 1
+
+
+class SampleBuffer:
+    """ตัวอย่างล่าสุดของ Process นี้ แยกตามชื่อ URL"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.samples = {}
+        self.slot = None
+        self.last_flush = time.monotonic()
+
+    def add(self, url_name, data):
+        """เก็บตัวอย่าง (O(1)) คืนค่า True ถ้า request นี้ได้หน้าที่ส่งตัวอย่างขึ้น Cache"""
+        sample = (data['total_ms'], data['sql_ms'], data['sql_count'])
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()  # Process ลูกที่ fork มา (เช่น gunicorn --preload) ต้องมี key ของตัวเอง
+            samples = self.samples.get(url_name)
+            if samples is None:
+                samples = self.samples[url_name] = deque(maxlen=settings.PERF_SAMPLES_PER_URL)
+            samples.append(sample)
+
+            now = time.monotonic()
+            if now - self.last_flush < settings.PERF_FLUSH_SECONDS:
+                return False
+            self.last_flush = now  # จองรอบนี้ไว้ request อื่นจะไม่ส่งซ้ำ
+            return True
+
+    def flush(self):
+        """ส่งตัวอย่างทั้งหมดของ Process นี้ขึ้น Cache (ทับชุดเดิมของ Process นี้)"""
+        with self.lock:
+            snapshot = {name: list(samples) for name, samples in self.samples.items()}
+            self.last_flush = time.monotonic()
+        if not snapshot:
+            return
+        if self.slot is None or cache.get(PROCESS_COUNT_KEY, 0) < self.slot:
+            self.slot = process_slot()  # ยังไม่มีเลข / ตัวนับหายไปจาก Cache (ลงทะเบียนใหม่)
+        cache.set(f'{SAMPLES_KEY_PREFIX}:{self.slot}', snapshot, settings.PERF_SAMPLES_TIMEOUT)
+
+
+sample_buffer = SampleBuffer()
+
+
+def percentile(sorted_values, pct):
+    """percentile แบบ nearest-rank (ค่าต้องเรียงมาแล้ว)"""
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def performance_stats():
+    """สรุป p50 / p90 / p95 / p99 ของเวลารวมและเวลา SQL แยกตามชื่อ URL (รวมทุก Process)"""
+    sample_buffer.flush()  # รวมตัวอย่างล่าสุดของ Process นี้ด้วย
+    process_count = cache.get(PROCESS_COUNT_KEY, 0)
+    snapshots = cache.get_many([f'{SAMPLES_KEY_PREFIX}:{slot}' for slot in range(1, process_count + 1)])
+
+    merged = {}
+    for snapshot in snapshots.values():
+        for name, samples in snapshot.items():
+            merged.setdefault(name, []).extend(samples)
+
+    stats = {}
+    for name, samples in sorted(merged.items()):
+        total = sorted(s[0] for s in samples)
+        sql = sorted(s[1] for s in samples)
+        stats[name] = {
+            'samples': len(samples),
+            'total_ms': {f'p{p}': percentile(total, p) for p in (50, 90, 95, 99)},
+            'sql_ms': {f'p{p}': percentile(sql, p) for p in (50, 90, 95, 99)},
+            'avg_queries': round(sum(s[2] for s in samples) / len(samples), 1),
+        }
+    return stats
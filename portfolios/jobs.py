@@ -0,0 +1,212 @@
+import logging
+import time
+from datetime import timedelta
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from .imaging import UPLOADED_IMAGE_FIELDS, process_uploaded_image
+from .models import ImageStatus, PdfExportJob
+from .pdf import render_portfolio_pdf
+
+
+logger = logging.getLogger(__name__)
+
+# งานที่ค้างสถานะ running นานกว่านี้ ถือว่า Worker ตายไปแล้ว
+STALE_JOB_AGE = timedelta(minutes=30)
+
+
+# ==========================================
+# คิวงานสร้าง PDF (ใช้ตาราง PdfExportJob เป็นคิว)
+# ==========================================
+
+def find_cached_export(user, fingerprint):
+    """หา PDF ที่สร้างเสร็จแล้วจากข้อมูลชุดเดียวกัน (fingerprint ตรงกัน) ถ้าไม่มีคืนค่า None"""
+    return (
+        PdfExportJob.objects
+        .select_related('owner')
+        .filter(owner=user, status=PdfExportJob.Status.DONE, fingerprint=fingerprint)
+        .exclude(file='')
+        .first()
+    )
+
+
+def enqueue_pdf_export(user, fingerprint, base_url=''):
+    """
+    สั่งสร้าง PDF ให้ user
+    ถ้ามีงานของข้อมูลชุดเดียวกันที่ยังรอคิว/กำลังสร้างอยู่แล้ว จะใช้งานเดิมแทนการสร้างงานซ้ำ
+    """
+    job = (
+        PdfExportJob.objects
+        .filter(owner=user, fingerprint=fingerprint,
+                status__in=[PdfExportJob.Status.PENDING, PdfExportJob.Status.RUNNING])
+        .first()
+    )
+    if job is None:
+        job = PdfExportJob.objects.create(owner=user, fingerprint=fingerprint, base_url=base_url)
+    return job
+
+
+def claim_pending_jobs(limit):
+    """
+    จองงานที่รอคิวอยู่ (สูงสุด limit งาน) แล้วเปลี่ยนสถานะเป็น running
+    ใช้ UPDATE แบบมีเงื่อนไข status=pending เพื่อกันไม่ให้ Worker หลายตัวหยิบงานเดียวกัน
+    """
+    if limit <= 0:
+        return []
+
+    candidates = (
+        PdfExportJob.objects
+        .filter(status=PdfExportJob.Status.PENDING)
+        .order_by('created_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+    claimed = []
+    for pk in list(candidates):
+        updated = PdfExportJob.objects.filter(pk=pk, status=PdfExportJob.Status.PENDING).update(
+            status=PdfExportJob.Status.RUNNING,
+            started_at=timezone.now(),
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale_jobs(max_age):
+    """คืนงานที่ค้างสถานะ running นานเกินไป (เช่น Worker ตายกลางคัน) กลับเข้าคิว"""
+    cutoff = timezone.now() - max_age
+    return PdfExportJob.objects.filter(
+        status=PdfExportJob.Status.RUNNING, started_at__lt=cutoff
+    ).update(status=PdfExportJob.Status.PENDING, started_at=None)
+
+
+def process_pdf_job(job_id):
+    """
+    สร้าง PDF ของงาน job_id แล้วบันทึกไฟล์ลง Storage
+    ฟังก์ชันนี้รันอยู่ใน Process ลูกของ Worker (ProcessPoolExecutor)
+    """
+    close_old_connections()
+    try:
+        job = PdfExportJob.objects.select_related('owner').get(pk=job_id)
+        try:
+            pdf_file = render_portfolio_pdf(job.owner, base_url=job.base_url or None)
+        except Exception as e:
+            logger.exception("PDF export #%s failed", job_id)
+            mark_job_failed(job_id, e)
+            return PdfExportJob.Status.FAILED
+
+        job.file.save(f"Portfolio_{job.owner.username}.pdf", ContentFile(pdf_file), save=False)
+        job.status = PdfExportJob.Status.DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=['file', 'status', 'finished_at'])
+
+        delete_old_exports(job)
+        return job.status
+    finally:
+        # Process ลูกอยู่ยาว ต้องปิด connection เองทุกครั้ง
+        connections.close_all()
+
+
+def mark_job_failed(job_id, error):
+    """บันทึกว่างานล้มเหลว พร้อมข้อความ error ไว้ดูใน Admin"""
+    PdfExportJob.objects.filter(pk=job_id).update(
+        status=PdfExportJob.Status.FAILED,
+        error=str(error),
+        finished_at=timezone.now(),
+    )
+
+
+def delete_old_exports(job):
+    """ลบไฟล์ PDF เก่าของ user คนเดียวกัน (เก็บไว้เฉพาะงานล่าสุด) กัน MEDIA_ROOT โตไม่หยุด"""
+    old_jobs = (
+        PdfExportJob.objects
+        .filter(owner_id=job.owner_id, status__in=[PdfExportJob.Status.DONE, PdfExportJob.Status.FAILED])
+        .exclude(pk=job.pk)
+        .filter(created_at__lte=job.created_at)
+    )
+    for old_job in old_jobs:
+        if old_job.file:
+            old_job.file.delete(save=False)
+        old_job.delete()
+
+
+
+# ==========================================
+# คิวงานบีบอัดรูป (ใช้ field <รูป>_status ของแต่ละ Model เป็นคิว)
+# ==========================================
+
+def claim_pending_images(limit):
+    """จองรูปที่รอประมวลผล (สูงสุด limit รูป) คืนค่าเป็น list ของ (model_label, pk)"""
+    claimed = []
+    for model_label, field_name in UPLOADED_IMAGE_FIELDS.items():
+        if len(claimed) >= limit:
+            break
+        model = apps.get_model(model_label)
+        status_field = f"{field_name}_status"
+
+        candidates = (
+            model.objects
+            .filter(**{status_field: ImageStatus.PENDING})
+            .order_by('pk')
+            .values_list('pk', flat=True)[:limit - len(claimed)]
+        )
+        for pk in list(candidates):
+            # updated_at ใช้เป็นเวลาที่เริ่มทำ (ไว้เช็คงานค้าง)
+            updated = model.objects.filter(pk=pk, **{status_field: ImageStatus.PENDING}).update(**{
+                status_field: ImageStatus.PROCESSING,
+                'updated_at': timezone.now(),
+            })
+            if updated:
+                claimed.append((model_label, pk))
+    return claimed
+
+
+def requeue_stale_images(max_age):
+    """คืนรูปที่ค้างสถานะ processing นานเกินไปกลับเข้าคิว"""
+    cutoff = timezone.now() - max_age
+    requeued = 0
+    for model_label, field_name in UPLOADED_IMAGE_FIELDS.items():
+        status_field = f"{field_name}_status"
+        requeued += apps.get_model(model_label).objects.filter(
+            **{status_field: ImageStatus.PROCESSING, 'updated_at__lt': cutoff}
+        ).update(**{status_field: ImageStatus.PENDING})
+    return requeued
+
+
+def process_image_task(model_label, pk):
+    """รันใน Process ลูกของ Worker"""
+    close_old_connections()
+    try:
+        return process_uploaded_image(model_label, pk)
+    finally:
+        connections.close_all()
+
+
+def mark_image_failed(model_label, pk):
+    field_name = UPLOADED_IMAGE_FIELDS[model_label]
+    apps.get_model(model_label).objects.filter(pk=pk).update(**{f"{field_name}_status": ImageStatus.FAILED})
+
+
+def image_processing_status(item):
+    """สถานะการประมวลผลรูปทั้งหมดของผลงาน (รูปปก + Gallery)"""
+    images = list(item.images.values('pk', 'image_status'))
+    statuses = [item.cover_image_status] + [img['image_status'] for img in images]
+    return {
+        'cover': item.cover_image_status,
+        'images': [{'id': img['pk'], 'status': img['image_status']} for img in images],
+        # เสร็จแล้ว = ไม่มีรูปไหนรอคิว/กำลังทำอยู่
+        'done': all(status in (ImageStatus.READY, ImageStatus.FAILED) for status in statuses),
+    }
+
+
+def wait_for_images(item, timeout=30, interval=0.5):
+    """รอจนรูปทั้งหมดของผลงานประมวลผลเสร็จ (หรือหมดเวลา) คืนค่าสถานะล่าสุด"""
+    deadline = time.monotonic() + timeout
+    while True:
+        item.refresh_from_db(fields=['cover_image', 'cover_image_status'])
+        status = image_processing_status(item)
+        if status['done'] or time.monotonic() >= deadline:
+            return status
+        time.sleep(interval)
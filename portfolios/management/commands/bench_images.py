@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from portfolios.benchmarks import COMPRESSORS, bench_compress_image
+
+
+class Command(BaseCommand):
+    help = (
+        "วัดหน่วยความจำสูงสุด (Peak RSS) และความเร็วของการบีบอัดรูป JPEG ขนาดใหญ่ "
+        "เทียบระหว่างวิธีเดิม (legacy) กับแบบย่อตั้งแต่ตอน decode (bounded)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--megapixels', type=int, nargs='+', default=[12, 48],
+            help="ขนาดรูปตัวอย่าง (ล้าน pixel) เช่น --megapixels 12 48",
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--mode', choices=list(COMPRESSORS), action='append', dest='modes')
+
+    def handle(self, *args, **options):
+        modes = options['modes'] or list(COMPRESSORS)
+        results = bench_compress_image(options['megapixels'], options['repeat'], modes)
+
+        for mp, result in results.items():
+            self.stdout.write(f"{mp}MP ({result['size']}, {result['file_mb']} MB)")
+            for mode in modes:
+                stats = result[mode]
+                self.stdout.write(
+                    f"  {mode:>8}: median {stats['median_ms']} ms, "
+                    f"{stats['images_per_sec']} images/s, "
+                    f"peak RSS {stats['peak_rss_mb']} MB (+{stats['rss_growth_mb']} MB)"
+                )
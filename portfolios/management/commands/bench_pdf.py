@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.benchmarks import bench_pdf_fetchers
+
+
+class Command(BaseCommand):
+    help = (
+        "วัดเวลา render PDF ของ user เทียบระหว่างโหลดรูปผ่าน HTTP (แบบเดิม) กับอ่านจาก Storage โดยตรง "
+        "(ต้องเปิด Server ที่ --base-url ไว้ก่อน เพื่อให้โหมด HTTP โหลดรูปได้)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"ไม่พบ user: {options['username']}")
+
+        results = bench_pdf_fetchers(user, options['base_url'], options['repeat'])
+
+        for mode, stats in results.items():
+            self.stdout.write(
+                f"{mode:>6}: median {stats['median_ms']} ms "
+                f"(min {stats['min_ms']}, max {stats['max_ms']}, {stats['runs']} runs)"
+            )
+        speedup = results['http']['median_ms'] / max(results['local']['median_ms'], 0.001)
+        self.stdout.write(self.style.SUCCESS(f"เร็วขึ้น {speedup:.1f} เท่า"))
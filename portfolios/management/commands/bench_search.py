@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from portfolios.benchmarks import bench_search, benchmark_database
+
+
+class Command(BaseCommand):
+    help = (
+        "วัดความเร็วการค้นหาผลงาน (Full-text index เทียบกับ icontains) "
+        "บนข้อมูลจำลองจำนวนมากใน Test Database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000, help="จำนวนผลงานที่สร้าง")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--query', action='append', dest='queries', help="คำค้นหา (ใส่ได้หลายครั้ง)")
+
+    def handle(self, *args, **options):
+        kwargs = {'queries': options['queries']} if options['queries'] else {}
+        with benchmark_database():
+            results = bench_search(options['items'], options['repeat'], **kwargs)
+
+        self.stdout.write(f"{results['items']} ผลงาน (seed {results['seed_sec']} s)")
+        for text, stats in results['queries'].items():
+            self.stdout.write(
+                f"  {text!r}: {stats['matches']} matches | index median {stats['index']['median_ms']} ms"
+                f" | icontains median {stats['icontains']['median_ms']} ms"
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from portfolios.benchmarks import bench_servers, benchmark_database
+
+
+class Command(BaseCommand):
+    help = (
+        "เทียบจำนวน request/วินาที ของหน้า Public (ผู้ชมที่ไม่ได้ล็อกอิน) ระหว่าง WSGI กับ ASGI "
+        "เมื่อยิงพร้อมกันหลายระดับ บนข้อมูลจำลองใน Test Database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument('--items', type=int, default=20, help="จำนวนผลงานต่อ user")
+        parser.add_argument('--requests', type=int, default=300, help="จำนวน request ต่อรอบ")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                            help="จำนวน request ที่ยิงพร้อมกัน (วัดทีละค่า)")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="เปิด Page Cache (วัดกรณีเสิร์ฟจาก Cache)")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            results = bench_servers(
+                users=options['users'], items=options['items'], requests=options['requests'],
+                concurrency=options['concurrency'], warm_cache=options['warm_cache'],
+            )
+
+        self.stdout.write(f"{results['requests']} requests ต่อรอบ วน {len(results['urls'])} หน้า")
+        for n, servers in results['concurrency'].items():
+            self.stdout.write(f"พร้อมกัน {n}:")
+            for name, stats in servers.items():
+                self.stdout.write(
+                    f"  {name.upper()}: {stats['requests_per_sec']} req/s"
+                    f" | median {stats['median_ms']} ms | p95 {stats['p95_ms']} ms | max {stats['max_ms']} ms"
+                )
+            ratio = servers['asgi']['requests_per_sec'] / servers['wsgi']['requests_per_sec']
+            self.stdout.write(f"  ASGI/WSGI = {ratio:.2f}x")
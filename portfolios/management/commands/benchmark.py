@@ -0,0 +1,67 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.benchmarks import benchmark_database, compare_to_baseline, run_benchmark_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "รันชุด Benchmark: สร้างข้อมูลจำลองใน Test Database แล้ววัดเวลา/จำนวน query ของหน้าหลัก "
+        "การสร้าง PDF และการบีบอัดรูป เขียนผลเป็น JSON และเทียบกับ baseline ได้"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--items', type=int, default=20, help="จำนวนผลงานต่อ user")
+        parser.add_argument('--images', type=int, default=4, help="จำนวนรูป Gallery สูงสุดต่อผลงาน")
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5, help="จำนวนครั้งที่เรียกแต่ละหน้า")
+        parser.add_argument('--megapixels', type=int, nargs='+', default=[12],
+                            help="ขนาดรูปที่ใช้วัดการบีบอัด (ล้าน pixel)")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="ไม่ล้าง Page Cache ระหว่างรอบ (วัดกรณีเสิร์ฟจาก Cache)")
+        parser.add_argument('--output', help="เขียนผลเป็นไฟล์ JSON (ใช้เป็น baseline ครั้งต่อไปได้)")
+        parser.add_argument('--baseline', help="ไฟล์ JSON ผลครั้งก่อนที่จะเทียบ")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="ยอมให้แย่ลงได้ไม่เกินเท่านี้ก่อนนับเป็น regression (0.2 = 20%%)")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        # ใช้ Test Database + โฟลเดอร์ MEDIA ชั่วคราว (ไม่แตะข้อมูลจริง)
+        with benchmark_database():
+            results = run_benchmark_suite(
+                users=options['users'], items=options['items'], images=options['images'],
+                categories=options['categories'], repeat=options['repeat'],
+                megapixels=options['megapixels'], warm_cache=options['warm_cache'],
+            )
+
+        self.print_results(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"เขียนผลไว้ที่ {options['output']}")
+
+        if baseline is not None:
+            regressions = compare_to_baseline(results, baseline, options['threshold'])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(f"  {line}")
+                raise CommandError(f"ช้าลงกว่า baseline {len(regressions)} รายการ")
+            self.stdout.write(self.style.SUCCESS("ไม่มี regression เทียบกับ baseline"))
+
+    def print_results(self, results):
+        for name, stats in results['views'].items():
+            queries = f", {stats['queries']} queries" if stats['queries'] is not None else ""
+            self.stdout.write(
+                f"{name:>24}: median {stats['median_ms']} ms (min {stats['min_ms']}, max {stats['max_ms']}){queries}"
+            )
+        for name, stats in results['compress_image'].items():
+            self.stdout.write(
+                f"{'compress_image ' + name:>24}: {stats['images_per_sec']} images/s, "
+                f"peak RSS {stats['peak_rss_mb']} MB"
+            )
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portfolios.media_gc import GC_BATCH_SIZE, MediaCollector
+from portfolios.uploads import purge_expired_uploads
+
+
+def megabytes(size):
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "ลบไฟล์ใน MEDIA_ROOT ที่ไม่มีแถวไหนอ้างถึงแล้ว (รวมไฟล์ใน images/ ที่ refcount เป็น 0) "
+        "ไล่ตรวจทีละ batch ตามชื่อไฟล์ ถ้าพังกลางทาง สั่งคำสั่งเดิมอีกครั้งจะทำต่อจาก checkpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="แค่รายงาน ไม่ลบไฟล์")
+        parser.add_argument('--quarantine', metavar='DIR', default='',
+                            help="ย้ายไฟล์ไปไว้ในโฟลเดอร์นี้ (โครงสร้างเดิม) แทนการลบ")
+        parser.add_argument('--batch-size', type=int, default=GC_BATCH_SIZE,
+                            help="จำนวนไฟล์ต่อ 1 batch / checkpoint")
+        parser.add_argument('--grace', type=int, default=settings.MEDIA_GC_GRACE_SECONDS,
+                            help="ไม่แตะไฟล์ที่ใหม่กว่านี้ (วินาที)")
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            # การอัปโหลดทีละ chunk ที่ค้าง / ไม่ได้ใช้จนหมดอายุ: ลบแถวก่อน ไฟล์จะกลายเป็นไฟล์ที่ไม่มีใครใช้
+            self.stdout.write(f"ลบการอัปโหลดที่หมดอายุ {purge_expired_uploads()} รายการ")
+
+        collector = MediaCollector(
+            dry_run=options['dry_run'],
+            quarantine=options['quarantine'],
+            batch_size=options['batch_size'],
+            grace=options['grace'],
+            log=self.stdout.write,
+        )
+        run = collector.run()
+
+        action = "ลบได้ (dry-run)" if run.dry_run else ("ย้ายไปกักไว้" if run.quarantine else "ลบแล้ว")
+        self.stdout.write(self.style.SUCCESS(
+            f"ตรวจ {run.files_scanned} ไฟล์ ({megabytes(run.bytes_scanned)}): "
+            f"{action} {run.orphans} ไฟล์ คืนพื้นที่ {megabytes(run.bytes_reclaimed)} ({run.bytes_reclaimed} bytes)"
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from portfolios.image_store import recount_references, storage_report
+
+
+def megabytes(size):
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = "สรุปพื้นที่ที่ใช้ / ประหยัดได้จากการเก็บรูปแบบ content-addressed (ไฟล์เดียวใช้ร่วมหลายผลงาน)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help="คำนวณ refcount ใหม่จากแถวที่อ้างถึงจริงก่อนสรุป")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            self.stdout.write(f"คำนวณ refcount ใหม่ {recount_references()} ไฟล์")
+
+        report = storage_report()
+        self.stdout.write(
+            f"ไฟล์รูป {report['files']} ไฟล์ ({megabytes(report['stored_bytes'])}) "
+            f"ถูกอ้างถึง {report['references']} ครั้ง, ใช้ร่วมกันมากกว่า 1 ที่ {report['shared_files']} ไฟล์"
+        )
+        self.stdout.write(
+            f"ไม่มีแถวไหนอ้างถึง {report['unreferenced_files']} ไฟล์ ({megabytes(report['unreferenced_bytes'])})"
+        )
+        self.stdout.write(f"รูปแบบเดิม (ยังไม่ได้ย้ายมาเก็บแบบ content-addressed) {report['legacy_references']} ที่")
+        self.stdout.write(self.style.SUCCESS(
+            f"ประหยัดพื้นที่ได้ {megabytes(report['saved_bytes'])} ({report['saved_bytes']} bytes) "
+            f"จากที่ต้องใช้ {megabytes(report['logical_bytes'])} ถ้าเก็บแยกไฟล์"
+        ))
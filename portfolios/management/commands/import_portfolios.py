@@ -0,0 +1,60 @@
+import django
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.archives import IMPORT_BATCH_SIZE, PortfolioImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Import ผลงานจำนวนมากจากไฟล์ ZIP (manifest.jsonl + รูป) บีบอัดรูปใน Process Pool แล้วบันทึกทีละ batch "
+        "ถ้าพังกลางทาง สั่งคำสั่งเดิมกับไฟล์เดิมอีกครั้งจะทำต่อจาก checkpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help="ไฟล์ ZIP (รูปแบบเดียวกับไฟล์ที่ Export จาก Dashboard)")
+        parser.add_argument(
+            '--workers', type=int, default=settings.WORKER_PROCESSES,
+            help="จำนวน Process ที่บีบอัดรูปพร้อมกัน (0 = ทำใน Process นี้)",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help="จำนวนบรรทัดของ manifest ต่อ 1 transaction / checkpoint",
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help="สร้างผู้ใช้ที่ยังไม่มี (บรรทัดนั้นต้องมี email) แบบยังไม่มีรหัสผ่าน",
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+
+        # spawn + django.setup เหมือน runworker (Process ลูกไม่ใช้ DB connection ร่วมกับ Process แม่)
+        pool = nullcontext()
+        if workers > 0:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=django.setup)
+
+        with pool as executor:
+            importer = PortfolioImporter(
+                options['archive'],
+                pool=executor,
+                workers=workers,
+                batch_size=options['batch_size'],
+                create_users=options['create_users'],
+                log=self.stdout.write,
+            )
+            try:
+                run = importer.run()
+            except (OSError, ValueError, zipfile.BadZipFile) as e:
+                raise CommandError(f"Import ไม่สำเร็จ: {e}")
+
+        for error in run.errors[-20:]:
+            self.stderr.write(f"บรรทัด {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Import เสร็จ: {run.items_created} ผลงาน {run.images_created} รูป ข้าม {len(run.errors)} บรรทัด"
+        ))
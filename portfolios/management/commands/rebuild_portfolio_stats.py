@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from portfolios.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "คำนวณสถิติผลงาน (PortfolioStats / CategoryStats) ใหม่จากข้อมูลจริง ใช้หลัง import ข้อมูลหรือถ้าตัวเลขเพี้ยน"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help="เว้นว่างไว้ = ทุก user")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        count = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            rebuild_stats(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"คำนวณสถิติใหม่ {count} users"))
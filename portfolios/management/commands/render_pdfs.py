@@ -0,0 +1,164 @@
+import django
+import multiprocessing
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.models import Category
+from portfolios.pdf import PdfRenderResult, render_pdf_task
+
+
+class DirectoryOutput:
+    """เขียน PDF ของแต่ละคนเป็นไฟล์ในโฟลเดอร์"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, filename, data):
+        (self.path / filename).write_bytes(data)
+
+    def close(self):
+        pass
+
+
+class ZipOutput:
+    """เขียน PDF ต่อท้ายลง ZIP ไฟล์เดียวทันทีที่แต่ละคนเสร็จ (ไม่เก็บทั้งชุดไว้ใน memory)"""
+
+    def __init__(self, path):
+        # PDF บีบอัดข้างในมาแล้ว เก็บแบบไม่บีบซ้ำ (Process แม่จะได้ไม่เป็นคอขวด)
+        self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED)
+
+    def write(self, filename, data):
+        self.archive.writestr(filename, data)
+
+    def close(self):
+        self.archive.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "สร้าง PDF Portfolio ของผู้ใช้หลายคนพร้อมกัน (เช่นทั้งรุ่นตอนจบการศึกษา) ใน Process Pool "
+        "แต่ละ Process parse stylesheet และโหลดฟอนต์ครั้งเดียว แล้วเขียนผลลงโฟลเดอร์หรือ ZIP ไฟล์เดียว"
+    )
+
+    def add_arguments(self, parser):
+        who = parser.add_mutually_exclusive_group(required=True)
+        who.add_argument('--users', nargs='+', metavar='USERNAME', help="ระบุ username")
+        who.add_argument('--category', metavar='SLUG', help="ผู้ใช้ทุกคนที่มีผลงานในหมวดหมู่นี้")
+        who.add_argument('--all', action='store_true', help="ผู้ใช้ทุกคน")
+
+        output = parser.add_mutually_exclusive_group(required=True)
+        output.add_argument('--output-dir', help="โฟลเดอร์ที่เก็บไฟล์ PDF")
+        output.add_argument('--zip', help="รวม PDF ทั้งหมดไว้ใน ZIP ไฟล์นี้")
+
+        parser.add_argument(
+            '--workers', type=int, default=settings.WORKER_PROCESSES,
+            help="จำนวน Process ที่สร้าง PDF พร้อมกัน (0 = ทำใน Process นี้)",
+        )
+
+    def select_users(self, options):
+        users = get_user_model().objects.order_by('username')
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+            missing = set(options['users']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"ไม่พบ user: {', '.join(sorted(missing))}")
+        elif options['category']:
+            if not Category.objects.filter(slug=options['category']).exists():
+                raise CommandError(f"ไม่พบหมวดหมู่: {options['category']}")
+            users = users.filter(portfolio_items__category__slug=options['category']).distinct()
+        return list(users.values_list('pk', flat=True))
+
+    def results(self, user_ids, workers, task=render_pdf_task):
+        """
+        yield PdfRenderResult ตามลำดับที่เสร็จ
+        Process ลูกตาย (เช่นหน่วยความจำไม่พอ) ทำให้ทั้ง Pool ใช้ต่อไม่ได้ จึงเปิด Pool ใหม่ทำคนที่เหลือต่อ
+        คนที่กำลังทำอยู่ตอน Pool พังจะถูกลองใหม่ทีละคน คนที่ทำให้ Process ตายซ้ำเท่านั้นที่นับว่าล้มเหลว
+        """
+        if workers <= 0:
+            for user_id in user_ids:
+                yield task(user_id)
+            return
+
+        pending = deque(user_ids)
+        while pending:
+            crashed = yield from self.run_pool(pending, workers, task)
+            for user_id in crashed:
+                errors = yield from self.run_pool(deque([user_id]), 1, task)
+                if errors:
+                    yield PdfRenderResult(user_id, None, None, errors[user_id], 0.0)
+
+    def run_pool(self, pending, workers, task):
+        """
+        ทำงานจาก pending ใน Process Pool ใหม่ โดยส่งงานเข้า Pool ไม่เกินจำนวน workers
+        (ตอน Pool พังจะรู้ได้ว่าคนไหนบ้างที่อาจเป็นต้นเหตุ) คืนค่า {user_id: error} ของงานที่ค้างอยู่ตอน Pool พัง
+        """
+        # spawn + django.setup เหมือน runworker (Process ลูกไม่ใช้ DB connection ร่วมกับ Process แม่)
+        mp_context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=django.setup) as pool:
+            running = {}
+            while pending or running:
+                while pending and len(running) < workers:
+                    user_id = pending.popleft()
+                    running[pool.submit(task, user_id)] = user_id
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                crashed = {}
+                for future in finished:
+                    user_id = running.pop(future)
+                    error = future.exception()
+                    if isinstance(error, BrokenProcessPool):
+                        crashed[user_id] = f"{type(error).__name__}: {error}"
+                    elif error is not None:
+                        yield PdfRenderResult(user_id, None, None, f"{type(error).__name__}: {error}", 0.0)
+                    else:
+                        yield future.result()
+
+                if crashed:
+                    # งานที่ยังไม่เสร็จใน Pool ที่พังแล้ว ก็ใช้ไม่ได้ทั้งหมด
+                    crashed.update(dict.fromkeys(running.values(), next(iter(crashed.values()))))
+                    return crashed
+        return {}
+
+    def handle(self, *args, **options):
+        user_ids = self.select_users(options)
+        if not user_ids:
+            raise CommandError("ไม่มีผู้ใช้ที่ตรงกับเงื่อนไข")
+
+        workers = options['workers']
+        output = ZipOutput(options['zip']) if options['zip'] else DirectoryOutput(options['output_dir'])
+        total = len(user_ids)
+        self.stdout.write(f"สร้าง PDF {total} คน ({workers or 1} processes)")
+
+        started = time.perf_counter()
+        done, failures, render_seconds, total_bytes = 0, [], 0.0, 0
+        try:
+            for result in self.results(user_ids, workers):
+                done += 1
+                label = result.username or f"user #{result.user_id}"
+                if result.error:
+                    failures.append((label, result.error))
+                    self.stderr.write(f"[{done}/{total}] {label}: ล้มเหลว - {result.error}")
+                    continue
+                output.write(f"Portfolio_{result.username}.pdf", result.pdf)
+                render_seconds += result.seconds
+                total_bytes += len(result.pdf)
+                self.stdout.write(f"[{done}/{total}] {label}: {len(result.pdf) // 1024} KB ({result.seconds:.2f}s)")
+        finally:
+            output.close()
+
+        elapsed = time.perf_counter() - started
+        succeeded = done - len(failures)
+        self.stdout.write(self.style.SUCCESS(
+            f"สำเร็จ {succeeded}/{total} ไฟล์ ({total_bytes / 1024 / 1024:.1f} MB) ใน {elapsed:.1f} วินาที: "
+            f"{succeeded / elapsed:.2f} ไฟล์/วินาที, render เฉลี่ย {render_seconds / max(succeeded, 1):.2f} วินาที/ไฟล์"
+        ))
+        if failures:
+            self.stderr.write(f"ล้มเหลว {len(failures)} คน: {', '.join(label for label, _ in failures)}")
@@ -0,0 +1,83 @@
+import django
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from portfolios.jobs import (STALE_JOB_AGE, claim_pending_images, claim_pending_jobs,
+                             mark_image_failed, mark_job_failed, process_image_task,
+                             process_pdf_job, requeue_stale_images, requeue_stale_jobs)
+
+
+class Command(BaseCommand):
+    help = (
+        "รัน Background Worker สำหรับงานที่ใช้ CPU หนัก (บีบอัดรูปที่อัปโหลด และสร้าง PDF) "
+        "โดยหยิบงานจาก DB ไปทำใน Process Pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.WORKER_PROCESSES,
+            help="จำนวน Process ที่ใช้ทำงานพร้อมกัน",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="ระยะเวลา (วินาที) ที่รอก่อนเช็คคิวใหม่เมื่อไม่มีงาน",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="ทำงานที่อยู่ในคิวตอนนี้ให้หมดแล้วจบการทำงาน (เหมาะกับ cron)",
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        poll_interval = options['poll_interval']
+
+        requeued = requeue_stale_jobs(STALE_JOB_AGE) + requeue_stale_images(STALE_JOB_AGE)
+        if requeued:
+            self.stdout.write(f"คืนงานที่ค้างอยู่กลับเข้าคิว {requeued} งาน")
+
+        self.stdout.write(f"Worker เริ่มทำงาน ({workers} processes)")
+
+        # ใช้ spawn แทน fork เพื่อไม่ให้ Process ลูกใช้ DB connection ร่วมกับ Process แม่
+        # (Process ลูกจึงต้อง setup Django ใหม่เองผ่าน initializer)
+        mp_context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=django.setup) as pool:
+            # future -> (ชื่องานไว้แสดงผล, ฟังก์ชันที่เรียกเมื่อ Process ลูกพัง)
+            running = {}
+            try:
+                while True:
+                    # เก็บผลงานที่เสร็จแล้ว
+                    for future in [f for f in running if f.done()]:
+                        label, on_crash = running.pop(future)
+                        try:
+                            self.stdout.write(f"{label}: {future.result()}")
+                        except Exception as e:
+                            on_crash(e)
+                            self.stderr.write(f"{label} crashed: {e}")
+
+                    # หยิบงานใหม่เท่าที่ยังมีที่ว่าง (รูปก่อน เพราะเสร็จเร็วและผู้ใช้รอดูอยู่)
+                    for model_label, pk in claim_pending_images(workers - len(running)):
+                        future = pool.submit(process_image_task, model_label, pk)
+                        running[future] = (
+                            f"{model_label} #{pk}",
+                            lambda e, model_label=model_label, pk=pk: mark_image_failed(model_label, pk),
+                        )
+
+                    for job_id in claim_pending_jobs(workers - len(running)):
+                        future = pool.submit(process_pdf_job, job_id)
+                        running[future] = (
+                            f"PDF export #{job_id}",
+                            lambda e, job_id=job_id: mark_job_failed(job_id, e),
+                        )
+
+                    if options['once'] and not running:
+                        break
+
+                    close_old_connections()
+                    time.sleep(poll_interval if not running else 0.2)
+            except KeyboardInterrupt:
+                self.stdout.write("กำลังหยุด Worker (รองานที่ค้างอยู่ให้เสร็จก่อน)...")
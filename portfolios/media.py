@@ -0,0 +1,251 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from .executors import stream_for_server
+from .models import STORED_IMAGE_DIR, UPLOAD_DIR, ImageDerivative, PortfolioImage, PortfolioItem
+
+
+# ==========================================
+# เสิร์ฟไฟล์ที่ผู้ใช้อัปโหลด (MEDIA) ใน Production
+# ==========================================
+# - ETag / Last-Modified + 304, Range (เช่นวิดีโอ / browser โหลดต่อ) อ่านไฟล์ทีละ chunk ไม่โหลดทั้งไฟล์เข้า memory
+# - ถ้ามี nginx / Apache อยู่หน้า (MEDIA_SENDFILE) ให้ Django แค่เช็คสิทธิ์แล้วส่ง header ให้ proxy ส่งไฟล์เอง
+# - เช็ค is_public ของเจ้าของไฟล์: เจ้าของปิด Public -> ดูได้เฉพาะเจ้าของเอง
+
+# ขนาดที่อ่านไฟล์ส่งออกไปแต่ละรอบ
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+# ไฟล์แบบ Public / ไฟล์ที่ต้องเป็นเจ้าของถึงจะดูได้
+PUBLIC = 'public'
+OWNER_ONLY = 'owner'
+
+
+def owners_of_source(name):
+    """เจ้าของรูปต้นฉบับ (รูปปก / รูป Gallery / รูปใน images/ ที่ใช้ร่วมกันได้)"""
+    User = get_user_model()
+    if name.startswith('portfolio_covers/'):
+        return User.objects.filter(portfolio_items__cover_image=name)
+    if name.startswith('portfolio_gallery/'):
+        return User.objects.filter(portfolio_items__images__image=name)
+    if name.startswith(STORED_IMAGE_DIR):
+        return owners_of_stored_image(name)
+    return User.objects.none()
+
+
+def owners_of_stored_image(name):
+    """ไฟล์ใน images/ อาจเป็นรูปปก / รูป Gallery / รูปโปรไฟล์ของหลายคนพร้อมกัน: ทุกคนที่อ้างถึงคือเจ้าของ"""
+    return get_user_model().objects.filter(
+        Q(pk__in=PortfolioItem.objects.filter(cover_image=name).values('owner_id'))
+        | Q(pk__in=PortfolioImage.objects.filter(image=name).values('portfolio_item__owner_id'))
+        | Q(profile__avatar=name)
+    )
+
+
+def owners_of_derivative(name):
+    """เจ้าของรูปย่อ = เจ้าของรูปต้นฉบับ"""
+    source = ImageDerivative.objects.filter(file=name).values_list('source', flat=True).first()
+    return owners_of_source(source) if source else get_user_model().objects.none()
+
+
+def owners_of_avatar(name):
+    return get_user_model().objects.filter(profile__avatar=name)
+
+
+def owners_of_upload(name):
+    """ไฟล์ที่อัปโหลดทีละ chunk: คนอัปโหลด (ดูรูปตัวอย่างได้ก่อนบันทึกผลงาน)"""
+    return get_user_model().objects.filter(image_uploads__file=name)
+
+
+# โฟลเดอร์ใน MEDIA ที่เสิร์ฟผ่าน URL นี้ -> หาเจ้าของไฟล์ (อาจมีหลายคน เช่น avatars/default.png)
+# โฟลเดอร์อื่น (pdf_exports/, qr_codes/ ฯลฯ) มี View ของตัวเองที่เช็คสิทธิ์อยู่แล้ว จะได้ 404
+MEDIA_OWNERS = {
+    'portfolio_covers/': owners_of_source,
+    'portfolio_gallery/': owners_of_source,
+    'derivatives/': owners_of_derivative,
+    'avatars/': owners_of_avatar,
+    STORED_IMAGE_DIR: owners_of_stored_image,
+    UPLOAD_DIR: owners_of_upload,
+}
+
+
+def media_access(request, name):
+    """
+    คืนค่า PUBLIC / OWNER_ONLY / None (ห้ามดู)
+    เช็คเจ้าของที่เปิด Public ก่อน (กรณีส่วนใหญ่ 1 query และไม่ต้องโหลด Session มาหา request.user)
+    """
+    find_owners = next((find for prefix, find in MEDIA_OWNERS.items() if name.startswith(prefix)), None)
+    if find_owners is None:
+        return None
+
+    owners = find_owners(name)
+    if owners.filter(profile__is_public=True).exists():
+        return PUBLIC
+    if request.user.is_authenticated and owners.filter(pk=request.user.pk).exists():
+        return OWNER_ONLY
+    return None
+
+
+def normalize_media_path(path):
+    """กัน path แบบ ../ หลุดออกนอก MEDIA_ROOT"""
+    name = posixpath.normpath(path).lstrip('/')
+    if name in ('', '.') or name.startswith('..') or '\x00' in name:
+        raise Http404
+    return name
+
+
+# ==========================================
+# Range Request (ส่งเฉพาะบางช่วงของไฟล์)
+# ==========================================
+
+class RangeNotSatisfiable(ValueError):
+    """ช่วงที่ขอเริ่มเลยท้ายไฟล์ (ตอบ 416)"""
+
+
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(header, size):
+    """
+    อ่าน header Range แบบช่วงเดียว คืนค่า (start, end) (end รวมตัวสุดท้าย)
+    None = ไม่มี / อ่านไม่ออก / ขอหลายช่วง -> ส่งทั้งไฟล์ (RFC 9110 อนุญาตให้ไม่สนใจ Range ได้)
+    """
+    match = BYTE_RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # bytes=-500 คือ 500 byte สุดท้าย
+        suffix_length = int(last)
+        if suffix_length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - suffix_length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end < start:
+        return None
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """If-Range: ส่งแบบ Range ได้เฉพาะตอนไฟล์ยังเป็นตัวเดียวกับที่ browser มีอยู่ ไม่งั้นส่งทั้งไฟล์"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag  # ต้องเทียบแบบ strong
+    return parse_http_date_safe(if_range) == last_modified
+
+
+class FileRangeIterator:
+    """
+    อ่านไฟล์เฉพาะช่วง start..end ทีละ chunk (StreamingHttpResponse จะเรียก close() ตอนส่งเสร็จ)
+    ใต้ ASGI ต้องส่งผ่าน stream_for_server ไม่อย่างนั้น Django จะอ่านทั้งช่วงเข้า memory ก่อนส่ง
+    """
+
+    def __init__(self, path, start, end, chunk_size=MEDIA_CHUNK_SIZE):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = end - start + 1
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.file.read(min(self.chunk_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+# ==========================================
+# Response
+# ==========================================
+
+def sendfile_response(name, path, content_type):
+    """ให้ proxy ด้านหน้าส่งไฟล์เอง (proxy จัดการ Range / sendfile ให้)"""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        # nginx: location ที่ตั้งเป็น internal ชี้ไปที่ MEDIA_ROOT
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def file_body_response(request, name, path, size, etag, last_modified, content_type):
+    """Response ที่มีเนื้อไฟล์: ส่งต่อให้ proxy / บางช่วง (206) / ช่วงเกินไฟล์ (416) / ทั้งไฟล์"""
+    if settings.MEDIA_SENDFILE:
+        return sendfile_response(name, path, content_type)
+
+    if 'HTTP_RANGE' in request.META and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_byte_range(request.META['HTTP_RANGE'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(FileRangeIterator(path, start, end), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+            return stream_for_server(request, response)
+
+    response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response.block_size = MEDIA_CHUNK_SIZE
+    del response['Content-Disposition']  # แสดงในหน้าเว็บ ไม่ใช่ไฟล์ดาวน์โหลด
+    return stream_for_server(request, response)
+
+
+def media_file_response(request, name, access):
+    """ส่งไฟล์ MEDIA พร้อม ETag / Last-Modified (304) / Range และ Cache-Control ตามสิทธิ์การดู"""
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        # Storage ภายนอก (S3 ฯลฯ) ไม่มีไฟล์ในเครื่อง ให้ Storage เสิร์ฟเอง
+        return redirect(default_storage.url(name))
+
+    if not os.path.isfile(path):
+        raise Http404
+    stat = os.stat(path)
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = file_body_response(request, name, path, size, etag, last_modified, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if access == PUBLIC:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    else:
+        # ไฟล์ของเจ้าของที่ปิด Public: ห้าม proxy / CDN เก็บ และให้ browser ถามกลับทุกครั้ง
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+    return response
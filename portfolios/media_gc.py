@@ -0,0 +1,253 @@
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import ImageDerivative, MediaGcRun, StoredImage
+
+logger = logging.getLogger(__name__)
+
+# จำนวนไฟล์ต่อ 1 batch (ตรวจการอ้างถึงด้วย query ละ field ต่อ batch + เลื่อน checkpoint)
+GC_BATCH_SIZE = 1000
+
+# แถวที่เก็บไฟล์ไว้เป็นดัชนี ไม่ได้ "ใช้" ไฟล์เอง (ไฟล์มีชีวิตอยู่ตามรูปต้นฉบับ / refcount)
+INDEX_MODELS = (ImageDerivative, StoredImage)
+
+
+def file_fields():
+    """(Model, FileField) ของทุก Model ในโปรเจกต์"""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def reference_fields():
+    """(Model, ชื่อ field) ที่แถวอ้างถึงไฟล์ที่ใช้งานอยู่ (รูปปก / Gallery / รูปโปรไฟล์ / QR Code / PDF ...)"""
+    return [(model, field.name) for model, field in file_fields() if model not in INDEX_MODELS]
+
+
+def protected_names():
+    """ไฟล์ที่เป็นค่าเริ่มต้นของ field (เช่น avatars/default.png) ห้ามลบ"""
+    return {
+        field.default for _, field in file_fields()
+        if isinstance(field.default, str) and field.default
+    }
+
+
+def referenced_names(names):
+    """ชื่อไฟล์ใน names ที่ยังมีแถวอ้างถึงอยู่ (query ละ field ด้วย __in ใช้ index ของ field รูป)"""
+    remaining = set(names)
+    found = set()
+    for model, field in reference_fields():
+        if not remaining:
+            break
+        matched = set(model.objects.filter(**{f"{field}__in": remaining}).values_list(field, flat=True))
+        found |= matched
+        remaining -= matched
+    # refcount > 0 ถือว่ายังใช้อยู่ (เช่น Worker เพิ่งนับแต่ยังไม่ได้ commit ชื่อไฟล์ของแถว)
+    if remaining:
+        found |= set(StoredImage.objects.filter(file__in=remaining, refcount__gt=0).values_list('file', flat=True))
+    return found
+
+
+def delete_file(name):
+    """ลบไฟล์ใน Storage คืนค่าขนาดที่ได้คืน (ไม่มีไฟล์ = 0)"""
+    try:
+        size = default_storage.size(name)
+    except OSError:
+        return 0
+    default_storage.delete(name)
+    return size
+
+
+def delete_derivatives(source):
+    """ลบรูปย่อทุกขนาดของ source (แถว + ไฟล์)"""
+    derivatives = list(ImageDerivative.objects.filter(source=source).values_list('pk', 'file'))
+    ImageDerivative.objects.filter(pk__in=[pk for pk, _ in derivatives]).delete()
+    return sum(delete_file(name) for _, name in derivatives)
+
+
+# ==========================================
+# 1. ลบไฟล์เก่าหลัง commit เมื่อแถวถูกลบ / เปลี่ยนรูป (เรียกจาก signals.py)
+# ==========================================
+# - ไฟล์ใน images/ ใช้ร่วมกันได้: ไม่ลบตรงนี้ ปล่อยให้ gc_media ลบเมื่อ refcount เป็น 0 และพ้นระยะ grace
+#   (Worker ที่กำลังประมวลผลรูปเดิมซ้ำอาจเพิ่งหาไฟล์นี้เจอจาก source_hash)
+# - ไฟล์อื่นลบเมื่อไม่มีแถวไหนอ้างถึงแล้วจริงๆ พร้อมรูปย่อของไฟล์นั้น
+
+def discard_file(name):
+    """ลบไฟล์ที่ไม่มีแถวไหนใช้แล้ว + รูปย่อ คืนค่า bytes ที่ได้คืน"""
+    if not name or name in protected_names() or StoredImage.is_stored_name(name):
+        return 0
+    if referenced_names([name]):
+        return 0
+    reclaimed = delete_derivatives(name) + delete_file(name)
+    if reclaimed:
+        logger.info("Media cleanup: %s (%d bytes)", name, reclaimed)
+    return reclaimed
+
+
+def queue_file_cleanup(name):
+    """ลบไฟล์หลัง transaction ปัจจุบัน commit (ถ้า rollback ไฟล์ยังอยู่ แถวเดิมยังใช้ได้)"""
+    if name:
+        transaction.on_commit(lambda: discard_file(name))
+
+
+# ==========================================
+# 2. ไล่ตรวจทั้ง MEDIA_ROOT (manage.py gc_media)
+# ==========================================
+# อ่านรายชื่อไฟล์ทีละโฟลเดอร์ + ตรวจการอ้างถึงทีละ batch: หน่วยความจำคงที่แม้มีไฟล์หลักล้าน
+# (ยกเว้นรายชื่อของโฟลเดอร์เดียวที่ต้องเรียงก่อน ซึ่ง images/ แบ่งโฟลเดอร์ย่อยตาม hash ไว้แล้ว)
+
+def media_directories():
+    """โฟลเดอร์ upload_to ของทุก FileField (ไฟล์นอกโฟลเดอร์เหล่านี้ไม่แตะ) เรียงตามชื่อ"""
+    return sorted({field.upload_to for _, field in file_fields() if isinstance(field.upload_to, str)})
+
+
+def walk_media(after=''):
+    """
+    yield (ชื่อไฟล์, ขนาด, mtime) ใน media_directories() เรียงตามชื่อเต็ม (ตรงกับการเทียบ string กับ checkpoint)
+    ข้ามไฟล์ที่ชื่อ <= after และข้ามทั้งโฟลเดอร์ย่อยที่อยู่ก่อน after
+    """
+    root = Path(default_storage.path(''))
+
+    def sort_key(entry):
+        # โฟลเดอร์เทียบด้วย "ชื่อ/" ลำดับที่เดินจะตรงกับลำดับของ path เต็ม ("a-b" มาก่อน "a/x")
+        return entry.name + '/' if entry.is_dir(follow_symlinks=False) else entry.name
+
+    def walk(prefix):
+        try:
+            with os.scandir(root / prefix) as it:
+                entries = sorted(it, key=sort_key)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        for entry in entries:
+            name = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                directory = name + '/'
+                if directory < after and not after.startswith(directory):
+                    continue  # ทุกไฟล์ในโฟลเดอร์นี้อยู่ก่อน checkpoint
+                yield from walk(directory)
+            elif entry.is_file(follow_symlinks=False) and name > after:
+                stat = entry.stat(follow_symlinks=False)
+                yield name, stat.st_size, stat.st_mtime
+
+    for directory in media_directories():
+        if directory < after and not after.startswith(directory):
+            continue
+        yield from walk(directory)
+
+
+class MediaCollector:
+    """
+    ไล่ตรวจไฟล์ใน MEDIA_ROOT ทีละ batch แล้วลบ (หรือย้ายไปกักไว้) ไฟล์ที่ไม่มีแถวไหนอ้างถึง
+    - ไฟล์ที่ใหม่กว่า grace วินาทีไม่แตะ (อาจเป็นไฟล์ที่เขียนลง Storage แล้วแต่แถวยังไม่ commit)
+    - รูปย่อมีชีวิตตามรูปต้นฉบับ / ไฟล์ใน images/ ตาม refcount + แถวที่อ้างถึงจริง
+    - เลื่อน checkpoint (MediaGcRun.last_name) ทุก batch ถ้าพังกลางทาง สั่งใหม่จะทำต่อ
+    """
+
+    def __init__(self, dry_run=False, quarantine='', batch_size=GC_BATCH_SIZE, grace=None, log=None):
+        self.dry_run = dry_run
+        self.quarantine = str(quarantine or '')
+        self.batch_size = batch_size
+        self.grace = settings.MEDIA_GC_GRACE_SECONDS if grace is None else grace
+        self.log = log or logger.info
+        self.protected = protected_names()
+
+    def get_run(self):
+        """run เดิมที่ยังไม่เสร็จ (ตัวเลือกเดียวกัน) ทำต่อจาก checkpoint หรือเริ่มใหม่"""
+        run = (
+            MediaGcRun.objects
+            .filter(status__in=[MediaGcRun.Status.RUNNING, MediaGcRun.Status.FAILED],
+                    dry_run=self.dry_run, quarantine=self.quarantine)
+            .order_by('-started_at')
+            .first()
+        )
+        if run is None:
+            return MediaGcRun.objects.create(dry_run=self.dry_run, quarantine=self.quarantine)
+        if run.status == MediaGcRun.Status.FAILED:
+            run.status = MediaGcRun.Status.RUNNING
+            run.save(update_fields=['status', 'updated_at'])
+        return run
+
+    def run(self):
+        run = self.get_run()
+        if run.last_name:
+            self.log(f"ทำต่อจาก checkpoint: หลัง {run.last_name}")
+        cutoff = time.time() - self.grace
+
+        try:
+            batch = []
+            for entry in walk_media(after=run.last_name):
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    self.collect_batch(run, batch, cutoff)
+                    batch = []
+            if batch:
+                self.collect_batch(run, batch, cutoff)
+        except Exception:
+            MediaGcRun.objects.filter(pk=run.pk).update(status=MediaGcRun.Status.FAILED)
+            raise
+
+        run.status = MediaGcRun.Status.DONE
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'finished_at', 'updated_at'])
+        return run
+
+    def live_names(self, names):
+        """ชื่อไฟล์ใน batch ที่ยังใช้งานอยู่"""
+        live = referenced_names(names)
+        # รูปย่อ: ยังใช้อยู่ถ้ามีแถว ImageDerivative และรูปต้นฉบับยังใช้อยู่
+        derivatives = dict(
+            ImageDerivative.objects.filter(file__in=set(names) - live).values_list('file', 'source')
+        )
+        live_sources = referenced_names(set(derivatives.values()))
+        live.update(name for name, source in derivatives.items() if source in live_sources)
+        return live
+
+    def collect_batch(self, run, batch, cutoff):
+        live = self.live_names([name for name, _, _ in batch])
+        orphans = [
+            (name, size) for name, size, mtime in batch
+            if name not in live and name not in self.protected and mtime < cutoff
+        ]
+
+        reclaimed = 0
+        removed = 0
+        for name, size in orphans:
+            if self.dry_run or self.remove(name):
+                removed += 1
+                reclaimed += size
+
+        run.last_name = batch[-1][0]
+        run.files_scanned += len(batch)
+        run.bytes_scanned += sum(size for _, size, _ in batch)
+        run.orphans += removed
+        run.bytes_reclaimed += reclaimed
+        run.save()
+        self.log(f"ถึง {run.last_name}: ตรวจ {len(batch)} ไฟล์ ไม่มีใครใช้ {removed} ไฟล์ ({reclaimed} bytes)")
+
+    def remove(self, name):
+        """ลบแถวดัชนีของไฟล์ แล้วลบ / ย้ายไฟล์ไปกักไว้ คืนค่า False ถ้าระหว่างนี้มีคนกลับมาใช้ไฟล์"""
+        if StoredImage.is_stored_name(name):
+            # ลบแถวแบบมีเงื่อนไข refcount=0 (ถ้าเพิ่งมีคนนับเพิ่ม จะไม่ลบ)
+            deleted, _ = StoredImage.objects.filter(file=name, refcount=0).delete()
+            if not deleted and StoredImage.objects.filter(file=name).exists():
+                return False
+        ImageDerivative.objects.filter(file=name).delete()
+
+        if not self.quarantine:
+            default_storage.delete(name)
+            return True
+        target = Path(self.quarantine, name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(default_storage.path(name), target)
+        return True
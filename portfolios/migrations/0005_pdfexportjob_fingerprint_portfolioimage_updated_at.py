@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0004_pdfexportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfexportjob',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='portfolioimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 15:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0005_pdfexportjob_fingerprint_portfolioimage_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='pdfexportjob',
+            name='base_url',
+        ),
+        migrations.CreateModel(
+            name='PortfolioQrCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_url', models.URLField(max_length=300)),
+                ('png', models.ImageField(upload_to='qr_codes/')),
+                ('svg', models.FileField(upload_to='qr_codes/')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='qr_code', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
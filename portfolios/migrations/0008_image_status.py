@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0007_imagederivative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolioimage',
+            name='image_status',
+            field=models.CharField(choices=[('pending', 'รอประมวลผล'), ('processing', 'กำลังประมวลผล'), ('ready', 'พร้อมใช้งาน'), ('failed', 'ผิดพลาด')], db_index=True, default='ready', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='portfolioitem',
+            name='cover_image_status',
+            field=models.CharField(choices=[('pending', 'รอประมวลผล'), ('processing', 'กำลังประมวลผล'), ('ready', 'พร้อมใช้งาน'), ('failed', 'ผิดพลาด')], db_index=True, default='ready', max_length=10),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 15:57
+
+import portfolios.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0008_image_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfolioimage',
+            name='image',
+            field=models.ImageField(upload_to='portfolio_gallery/', validators=[portfolios.models.validate_image_size]),
+        ),
+        migrations.AlterField(
+            model_name='portfolioitem',
+            name='cover_image',
+            field=models.ImageField(upload_to='portfolio_covers/', validators=[portfolios.models.validate_image_size]),
+        ),
+    ]
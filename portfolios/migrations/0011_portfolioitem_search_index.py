@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from portfolios.search import install_search_index, uninstall_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection, rebuild=True)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text Search ของผลงาน (ไม่มี field ใน Model): PostgreSQL ใช้ tsvector + GIN,
+    SQLite ใช้ตาราง FTS5 + trigger (รายละเอียดใน portfolios/search.py)
+    """
+
+    dependencies = [
+        ('portfolios', '0010_portfolio_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 16:27
+
+import django.db.models.deletion
+import portfolios.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0011_portfolioitem_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='portfolioitem',
+            options={'ordering': [models.OrderBy(models.F('event_date'), descending=True, nulls_last=True), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True)]},
+        ),
+        migrations.AddIndex(
+            model_name='portfolioitem',
+            index=portfolios.indexes.DescNullsLastIndex(fields=['owner', '-event_date', '-created_at', '-id'], name='item_owner_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portfolioitem',
+            index=portfolios.indexes.DescNullsLastIndex(fields=['owner', 'category', '-event_date', '-created_at', '-id'], name='item_owner_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portfolioitem',
+            index=models.Index(fields=['owner', 'updated_at'], name='item_owner_updated_idx'),
+        ),
+        # ลบ index เดี่ยวของ owner หลังสร้าง index ผสมเสร็จแล้ว (ไม่มีช่วงที่ไม่มี index ของ owner เลย)
+        migrations.AlterField(
+            model_name='portfolioitem',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_items', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18 16:36
+
+import portfolios.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0012_portfolioitem_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagederivative',
+            name='file',
+            field=models.ImageField(db_index=True, upload_to='derivatives/'),
+        ),
+        migrations.AlterField(
+            model_name='portfolioimage',
+            name='image',
+            field=models.ImageField(db_index=True, upload_to='portfolio_gallery/', validators=[portfolios.models.validate_image_size]),
+        ),
+        migrations.AlterField(
+            model_name='portfolioitem',
+            name='cover_image',
+            field=models.ImageField(db_index=True, upload_to='portfolio_covers/', validators=[portfolios.models.validate_image_size]),
+        ),
+    ]
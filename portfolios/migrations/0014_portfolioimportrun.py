@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0013_media_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioImportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archive_name', models.CharField(max_length=255)),
+                ('archive_sha256', models.CharField(max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('running', 'กำลัง import'), ('done', 'เสร็จแล้ว'), ('failed', 'ผิดพลาด')], default='running', max_length=10)),
+                ('lines_done', models.PositiveIntegerField(default=0)),
+                ('items_created', models.PositiveIntegerField(default=0)),
+                ('images_created', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
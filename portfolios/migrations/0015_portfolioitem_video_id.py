@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+from portfolios.models import parse_video_link
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_video_fields(apps, schema_editor):
+    """แยก video_provider / video_id ของผลงานเดิมที่มีลิงก์วิดีโอ (ไม่แตะ updated_at: PDF ไม่ต้องสร้างใหม่)"""
+    PortfolioItem = apps.get_model('portfolios', 'PortfolioItem')
+    items = PortfolioItem.objects.exclude(video_link__isnull=True).exclude(video_link='').only('pk', 'video_link')
+
+    batch = []
+    for item in items.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        item.video_provider, item.video_id = parse_video_link(item.video_link)
+        if item.video_id:
+            batch.append(item)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            PortfolioItem.objects.bulk_update(batch, ['video_provider', 'video_id'])
+            batch = []
+    if batch:
+        PortfolioItem.objects.bulk_update(batch, ['video_provider', 'video_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0014_portfolioimportrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolioitem',
+            name='video_id',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='portfolioitem',
+            name='video_provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube')], db_index=True, default='', editable=False, max_length=10),
+        ),
+        migrations.RunPython(backfill_video_fields, migrations.RunPython.noop),
+    ]
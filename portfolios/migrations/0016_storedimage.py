@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0015_portfolioitem_video_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('source_hash', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('file', models.FileField(unique=True, upload_to='images/')),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.PositiveIntegerField(db_index=True, default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
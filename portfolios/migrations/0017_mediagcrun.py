@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 16:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0016_storedimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaGcRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'กำลังตรวจ'), ('done', 'เสร็จแล้ว'), ('failed', 'ผิดพลาด')], default='running', max_length=10)),
+                ('dry_run', models.BooleanField(default=False)),
+                ('quarantine', models.CharField(blank=True, max_length=255)),
+                ('last_name', models.CharField(blank=True, max_length=255)),
+                ('files_scanned', models.PositiveIntegerField(default=0)),
+                ('bytes_scanned', models.PositiveBigIntegerField(default=0)),
+                ('orphans', models.PositiveIntegerField(default=0)),
+                ('bytes_reclaimed', models.PositiveBigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 17:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0017_mediagcrun'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='portfolioimage',
+            name='image_status',
+            field=models.CharField(choices=[('uploading', 'กำลังอัปโหลด'), ('pending', 'รอประมวลผล'), ('processing', 'กำลังประมวลผล'), ('ready', 'พร้อมใช้งาน'), ('failed', 'ผิดพลาด')], db_index=True, default='ready', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='portfolioitem',
+            name='cover_image_status',
+            field=models.CharField(choices=[('uploading', 'กำลังอัปโหลด'), ('pending', 'รอประมวลผล'), ('processing', 'กำลังประมวลผล'), ('ready', 'พร้อมใช้งาน'), ('failed', 'ผิดพลาด')], db_index=True, default='ready', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ImageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('upload_length', models.PositiveBigIntegerField()),
+                ('upload_offset', models.PositiveBigIntegerField(default=0)),
+                ('sha256', models.CharField(max_length=64)),
+                ('file', models.FileField(db_index=True, upload_to='uploads/')),
+                ('file_status', models.CharField(choices=[('uploading', 'กำลังอัปโหลด'), ('pending', 'รอประมวลผล'), ('processing', 'กำลังประมวลผล'), ('ready', 'พร้อมใช้งาน'), ('failed', 'ผิดพลาด')], db_index=True, default='uploading', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0018_imageupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfexportjob',
+            name='base_url',
+            field=models.URLField(blank=True),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.db.models.fields.files import FieldFile
+
+
+# ==========================================
+# Dirty Field Tracking: รู้ว่า field ไหนถูกแก้ โดยไม่ต้อง SELECT ค่าเก่าจาก DB
+# ==========================================
+
+class DirtyFieldsMixin:
+    """
+    Mixin สำหรับ Model ที่ต้องการรู้ว่า field ไหนเปลี่ยนไปจากค่าที่โหลดมาจาก DB
+    - จำค่าของทุก field ตอนโหลด (from_db) / หลัง save / หลัง refresh_from_db
+    - field ที่ถูก defer (.only() / .defer()) จะไม่ถูกจำ และถือว่าเปลี่ยนถ้ามีการตั้งค่าให้มัน
+    - ตอน save() แถวที่มีอยู่แล้ว จะเขียนลง DB เฉพาะ field ที่เปลี่ยน (update_fields)
+      ถ้าไม่มี field ไหนเปลี่ยนเลย จะไม่ยิง UPDATE
+    ต้องวางไว้ก่อน models.Model: class Foo(DirtyFieldsMixin, models.Model)
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_fields(fields)
+
+    def _tracked_value(self, field):
+        value = self.__dict__[field.attname]
+        if isinstance(value, FieldFile):
+            # ไฟล์ที่ยังไม่ได้บันทึก (เพิ่งอัปโหลด) ถือว่าเปลี่ยนเสมอ แม้ชื่อไฟล์จะซ้ำกับของเดิม
+            # (FieldFile เทียบกับ str ด้วยชื่อไฟล์ จึงต้องคืนค่าที่ไม่เท่ากับอะไรเลยแทน)
+            return value.name if value._committed else object()
+        return value
+
+    def _snapshot_fields(self, fields=None):
+        """จำค่าปัจจุบันของ field ที่โหลดไว้ (fields=None คือทุก field ที่ไม่ได้ถูก defer)"""
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+
+        if fields is None:
+            tracked = self._meta.concrete_fields
+        else:
+            tracked = [self._meta.get_field(name) for name in fields]
+
+        for field in tracked:
+            if field.attname in self.__dict__:
+                self._loaded_values[field.attname] = self._tracked_value(field)
+
+    def get_dirty_fields(self):
+        """รายชื่อ field ที่ค่าไม่ตรงกับใน DB (แถวใหม่ที่ยังไม่ได้ save จะถือว่าทุก field เปลี่ยน)"""
+        concrete_fields = self._meta.concrete_fields
+        if self._state.adding:
+            return {field.name for field in concrete_fields}
+
+        loaded = getattr(self, '_loaded_values', {})
+        dirty = set()
+        for field in concrete_fields:
+            if field.attname not in self.__dict__:
+                continue  # ถูก defer และยังไม่ได้แตะ
+            if field.attname not in loaded or loaded[field.attname] != self._tracked_value(field):
+                dirty.add(field.name)
+        return dirty
+
+    def is_dirty(self, field_name):
+        return field_name in self.get_dirty_fields()
+
+    def previous_value(self, field_name):
+        """ค่าของ field ตอนโหลดจาก DB (None ถ้าไม่ได้โหลด field นั้นมา) ใช้ได้จนกว่าจะ save เสร็จ"""
+        field = self._meta.get_field(field_name)
+        return getattr(self, '_loaded_values', {}).get(field.attname)
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and hasattr(self, '_loaded_values')
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            dirty = self.get_dirty_fields()
+            if dirty:
+                # field auto_now (เช่น updated_at) ต้องถูกอัปเดตทุกครั้งที่มีการแก้ไข
+                dirty |= {f.name for f in self._meta.concrete_fields if getattr(f, 'auto_now', False)}
+            kwargs['update_fields'] = dirty
+
+        super().save(*args, **kwargs)
+        self._snapshot_fields(kwargs.get('update_fields'))
@@ -1,35 +1,96 @@
-import sys
 from io import BytesIO
-from PIL import Image
+from PIL import Image, ImageOps
+from django.core.exceptions import ValidationError
+from django.core.files.images import get_image_dimensions
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings 
+import re
 from urllib.parse import urlparse, parse_qs
 
+from .indexes import DescNullsLastIndex
+from .instrumentation import timed
+from .mixins import DirtyFieldsMixin
+
 # ==========================================
 # 1. ฟังก์ชันช่วยบีบอัดรูปภาพ (Utility Function)
 # ==========================================
+class ImageTooLarge(ValueError):
+    """รูปต้นฉบับใหญ่เกินเพดานที่ตั้งไว้ (settings.IMAGE_MAX_PIXELS / IMAGE_MAX_DECODE_BYTES)"""
+
+
+def open_bounded_image(source, max_size):
+    """
+    เปิดรูปภาพแบบจำกัดหน่วยความจำ
+    - เช็คจำนวน pixel จาก header ก่อน (ยังไม่ถอดรหัสรูป)
+    - JPEG: สั่ง draft ให้ decoder ย่อรูปลง 1/2, 1/4, 1/8 ตั้งแต่ตอนถอดรหัส
+      (รูป 48MP จะถูกถอดรหัสแค่ขนาดที่ใกล้ max_size ไม่ต้องกาง bitmap เต็มขนาดใน RAM)
+    - เช็คขนาด bitmap ที่จะถอดรหัสจริงกับเพดานหน่วยความจำ
+    """
+    img = Image.open(source)
+
+    width, height = img.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ImageTooLarge(f"รูปมีขนาด {width}x{height} pixel เกินกว่าที่รองรับ")
+
+    img.draft('RGB', max_size)
+
+    # Pillow เก็บ pixel ของรูปสี 4 bytes ต่อ pixel (RGB ก็ใช้ 4 bytes)
+    width, height = img.size
+    if width * height * 4 > settings.IMAGE_MAX_DECODE_BYTES:
+        raise ImageTooLarge(f"รูปขนาด {width}x{height} pixel ใช้หน่วยความจำเกินกว่าที่กำหนด")
+
+    return img
+
+
+def validate_image_size(image):
+    """Validator ของ ImageField: ปฏิเสธรูปที่ใหญ่เกินตั้งแต่ตอนกรอกฟอร์ม (อ่านแค่ header)"""
+    try:
+        width, height = get_image_dimensions(image)
+    except (TypeError, ValueError):
+        return  # ไฟล์ที่อ่านไม่ได้ ให้ ImageField ตรวจเอง
+    if width and height and width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            "รูปภาพมีความละเอียดสูงเกินไป (สูงสุด %(max)s ล้าน pixel)",
+            params={'max': settings.IMAGE_MAX_PIXELS // 1_000_000},
+        )
+
+
 def compress_image(uploaded_image, max_size=(1200, 1200)):
     """
     ฟังก์ชันสำหรับบีบอัดและย่อขนาดรูปภาพ
     - uploaded_image: ไฟล์รูปภาพต้นฉบับ
     - max_size: ขนาดสูงสุด (กว้าง, สูง) ที่ต้องการ (Default 1200px)
+    ย่อรูปตั้งแต่ตอนถอดรหัส (ดู open_bounded_image) และหมุนรูปตาม EXIF ของกล้อง/มือถือ
     """
     # ถ้าไม่มีรูปส่งมา ให้ข้ามไป
     if not uploaded_image:
         return None
 
-    # เปิดรูปภาพด้วย Pillow
-    img = Image.open(uploaded_image)
-    
-    # แปลงโหมดสีเป็น RGB (เผื่อไฟล์เดิมเป็น PNG ที่มีพื้นหลังโปร่งใส จะได้ Save เป็น JPEG ได้)
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
+    with timed('image'):
+        return _compress_image(uploaded_image, max_size)
+
+
+def _compress_image(uploaded_image, max_size):
+    # เปิดรูปภาพด้วย Pillow (จำกัดหน่วยความจำ)
+    img = open_bounded_image(uploaded_image, max_size)
+
+    # รูป Palette / ขาวดำ ต้องแปลงก่อนย่อ ไม่งั้น Pillow จะย่อแบบ NEAREST (ภาพแตก)
+    if img.mode in ('1', 'P'):
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
 
     # ย่อรูปภาพ (Thumbnail จะรักษาสัดส่วนภาพเดิม ไม่ให้เพี้ยน)
     # ถ้าภาพเดิมเล็กกว่า 1200px อยู่แล้ว มันจะไม่ขยาย (ภาพไม่แตก)
     img.thumbnail(max_size, Image.LANCZOS)
 
+    # หมุนรูปตาม EXIF Orientation (รูปจากมือถือมักเก็บแนวตั้งไว้ใน EXIF) ทำหลังย่อจะได้ใช้ RAM น้อย
+    img = ImageOps.exif_transpose(img)
+
+    # แปลงโหมดสีเป็น RGB (เผื่อไฟล์เดิมเป็น PNG ที่มีพื้นหลังโปร่งใส จะได้ Save เป็น JPEG ได้)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
     # เตรียม Buffer สำหรับเขียนไฟล์ใหม่
     output_io = BytesIO()
     
@@ -43,12 +104,77 @@ def compress_image(uploaded_image, max_size=(1200, 1200)):
         'ImageField',
         f"{uploaded_image.name.split('.')[0]}.jpg", # เปลี่ยนนามสกุลเป็น .jpg
         'image/jpeg',
-        sys.getsizeof(output_io),
+        output_io.getbuffer().nbytes, # ขนาดไฟล์จริง (ไม่ใช่ขนาดของ object BytesIO)
         None
     )
     
     return new_image
 
+
+def queue_image_processing(instance):
+    """
+    สั่งบีบอัดรูปที่เพิ่งอัปโหลด (+ สร้างรูปย่อสำหรับ srcset)
+    - ปกติ Background Worker (manage.py runworker) จะหยิบรูปสถานะ pending ไปทำเอง
+    - ถ้าตั้ง PROCESS_IMAGES_IN_BACKGROUND = False จะทำทันทีหลังบันทึก DB เสร็จ (สะดวกตอน dev ที่ไม่ได้เปิด Worker)
+    """
+    if settings.PROCESS_IMAGES_IN_BACKGROUND:
+        return
+    from .imaging import process_uploaded_image  # import ตรงนี้เพื่อกัน circular import
+    label = instance._meta.label
+    transaction.on_commit(lambda: process_uploaded_image(label, instance.pk))
+
+
+# ==========================================
+# วิดีโอ: แยก provider + video ID จากลิงก์ครั้งเดียวตอนบันทึก (หน้าเว็บไม่ต้อง parse URL ซ้ำทุกครั้ง)
+# ==========================================
+class VideoProvider(models.TextChoices):
+    YOUTUBE = 'youtube', 'YouTube'
+
+
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+                 'youtube-nocookie.com', 'www.youtube-nocookie.com'}
+# path ที่มี video ID เป็นส่วนที่ 2 เช่น /embed/<id>, /shorts/<id>, /live/<id>
+YOUTUBE_ID_PATHS = ('embed', 'shorts', 'live', 'v')
+YOUTUBE_ID_RE = re.compile(r'[A-Za-z0-9_-]{11}')
+
+
+def parse_video_link(url):
+    """
+    แยก (provider, video_id) จากลิงก์วิดีโอ
+    คืนค่า ('', '') ถ้าไม่มีลิงก์ หรือเป็นลิงก์ที่ไม่รองรับ (หน้าเว็บจะแสดงเป็นลิงก์ธรรมดาแทน)
+    """
+    if not url:
+        return '', ''
+
+    try:
+        url_data = urlparse(url)
+        hostname = (url_data.hostname or '').lower()
+    except ValueError:
+        return '', ''
+
+    video_id = None
+    if hostname == 'youtu.be':
+        video_id = url_data.path.strip('/')
+    elif hostname in YOUTUBE_HOSTS:
+        parts = url_data.path.strip('/').split('/')
+        if parts[0] == 'watch':
+            video_id = parse_qs(url_data.query).get('v', [None])[0]
+        elif parts[0] in YOUTUBE_ID_PATHS and len(parts) > 1:
+            video_id = parts[1]
+
+    if video_id and YOUTUBE_ID_RE.fullmatch(video_id):
+        return VideoProvider.YOUTUBE, video_id
+    return '', ''
+
+
+class ImageStatus(models.TextChoices):
+    """สถานะการประมวลผลรูปที่อัปโหลด (เก็บไว้ใน field ชื่อ <ชื่อ field รูป>_status)"""
+    UPLOADING = 'uploading', 'กำลังอัปโหลด'  # ImageUpload ที่ยังส่ง chunk มาไม่ครบ
+    PENDING = 'pending', 'รอประมวลผล'
+    PROCESSING = 'processing', 'กำลังประมวลผล'
+    READY = 'ready', 'พร้อมใช้งาน'
+    FAILED = 'failed', 'ผิดพลาด'
+
 # ==========================================
 # 2. Models
 # ==========================================
@@ -64,18 +190,25 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class PortfolioItem(models.Model):
+class PortfolioItem(DirtyFieldsMixin, models.Model):
     """ชิ้นงานแต่ละชิ้น"""
-    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='portfolio_items')
+    # ไม่ต้องมี index เดี่ยว: index ผสมใน Meta ขึ้นต้นด้วย owner อยู่แล้ว
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='portfolio_items',
+                              db_index=False)
     title = models.CharField(max_length=200)
     description = models.TextField(help_text="รายละเอียดของผลงาน")
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     
-    # รูปภาพปก
-    cover_image = models.ImageField(upload_to='portfolio_covers/')
+    # รูปภาพปก (index ไว้หาเจ้าของไฟล์ตอนเสิร์ฟ /media/)
+    cover_image = models.ImageField(upload_to='portfolio_covers/', validators=[validate_image_size], db_index=True)
+    cover_image_status = models.CharField(max_length=10, choices=ImageStatus.choices, default=ImageStatus.READY, db_index=True)
     
     # เพิ่ม Field สำหรับเก็บลิงก์วิดีโอ
     video_link = models.URLField(blank=True, null=True, help_text="รองรับลิงก์จาก YouTube")
+    # แยกจาก video_link ตอน save() (ว่างถ้าไม่มีวิดีโอ / ลิงก์ที่ไม่รองรับ) index ไว้หาผลงานที่มีวิดีโอ
+    video_provider = models.CharField(max_length=10, choices=VideoProvider.choices, blank=True, default='',
+                                      db_index=True, editable=False)
+    video_id = models.CharField(max_length=20, blank=True, default='', db_index=True, editable=False)
 
 
     # วันที่
@@ -87,79 +220,326 @@ class PortfolioItem(models.Model):
         return self.title
     
     class Meta:
-        ordering = ['-event_date', '-created_at'] # เรียงจากใหม่ไปเก่า
+        # เรียงจากใหม่ไปเก่า (ผลงานที่ไม่ระบุวันที่อยู่ท้าย) ตรงกับลำดับใน index ด้านล่าง
+        ordering = [F('event_date').desc(nulls_last=True), F('created_at').desc(), F('id').desc()]
+        indexes = [
+            # Dashboard / PDF: ผลงานของ owner เรียงใหม่ -> เก่า (ใช้แทน index เดี่ยวของ owner ด้วย)
+            DescNullsLastIndex(fields=['owner', '-event_date', '-created_at', '-id'], name='item_owner_date_idx'),
+            # หน้า Public: ผลงานของ owner แยกตามหมวดหมู่ (Window หน้าแรก / ปุ่มดูเพิ่มเติม)
+            DescNullsLastIndex(fields=['owner', 'category', '-event_date', '-created_at', '-id'],
+                               name='item_owner_category_date_idx'),
+            # fingerprint ของ PDF: COUNT + MAX(updated_at) อ่านจาก index อย่างเดียว
+            models.Index(fields=['owner', 'updated_at'], name='item_owner_updated_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        # ตรวจสอบว่ามีรูปภาพหรือไม่
-        if self.cover_image:
-            # กรณีเป็นการแก้ไข (มี pk แล้ว)
-            if self.pk:
-                try:
-                    old_instance = PortfolioItem.objects.get(pk=self.pk)
-                    # ถ้ารูปใหม่ ไม่ตรงกับรูปเก่า แสดงว่ามีการอัปโหลดใหม่ -> ให้บีบอัด
-                    if old_instance.cover_image != self.cover_image:
-                        self.cover_image = compress_image(self.cover_image)
-                except PortfolioItem.DoesNotExist:
-                    pass # กรณีหาไม่เจอ (เผื่อไว้)
-            
-            # กรณีสร้างใหม่ (ยังไม่มี pk) -> บีบอัดเลย
-            else:
-                self.cover_image = compress_image(self.cover_image)
+        # มีการอัปโหลดรูปใหม่ (สร้างใหม่ หรือเปลี่ยนรูป) -> เช็คจากค่าที่โหลดไว้ ไม่ต้อง SELECT ซ้ำ
+        new_upload = self.is_dirty('cover_image') and bool(self.cover_image)
+
+        # เก็บไฟล์ต้นฉบับไว้ก่อน ให้ Worker บีบอัดทีหลัง (request ไม่ต้องรอ)
+        # ยกเว้นไฟล์ใน images/ ที่บีบอัดไว้แล้ว (เช่นรูปจากการอัปโหลดทีละ chunk ที่ประมวลผลเสร็จก่อนส่งฟอร์ม)
+        if new_upload and StoredImage.is_stored_name(self.cover_image.name):
+            self.cover_image_status = ImageStatus.READY
+            new_upload = False
+        elif new_upload:
+            self.cover_image_status = ImageStatus.PENDING
+
+        # ลิงก์วิดีโอเปลี่ยน -> แยก video ID ใหม่ (บันทึกไปพร้อมกันใน UPDATE เดียว)
+        if self.is_dirty('video_link'):
+            self.update_video_fields()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'video_link' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'video_provider', 'video_id'}
 
         super().save(*args, **kwargs)
 
-    #  เพิ่มฟังก์ชันแปลงลิงก์ YouTube ให้เป็น Embed URL
+        if new_upload:
+            queue_image_processing(self)
+
+    def update_video_fields(self):
+        """ตั้งค่า video_provider / video_id จาก video_link (ใช้ตอนสร้างด้วย bulk_create ที่ไม่ผ่าน save())"""
+        self.video_provider, self.video_id = parse_video_link(self.video_link)
+
+    # Embed URL ของ YouTube (ใช้ video ID ที่เก็บไว้ ไม่ต้อง parse ลิงก์ตอน render)
     def get_embed_url(self):
-        if not self.video_link:
+        if self.video_provider != VideoProvider.YOUTUBE:
             return None
+        # ใช้ youtube-nocookie + เพิ่ม params ป้องกัน error
+        return f"https://www.youtube-nocookie.com/embed/{self.video_id}?rel=0&modestbranding=1"
 
-        try:
-            url_data = urlparse(self.video_link)
-            video_id = None
-
-            if url_data.hostname == 'youtu.be':
-                video_id = url_data.path.lstrip('/')
-            elif url_data.hostname in ['www.youtube.com', 'youtube.com']:
-                if url_data.path == '/watch':
-                    video_id = parse_qs(url_data.query).get('v', [None])[0]
-                elif url_data.path.startswith('/embed/'):
-                    video_id = url_data.path.split('/')[2]
-                elif url_data.path.startswith('/shorts/'):
-                    video_id = url_data.path.split('/')[2]
-
-            if video_id:
-                # ใช้ youtube-nocookie + เพิ่ม params ป้องกัน error
-                return (
-                    f"https://www.youtube-nocookie.com/embed/{video_id}"
-                    "?rel=0&modestbranding=1"
-                )
-
-        except Exception as e:
-            print(f"YouTube URL error: {e}")
-
-        return None
+    def get_video_poster_url(self):
+        """รูปหน้าปกของวิดีโอ (แสดงแทน iframe จนกว่าผู้ชมจะกดเล่น)"""
+        if self.video_provider != VideoProvider.YOUTUBE:
+            return None
+        return f"https://i.ytimg.com/vi/{self.video_id}/hqdefault.jpg"
 
 
 # for upload many image
-class PortfolioImage(models.Model):
+class PortfolioImage(DirtyFieldsMixin, models.Model):
     """รูปภาพเพิ่มเติมสำหรับผลงาน (Gallery)"""
     portfolio_item = models.ForeignKey(PortfolioItem, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='portfolio_gallery/')
+    image = models.ImageField(upload_to='portfolio_gallery/', validators=[validate_image_size], db_index=True)
+    image_status = models.CharField(max_length=10, choices=ImageStatus.choices, default=ImageStatus.READY, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"Image for {self.portfolio_item.title}"
 
     def save(self, *args, **kwargs):
         # ใช้ Logic เดียวกันกับ PortfolioItem
-        if self.image:
-            if self.pk:
-                try:
-                    old_instance = PortfolioImage.objects.get(pk=self.pk)
-                    if old_instance.image != self.image:
-                        self.image = compress_image(self.image)
-                except PortfolioImage.DoesNotExist:
-                    pass
-            else:
-                self.image = compress_image(self.image)
-
-        super().save(*args, **kwargs)
\ No newline at end of file
+        new_upload = self.is_dirty('image') and bool(self.image)
+
+        if new_upload and StoredImage.is_stored_name(self.image.name):
+            self.image_status = ImageStatus.READY
+            new_upload = False
+        elif new_upload:
+            self.image_status = ImageStatus.PENDING
+
+        super().save(*args, **kwargs)
+
+        if new_upload:
+            queue_image_processing(self)
+
+class ImageDerivative(models.Model):
+    """รูปย่อหลายขนาด/หลาย format ของรูปปกและรูป Gallery (ใช้ทำ srcset ให้ browser เลือกขนาดที่พอดี)"""
+    # path ของรูปต้นฉบับใน Storage เช่น portfolio_covers/abc.jpg
+    source = models.CharField(max_length=255, db_index=True)
+    width = models.PositiveSmallIntegerField()
+    format = models.CharField(max_length=4)  # 'webp' หรือ 'jpeg'
+    file = models.ImageField(upload_to='derivatives/', db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'width', 'format'], name='unique_image_derivative'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} @{self.width}w ({self.format})"
+
+
+# โฟลเดอร์ของไฟล์รูปที่ตั้งชื่อตาม hash ของเนื้อหา เช่น images/ab/abcdef....jpg
+STORED_IMAGE_DIR = 'images/'
+
+
+class StoredImage(models.Model):
+    """
+    ไฟล์รูปที่เก็บตาม SHA-256 ของเนื้อหา (รูปเดียวกันเก็บไฟล์เดียว ใช้ร่วมกันได้หลายที่)
+    อ้างถึงด้วยชื่อไฟล์จาก PortfolioItem.cover_image / PortfolioImage.image / Profile.avatar
+    refcount = จำนวนแถวที่อ้างถึงอยู่ (0 = ไม่มีใครใช้แล้ว ลบทิ้งได้)
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    # hash ของไฟล์ต้นฉบับก่อนบีบอัด: อัปโหลดรูปเดิมซ้ำจะใช้ไฟล์นี้เลยโดยไม่ต้องบีบอัดใหม่
+    source_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    file = models.FileField(upload_to=STORED_IMAGE_DIR, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.file.name} ({self.refcount} refs)"
+
+    @staticmethod
+    def is_stored_name(name):
+        return bool(name) and name.startswith(STORED_IMAGE_DIR)
+
+    @classmethod
+    def retain(cls, name, count=1):
+        """มีแถวอ้างถึงไฟล์ name เพิ่มขึ้น (ชื่อไฟล์แบบเดิมที่ไม่ได้อยู่ใน images/ ไม่ต้องนับ)"""
+        if cls.is_stored_name(name):
+            cls.objects.filter(file=name).update(refcount=F('refcount') + count)
+
+    @classmethod
+    def release(cls, name):
+        if cls.is_stored_name(name):
+            cls.objects.filter(file=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+
+
+class PortfolioQrCode(models.Model):
+    """QR Code ลิงก์หน้า Public Portfolio (สร้างครั้งเดียวแล้วเก็บไว้ สร้างใหม่เมื่อ username หรือโดเมนเปลี่ยน)"""
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='qr_code')
+
+    # URL ที่อยู่ใน QR Code ตอนสร้าง ถ้าไม่ตรงกับ URL ปัจจุบันแปลว่าต้องสร้างใหม่
+    target_url = models.URLField(max_length=300)
+    png = models.ImageField(upload_to='qr_codes/')
+    svg = models.FileField(upload_to='qr_codes/')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"QR Code for {self.owner}"
+
+
+# ==========================================
+# 3. Background Jobs
+# ==========================================
+
+class PdfExportJob(models.Model):
+    """งานสร้างไฟล์ PDF Portfolio ที่รันใน Background Worker (manage.py runworker)"""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'รอคิว'
+        RUNNING = 'running', 'กำลังสร้าง'
+        DONE = 'done', 'เสร็จแล้ว'
+        FAILED = 'failed', 'ผิดพลาด'
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='pdf_export_jobs')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True)
+
+    # ลายนิ้วมือของข้อมูลที่ใช้สร้าง PDF (ถ้าข้อมูลไม่เปลี่ยน ใช้ไฟล์เดิมได้เลยไม่ต้อง render ใหม่)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+    # URL หน้าแรกของเว็บตอนสั่งงาน (qr.site_base_url) Worker ไม่มี request จึงใช้ค่านี้สร้างลิงก์ / QR Code
+    base_url = models.URLField(blank=True)
+
+    file = models.FileField(upload_to='pdf_exports/', blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"PDF export #{self.pk} ({self.owner}) - {self.status}"
+
+    @property
+    def is_active(self):
+        """ยังอยู่ในคิวหรือกำลังสร้างอยู่"""
+        return self.status in (self.Status.PENDING, self.Status.RUNNING)
+
+
+# ==========================================
+# 4. สถิติผลงานของแต่ละ User (อัปเดตทีละนิดตอน save/delete ไม่ต้อง COUNT ใหม่ทุกครั้ง)
+# ==========================================
+
+class PortfolioStats(models.Model):
+    """จำนวนผลงาน / รูป และเวลาที่แก้ไขล่าสุดของ user (ดูแลโดย portfolios.stats)"""
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='portfolio_stats')
+    item_count = models.PositiveIntegerField(default=0)
+    image_count = models.PositiveIntegerField(default=0)  # รูป Gallery (ไม่รวมรูปปก)
+    last_updated = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.owner} ({self.item_count} items)"
+
+
+class CategoryStats(models.Model):
+    """จำนวนผลงานของ user ในแต่ละหมวดหมู่ (ผลงานที่ไม่มีหมวดหมู่ = item_count ทั้งหมด - ผลรวมของตารางนี้)"""
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    item_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'category'], name='unique_category_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} / {self.category}: {self.item_count}"
+
+
+
+# ==========================================
+# 5. Import ผลงานจำนวนมากจากไฟล์ ZIP (manage.py import_portfolios)
+# ==========================================
+
+class PortfolioImportRun(models.Model):
+    """
+    การ import ไฟล์ ZIP หนึ่งไฟล์ (แยกด้วย sha256 ของไฟล์)
+    lines_done คือ checkpoint: บรรทัดของ manifest ที่บันทึกเสร็จแล้ว (อัปเดตใน transaction เดียวกับผลงาน)
+    ถ้าพังกลางทาง สั่งคำสั่งเดิมอีกครั้งจะทำต่อจากบรรทัดถัดไป
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = 'running', 'กำลัง import'
+        DONE = 'done', 'เสร็จแล้ว'
+        FAILED = 'failed', 'ผิดพลาด'
+
+    archive_name = models.CharField(max_length=255)
+    archive_sha256 = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+
+    lines_done = models.PositiveIntegerField(default=0)
+    items_created = models.PositiveIntegerField(default=0)
+    images_created = models.PositiveIntegerField(default=0)
+    # บรรทัดที่ข้ามไป [{"line": 12, "error": "..."}]
+    errors = models.JSONField(default=list, blank=True)
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import {self.archive_name} - {self.status} ({self.lines_done} lines)"
+
+
+# ==========================================
+# 6. ล้างไฟล์ Media ที่ไม่มีแถวไหนอ้างถึงแล้ว (manage.py gc_media)
+# ==========================================
+
+class MediaGcRun(models.Model):
+    """
+    การไล่ตรวจไฟล์ใน MEDIA_ROOT หนึ่งรอบ (เรียงตามชื่อไฟล์)
+    last_name คือ checkpoint: ไฟล์สุดท้ายของ batch ที่ตรวจ/ลบเสร็จแล้ว
+    ถ้าพังกลางทาง สั่งคำสั่งเดิม (ตัวเลือกเดิม) อีกครั้งจะทำต่อจากไฟล์ถัดไป
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = 'running', 'กำลังตรวจ'
+        DONE = 'done', 'เสร็จแล้ว'
+        FAILED = 'failed', 'ผิดพลาด'
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+    dry_run = models.BooleanField(default=False)
+    # โฟลเดอร์ที่ย้ายไฟล์ไปกักไว้แทนการลบ (ว่าง = ลบทิ้ง)
+    quarantine = models.CharField(max_length=255, blank=True)
+
+    last_name = models.CharField(max_length=255, blank=True)
+    files_scanned = models.PositiveIntegerField(default=0)
+    bytes_scanned = models.PositiveBigIntegerField(default=0)
+    orphans = models.PositiveIntegerField(default=0)
+    bytes_reclaimed = models.PositiveBigIntegerField(default=0)
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Media GC #{self.pk} - {self.status} ({self.files_scanned} files)"
+
+
+
+# ==========================================
+# 7. อัปโหลดรูปทีละ chunk ก่อนส่งฟอร์ม (โปรโตคอล tus ดู portfolios/uploads.py)
+# ==========================================
+
+# โฟลเดอร์ของไฟล์ที่กำลังอัปโหลด / รอบีบอัด
+UPLOAD_DIR = 'uploads/'
+
+
+class ImageUpload(models.Model):
+    """
+    รูป 1 ไฟล์ที่อัปโหลดทีละ chunk (เน็ตหลุดแล้วส่งต่อจาก upload_offset ได้)
+    ได้รับครบ upload_length แล้วตรวจ SHA-256 กับที่ client แจ้งไว้ จากนั้นเข้าคิวบีบอัดเหมือนรูปที่อัปโหลดผ่านฟอร์ม
+    (file_status / file ถูกแทนด้วยไฟล์ใน images/) ฟอร์มผลงานรับ token แทนไฟล์
+    """
+    token = models.CharField(max_length=64, unique=True)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='image_uploads')
+    filename = models.CharField(max_length=255)
+    upload_length = models.PositiveBigIntegerField()
+    upload_offset = models.PositiveBigIntegerField(default=0)
+    # SHA-256 (hex) ของไฟล์ทั้งไฟล์ที่ client คำนวณไว้ ตรวจตอนได้รับ chunk สุดท้าย
+    sha256 = models.CharField(max_length=64)
+    file = models.FileField(upload_to=UPLOAD_DIR, db_index=True)
+    file_status = models.CharField(max_length=10, choices=ImageStatus.choices, default=ImageStatus.UPLOADING,
+                                   db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.upload_offset}/{self.upload_length}) - {self.file_status}"
+
+    @property
+    def is_complete(self):
+        return self.upload_offset >= self.upload_length
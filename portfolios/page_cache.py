@@ -0,0 +1,197 @@
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+
+# ==========================================
+# Full-page Cache สำหรับหน้า Public Portfolio (เฉพาะผู้ชมที่ไม่ได้ล็อกอิน)
+# ==========================================
+# key ของหน้า = รุ่น (version) ของ username นั้น + ชื่อ view + pk / query ที่ใช้
+# แก้ข้อมูลเมื่อไหร่ signal จะเปลี่ยน version ทำให้ทุกหน้าของ user นั้นหมดอายุทันที
+# (ไม่ต้องไล่ลบทีละ key)
+# ต้องใช้ Cache ที่ทุก Process ใช้ร่วมกัน (Redis / Memcached / ไฟล์ / DB): version อยู่ใน Cache เอง
+# และการแก้ข้อมูลเกิดได้ใน Process อื่น (Web Worker ตัวอื่น, runworker ที่บีบอัดรูปเสร็จแล้วลบไฟล์ต้นฉบับ)
+# ถ้าเป็น locmem Process นี้จะไม่เห็น version ใหม่ หน้าเก่าจะค้างได้ถึง PAGE_CACHE_TIMEOUT จึงปิด Page Cache ไปเลย
+
+KEY_PREFIX = 'pagecache'
+GLOBAL_VERSION_KEY = f'{KEY_PREFIX}:v:global'  # ข้อมูลที่ทุกหน้าใช้ร่วมกัน เช่น ชื่อหมวดหมู่
+STATS_KEYS = {'hit': f'{KEY_PREFIX}:stats:hit', 'miss': f'{KEY_PREFIX}:stats:miss'}
+
+
+def user_version_key(username):
+    return f'{KEY_PREFIX}:v:user:{username}'
+
+
+def new_version():
+    # ใช้เวลาเป็น version (ถ้า key version ถูก cache ไล่ทิ้ง จะไม่วนกลับไปใช้เลขเดิมที่มีหน้าเก่าค้างอยู่)
+    return time.time_ns()
+
+
+def page_key(view_name, username, parts):
+    versions = cache.get_many([GLOBAL_VERSION_KEY, user_version_key(username)])
+    global_version = versions.get(GLOBAL_VERSION_KEY)
+    user_version = versions.get(user_version_key(username))
+
+    if global_version is None:
+        global_version = new_version()
+        cache.add(GLOBAL_VERSION_KEY, global_version, None)
+    if user_version is None:
+        user_version = new_version()
+        cache.add(user_version_key(username), user_version, None)
+
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{KEY_PREFIX}:page:{global_version}:{username}:{user_version}:{view_name}:{suffix}'
+
+
+def is_anonymous_request(request):
+    """
+    ใช้ Cache เฉพาะ request ที่ไม่มี Session / Flash Message ติดมา
+    (คนที่ล็อกอินอยู่ รวมถึงเจ้าของ จะได้หน้าสดเสมอ และข้อความแจ้งเตือนของใครจะไม่ติดไปใน Cache)
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    return not any(name in request.COOKIES for name in (settings.SESSION_COOKIE_NAME, 'messages'))
+
+
+def record(outcome):
+    key = STATS_KEYS[outcome]
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # key หายไประหว่าง add กับ incr (ถูกไล่ออกจาก Cache) เริ่มนับใหม่
+        cache.set(key, 1, None)
+
+
+def page_cache_stats():
+    """ตัวนับ Hit / Miss ของ Full-page Cache"""
+    counts = cache.get_many(list(STATS_KEYS.values()))
+    hits = counts.get(STATS_KEYS['hit'], 0)
+    misses = counts.get(STATS_KEYS['miss'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 3) if total else None,
+    }
+
+
+def process_local_cache():
+    """Cache แยกกันในแต่ละ Process (การล้าง Cache ของ Process หนึ่งไม่ไปถึง Process อื่น)"""
+    return isinstance(caches['default'], LocMemCache)
+
+
+def page_cache_enabled():
+    """Page Cache ทำงานเฉพาะเมื่อ Cache ใช้ร่วมกันทุก Process (ดู checks.check_page_cache_backend)"""
+    return not process_local_cache()
+
+
+def mark_cacheable(response):
+    """view เรียกเพื่อบอกว่าหน้านี้เก็บลง Cache ได้ (เรียกเฉพาะตอนเจ้าของเปิด Public ไว้)"""
+    response.public_page_cacheable = True
+    return response
+
+
+def lookup_page(request, view_name, username, kwargs, query_params):
+    """คืนค่า (key ของหน้านี้, response จาก Cache หรือ None ถ้ายังไม่มี)"""
+    parts = [kwargs[name] for name in sorted(kwargs)]
+    parts += [request.GET.get(name, '') for name in query_params]
+    key = page_key(view_name, username, parts)
+
+    cached = cache.get(key)
+    if cached is None:
+        record('miss')
+        return key, None
+
+    record('hit')
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'HIT'
+    patch_vary_headers(response, ['Cookie'])
+    return key, response
+
+
+def store_page(key, response):
+    """เก็บหน้าที่ render ใหม่ลง Cache (ถ้า view อนุญาต)"""
+    if (response.status_code == 200 and getattr(response, 'public_page_cacheable', False)
+            and not response.cookies and not getattr(response, 'streaming', False)):
+        cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+    response['X-Page-Cache'] = 'MISS'
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def bypass_page(response):
+    response['X-Page-Cache'] = 'BYPASS'
+    return response
+
+
+def cache_public_page(view_name, query_params=()):
+    """
+    Decorator สำหรับ view หน้า Public ที่รับ username (และอาจมี pk)
+    - ผู้ชมที่ไม่ได้ล็อกอิน: ส่งหน้าจาก Cache ถ้ามี / ถ้าไม่มี render แล้วเก็บไว้
+    - เก็บลง Cache เฉพาะหน้าที่ view เรียก mark_cacheable() (หน้า Private จะไม่ถูกเก็บเด็ดขาด)
+    - query_params: ชื่อ GET parameter ที่มีผลกับเนื้อหา (ตัวอื่นเช่น utm_* จะไม่ทำให้ key แตก)
+    - ใช้ได้ทั้ง view แบบ sync และ async
+    - Cache เป็น locmem: ไม่ใช้ Page Cache เลย (BYPASS ทุก request)
+    สถานะจะอยู่ใน header X-Page-Cache: HIT / MISS / BYPASS
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, username, **kwargs):
+                if not is_anonymous_request(request) or not page_cache_enabled():
+                    return bypass_page(await view(request, username, **kwargs))
+
+                # Cache API ของ Django เป็น sync อยู่ข้างใน ส่งไปทำใน Thread ทีเดียวทั้งชุด (ไม่ใช่ทีละคำสั่ง)
+                key, response = await sync_to_async(lookup_page)(request, view_name, username, kwargs, query_params)
+                if response is not None:
+                    return response
+                response = await view(request, username, **kwargs)
+                return await sync_to_async(store_page)(key, response)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, username, **kwargs):
+            if not is_anonymous_request(request) or not page_cache_enabled():
+                return bypass_page(view(request, username, **kwargs))
+
+            key, response = lookup_page(request, view_name, username, kwargs, query_params)
+            if response is not None:
+                return response
+            return store_page(key, view(request, username, **kwargs))
+        return wrapper
+    return decorator
+
+
+# ==========================================
+# Invalidation (เรียกจาก signals)
+# ==========================================
+
+def invalidate_username(*usernames):
+    """ทำให้ทุกหน้าที่ Cache ไว้ของ username เหล่านี้หมดอายุ (หลัง transaction commit)"""
+    usernames = [name for name in usernames if name]
+    if not usernames:
+        return
+
+    def bump():
+        version = new_version()
+        cache.set_many({user_version_key(name): version for name in usernames}, None)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_user(user_id):
+    username = get_user_model().objects.filter(pk=user_id).values_list('username', flat=True).first()
+    invalidate_username(username)
+
+
+def invalidate_all():
+    transaction.on_commit(lambda: cache.set(GLOBAL_VERSION_KEY, new_version(), None))
@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import mimetypes
+import time
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import unquote, urlsplit
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.template.loader import get_template, render_to_string
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+from .instrumentation import timed
+from .models import Category, PortfolioItem, PortfolioImage
+from .qr import get_qr_code, public_portfolio_url, site_base_url
+
+logger = logging.getLogger(__name__)
+
+PDF_TEMPLATE_NAME = 'portfolios/pdf_template.html'
+PDF_STYLESHEET_NAME = 'portfolios/pdf_template.css'
+
+
+# ==========================================
+# 1. URL Fetcher: โหลดรูป/ไฟล์จาก Storage โดยตรง ไม่ยิง HTTP กลับมาที่ Server ตัวเอง
+# ==========================================
+
+class LocalUrlFetcher:
+    """
+    url_fetcher สำหรับ WeasyPrint
+    - URL ที่ขึ้นต้นด้วย MEDIA_URL / STATIC_URL จะอ่านไฟล์จาก Storage โดยตรง
+    - ไฟล์ที่โหลดแล้วจะ cache ไว้ตลอดการ render หนึ่งครั้ง (รูปซ้ำไม่ต้องอ่านใหม่)
+    - URL ภายนอกจะถูกปฏิเสธ ยกเว้น host ที่อยู่ใน settings.PDF_FETCH_ALLOWED_HOSTS
+    """
+
+    def __init__(self, base_url):
+        self.base_origin = urlsplit(base_url)[:2]
+        self.allowed_hosts = set(settings.PDF_FETCH_ALLOWED_HOSTS)
+        self.cache = {}
+
+    def __call__(self, url, *args, **kwargs):
+        if url.startswith('data:'):
+            return default_url_fetcher(url, *args, **kwargs)
+
+        if url not in self.cache:
+            self.cache[url] = self.fetch(url, *args, **kwargs)
+
+        # WeasyPrint จะแก้ dict ที่ได้กลับไป จึงต้องส่งสำเนา
+        return dict(self.cache[url])
+
+    def fetch(self, url, *args, **kwargs):
+        parts = urlsplit(url)
+
+        if parts.hostname in self.allowed_hosts:
+            result = default_url_fetcher(url, *args, **kwargs)
+            # อ่านเก็บไว้เป็น bytes เพื่อให้ cache ใช้ซ้ำได้
+            if 'file_obj' in result:
+                file_obj = result.pop('file_obj')
+                result['string'] = file_obj.read()
+                file_obj.close()
+            return result
+
+        if (parts.scheme, parts.netloc) == self.base_origin or not parts.netloc:
+            path = unquote(parts.path)
+            if path.startswith(settings.MEDIA_URL):
+                name = path[len(settings.MEDIA_URL):]
+                with default_storage.open(name, 'rb') as f:
+                    return self.result(name, f.read())
+            if path.startswith(settings.STATIC_URL):
+                name = path[len(settings.STATIC_URL):]
+                return self.result(name, self.read_static(name))
+
+        raise ValueError(f"PDF ไม่อนุญาตให้โหลด URL นี้: {url}")
+
+    def read_static(self, name):
+        # Production: ไฟล์อยู่ใน STATIC_ROOT (หลัง collectstatic) / Dev: หาจาก static ของแต่ละ app
+        if staticfiles_storage.exists(name):
+            with staticfiles_storage.open(name, 'rb') as f:
+                return f.read()
+        path = finders.find(name)
+        if not path:
+            raise FileNotFoundError(name)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def result(self, name, data):
+        return {
+            'string': data,
+            'mime_type': mimetypes.guess_type(name)[0],
+            'filename': name.rsplit('/', 1)[-1],
+        }
+
+
+# ==========================================
+# 2. Fingerprint สำหรับ Cache ไฟล์ PDF
+# ==========================================
+
+def template_source(name):
+    return get_template(name).template.source
+
+
+@lru_cache(maxsize=None)
+def pdf_template_version():
+    """hash ของ pdf_template.html + stylesheet (แก้ไฟล์ไหนก็ตาม PDF เก่าใน cache จะใช้ไม่ได้ทันที)"""
+    source = template_source(PDF_TEMPLATE_NAME) + template_source(PDF_STYLESHEET_NAME)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+
+def portfolio_fingerprint(user, base_url=None):
+    """
+    สร้างลายนิ้วมือของทุกข้อมูลที่ใช้ใน PDF ของ user
+    - ผลงาน: จำนวน + updated_at ล่าสุด
+    - รูป Gallery: จำนวน + updated_at ล่าสุด
+    - หมวดหมู่ที่ผลงานใช้ (id + ชื่อ): เปลี่ยนชื่อหมวดหมู่ไม่ได้แก้ updated_at ของผลงาน แต่ชื่อพิมพ์อยู่ใน PDF
+    - ข้อมูล User / Profile ที่แสดงในหน้าปก
+    - เวอร์ชันของ template และ URL ที่อยู่ใน QR Code (บน base_url เดียวกับที่ใช้ render)
+    ถ้าข้อมูลเหล่านี้ไม่เปลี่ยน PDF ที่ได้ก็เหมือนเดิม ใช้ไฟล์เดิมได้เลย
+    """
+    items = PortfolioItem.objects.filter(owner=user).aggregate(count=Count('id'), last=Max('updated_at'))
+    images = PortfolioImage.objects.filter(portfolio_item__owner=user).aggregate(count=Count('id'), last=Max('updated_at'))
+    categories = list(
+        Category.objects.filter(portfolioitem__owner=user).distinct().order_by('id').values_list('id', 'name')
+    )
+
+    try:
+        profile = user.profile
+        profile_parts = [profile.avatar.name, profile.bio, profile.github_link, profile.updated_at]
+    except Exception:
+        profile_parts = []
+
+    parts = [
+        pdf_template_version(), public_portfolio_url(user, base_url),
+        user.first_name, user.last_name, user.email,
+        items['count'], items['last'], images['count'], images['last'],
+        categories, *profile_parts,
+    ]
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+# ==========================================
+# 3. ฟังก์ชันสร้างไฟล์ PDF Portfolio (ใช้ร่วมกันระหว่าง View และ Background Worker)
+# ==========================================
+
+@lru_cache(maxsize=None)
+def pdf_stylesheet():
+    """
+    (FontConfiguration, CSS) ของ pdf_template.css ที่ parse แล้ว สร้างครั้งเดียวต่อ Process
+    ฟอนต์จาก @import / @font-face โหลดเข้า FontConfiguration ตอนนี้ครั้งเดียว PDF ถัดๆ ไปไม่ต้องโหลดซ้ำ
+    """
+    font_config = FontConfiguration()
+    stylesheet = CSS(
+        string=template_source(PDF_STYLESHEET_NAME),
+        font_config=font_config,
+        url_fetcher=LocalUrlFetcher(''),
+    )
+    return font_config, stylesheet
+
+
+def render_portfolio_pdf(user, base_url=None, url_fetcher=None):
+    """
+    Render pdf_template.html ของ user แล้วคืนค่าเป็น bytes ของไฟล์ PDF
+    - base_url: ฐานสำหรับลิงก์รูปภาพและ QR Code (ค่าเริ่มต้นคือโดเมนของเว็บใน Sites framework)
+    - url_fetcher: ค่าเริ่มต้นคือ LocalUrlFetcher (อ่านรูปจาก Storage ไม่ผ่าน HTTP)
+    ไม่ต้องใช้ request จึงเรียกจาก Background Worker ได้
+    """
+    try:
+        profile = user.profile
+    except Exception:
+        profile = None
+
+    # ใช้ลำดับตั้งต้นของ Model (ใหม่ -> เก่า) ซึ่งอ่านจาก index ของ owner ได้เลยไม่ต้องเรียงใหม่
+    items = PortfolioItem.objects.filter(owner=user)
+
+    context = {
+        'user': user,
+        'profile': profile,
+        'items': items,
+        # QR Code ที่สร้างเก็บไว้แล้ว (สร้างใหม่เฉพาะตอน username / โดเมนเปลี่ยน)
+        'qr_code': get_qr_code(user, base_url),
+    }
+
+    if base_url is None:
+        base_url = site_base_url()
+
+    if url_fetcher is None:
+        url_fetcher = LocalUrlFetcher(base_url)
+
+    html_string = render_to_string(PDF_TEMPLATE_NAME, context)
+    font_config, stylesheet = pdf_stylesheet()
+    with timed('pdf'):
+        html = HTML(string=html_string, base_url=base_url, url_fetcher=url_fetcher)
+        return html.write_pdf(stylesheets=[stylesheet], font_config=font_config)
+
+
+# ==========================================
+# 4. สร้าง PDF ทีละหลายคน (manage.py render_pdfs) ใน Process Pool
+# ==========================================
+
+PdfRenderResult = namedtuple('PdfRenderResult', ['user_id', 'username', 'pdf', 'error', 'seconds'])
+
+
+def render_pdf_task(user_id):
+    """
+    (รันใน Process ลูก) สร้าง PDF ของ user 1 คน คืนค่าเป็น PdfRenderResult
+    - stylesheet / ฟอนต์ถูก parse ตอนงานแรกของ Process แล้วใช้ซ้ำ (pdf_stylesheet มี cache ต่อ Process)
+    - error ของคนหนึ่งจะถูกเก็บไว้ในผลลัพธ์ ไม่ทำให้คนอื่นใน batch ล้มไปด้วย
+    """
+    close_old_connections()
+    started = time.perf_counter()
+    username = None
+    try:
+        user = get_user_model().objects.select_related('profile').get(pk=user_id)
+        username = user.username
+        pdf = render_portfolio_pdf(user)
+    except Exception as e:
+        logger.exception("PDF render failed: user #%s", user_id)
+        return PdfRenderResult(user_id, username, None, f"{type(e).__name__}: {e}", time.perf_counter() - started)
+    return PdfRenderResult(user_id, username, pdf, None, time.perf_counter() - started)
@@ -0,0 +1,111 @@
+import qrcode
+import qrcode.image.svg
+from io import BytesIO
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+
+from .models import PortfolioQrCode
+
+
+# ==========================================
+# QR Code ลิงก์หน้า Public Portfolio (เก็บเป็นไฟล์ PNG + SVG ใช้ซ้ำได้)
+# ==========================================
+
+# โดเมนที่ Sites framework สร้างให้ตอน migrate ครั้งแรก (ยังไม่ได้ตั้งค่าโดเมนจริง)
+DEFAULT_SITE_DOMAIN = 'example.com'
+
+
+def configured_base_url():
+    """URL หน้าแรกของเว็บจากโดเมนใน Sites framework เช่น https://smafolio.com/ (None ถ้ายังเป็น example.com)"""
+    domain = Site.objects.get_current().domain
+    if domain == DEFAULT_SITE_DOMAIN:
+        return None
+    return f"{settings.SITE_URL_SCHEME}://{domain}/"
+
+
+def site_base_url(request=None):
+    """
+    URL หน้าแรกของเว็บสำหรับลิงก์เต็ม (QR Code / PDF)
+    ถ้ายังไม่ได้ตั้งโดเมนใน Sites framework ใช้โดเมนที่ผู้ใช้เปิดเข้ามา (request) แทน
+    งานที่ทำใน Background ไม่มี request: ต้องเก็บค่านี้ไว้ตอนสั่งงาน (เช่น PdfExportJob.base_url)
+    """
+    base_url = configured_base_url()
+    if base_url is None and request is not None:
+        return request.build_absolute_uri('/')
+    return base_url or f"{settings.SITE_URL_SCHEME}://{DEFAULT_SITE_DOMAIN}/"
+
+
+def public_portfolio_url(user, base_url=None):
+    """URL เต็มของหน้า Public Portfolio (ข้อมูลที่อยู่ใน QR Code)"""
+    return (base_url or site_base_url()).rstrip('/') + reverse('public_portfolio', args=[user.username])
+
+
+def build_qr(target_url):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M, # M = กู้คืนข้อมูลได้ 15% (เผื่อปริ้นท์ไม่ชัด)
+        box_size=10,
+        border=2,
+    )
+    qr.add_data(target_url)
+    qr.make(fit=True)
+    return qr
+
+
+def write_qr_files(qr_code, target_url):
+    """สร้างไฟล์ PNG + SVG ของ target_url ใส่ใน qr_code (ยังไม่บันทึกแถว)"""
+    qr = build_qr(target_url)
+
+    png_buffer = BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(png_buffer, format="PNG")
+
+    svg_buffer = BytesIO()
+    qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(svg_buffer)
+
+    qr_code.target_url = target_url
+    qr_code.png.save(f"{qr_code.owner_id}.png", ContentFile(png_buffer.getvalue()), save=False)
+    qr_code.svg.save(f"{qr_code.owner_id}.svg", ContentFile(svg_buffer.getvalue()), save=False)
+
+
+def create_qr_code(user, target_url):
+    """สร้าง QR Code แถวแรกของ user ถ้ามี request อื่นสร้างไปพร้อมกันพอดี ใช้แถวนั้นแทน"""
+    qr_code = PortfolioQrCode(owner=user)
+    write_qr_files(qr_code, target_url)
+    try:
+        with transaction.atomic():
+            qr_code.save()
+    except IntegrityError:
+        # owner เป็น OneToOne: แพ้การแข่งกัน insert ลบไฟล์ของตัวเองทิ้งแล้วใช้ของอีกฝั่ง
+        qr_code.png.delete(save=False)
+        qr_code.svg.delete(save=False)
+        return PortfolioQrCode.objects.get(owner=user)
+    return qr_code
+
+
+def get_qr_code(user, base_url=None):
+    """
+    คืนค่า PortfolioQrCode ของ user ที่ลิงก์ไปหน้า Public บน base_url (จาก site_base_url)
+    สร้างไฟล์ใหม่เฉพาะตอนที่ยังไม่เคยสร้าง หรือ URL เปลี่ยน (เปลี่ยน username / โดเมนของเว็บ)
+    ไม่ระบุ base_url และยังไม่ได้ตั้งโดเมน: ใช้ไฟล์เดิมไปก่อน (ไม่เขียนไฟล์ใหม่ไปมาระหว่างโดเมนจริงกับ example.com)
+    """
+    qr_code = PortfolioQrCode.objects.filter(owner=user).first()
+    if base_url is None:
+        base_url = configured_base_url()
+        if base_url is None and qr_code is not None:
+            return qr_code
+    target_url = public_portfolio_url(user, base_url)
+
+    if qr_code is None:
+        return create_qr_code(user, target_url)
+    if qr_code.target_url == target_url:
+        return qr_code
+
+    # ลบไฟล์ของ URL เก่าทิ้ง
+    qr_code.png.delete(save=False)
+    qr_code.svg.delete(save=False)
+    write_qr_files(qr_code, target_url)
+    qr_code.save()
+    return qr_code
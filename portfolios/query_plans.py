@@ -0,0 +1,133 @@
+import json
+import re
+from django.contrib.auth import get_user_model
+from django.db import connections
+
+from users.models import Profile
+
+from .models import PortfolioImage, PortfolioItem
+
+
+# ==========================================
+# ตรวจ Query Plan (EXPLAIN) ของ query ที่ View ยิง: ห้ามอ่านตารางใหญ่ทั้งตาราง / เรียงแถวจากตารางใหญ่เอง
+# ==========================================
+# ใช้ใน test (portfolios/tests.py) กับข้อมูลจำลองที่ seed ไว้ เพื่อจับ query ที่ index ไม่ครอบคลุม
+
+def large_tables():
+    """ตารางที่โตตามจำนวนผู้ใช้/ผลงาน ต้องเข้าถึงผ่าน index เสมอ"""
+    return {
+        get_user_model()._meta.db_table,
+        Profile._meta.db_table,
+        PortfolioItem._meta.db_table,
+        PortfolioImage._meta.db_table,
+    }
+
+
+SQLITE_ACCESS = re.compile(r'^(SCAN|SEARCH) (\S+)(?: AS (\S+))?')
+
+
+def sqlite_plan_problems(connection, sql, tables):
+    """
+    EXPLAIN QUERY PLAN ของ SQLite: แต่ละแถวคือ (id, parent, -, detail)
+    - SCAN <ตารางใหญ่> (รวม SCAN ... USING INDEX ที่อ่านทั้ง index) = อ่านทั้งตาราง
+    - USE TEMP B-TREE FOR ... ที่อยู่ระดับเดียวกับการอ่านตารางใหญ่ = เรียง/จัดกลุ่มแถวเอง (filesort)
+      (ถ้าเรียงผลลัพธ์ของ subquery ที่ถูกตัดจำนวนมาแล้ว ไม่นับเป็นปัญหา)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        rows = cursor.fetchall()
+
+    problems = []
+    large_reads = {}  # parent -> ชื่อตารางใหญ่ที่เป็นแหล่งของแถวในระดับนั้น
+    for node_id, parent, _, detail in rows:
+        match = SQLITE_ACCESS.match(detail)
+        if not match or match.group(2) not in tables:
+            continue
+        if match.group(1) == 'SCAN':
+            problems.append(f'full scan: {detail}')
+        # JOIN ด้วย primary key ได้แถวเดียวต่อแถวหลัก ไม่ใช่แหล่งของแถวที่ต้องเรียง
+        if 'PRIMARY KEY' not in detail:
+            large_reads.setdefault(parent, match.group(2))
+
+    for node_id, parent, _, detail in rows:
+        if detail.startswith('USE TEMP B-TREE') and parent in large_reads:
+            problems.append(f'sort of {large_reads[parent]}: {detail}')
+    return problems
+
+
+def postgresql_plan_problems(connection, sql, tables):
+    """
+    EXPLAIN (FORMAT JSON) ของ PostgreSQL โดยปิด seqscan / sort ไว้ก่อน
+    ถ้ายังได้ Seq Scan หรือ Sort ที่อ่านจากตารางใหญ่ตรงๆ แปลว่าไม่มี index ที่ใช้แทนได้
+    (ข้อมูล test มีน้อย ถ้าไม่ปิด planner จะเลือก Seq Scan เพราะถูกกว่าอยู่แล้ว)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+        cursor.execute('SET enable_sort = off')
+        try:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        finally:
+            cursor.execute('RESET enable_seqscan')
+            cursor.execute('RESET enable_sort')
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    problems = []
+
+    def driving_table(node):
+        """ตารางที่เป็นแหล่งของแถว (ของ JOIN คือฝั่ง outer) ถ้าเป็นตารางใหญ่"""
+        if 'Relation Name' in node:
+            return node['Relation Name'] if node['Relation Name'] in tables else None
+        if node['Node Type'] in ('Nested Loop', 'Hash Join', 'Merge Join') and node.get('Plans'):
+            return driving_table(node['Plans'][0])
+        return None
+
+    def walk(node):
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in tables:
+            problems.append(f"full scan: Seq Scan on {node['Relation Name']}")
+        if node['Node Type'] == 'Sort' and node.get('Plans'):
+            table = driving_table(node['Plans'][0])
+            if table:
+                problems.append(f"sort of {table}: Sort Key {node.get('Sort Key')}")
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return problems
+
+
+PLAN_CHECKERS = {
+    'sqlite': sqlite_plan_problems,
+    'postgresql': postgresql_plan_problems,
+}
+
+
+def supports_plan_checks(using='default'):
+    return connections[using].vendor in PLAN_CHECKERS
+
+
+def plan_problems(captured_queries, using='default'):
+    """
+    ตรวจทุก SELECT ที่ยุ่งกับตารางใหญ่ (captured_queries จาก CaptureQueriesContext)
+    คืนค่าเป็น list ของ (sql, [ปัญหา]) เฉพาะ query ที่มีปัญหา
+    """
+    connection = connections[using]
+    checker = PLAN_CHECKERS[connection.vendor]
+    tables = large_tables()
+
+    results = []
+    for query in captured_queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT') or not any(table in sql for table in tables):
+            continue
+        problems = checker(connection, sql, tables)
+        if problems:
+            results.append((sql, problems))
+    return results
+
+
+def analyze(using='default'):
+    """อัปเดตสถิติของตารางให้ planner (เรียกหลัง seed ข้อมูล ให้แผนใกล้กับของจริง)"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('ANALYZE')
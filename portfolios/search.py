@@ -0,0 +1,185 @@
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import PortfolioItem
+
+
+# ==========================================
+# Full-text Search ของผลงาน (title + description)
+# ==========================================
+# - PostgreSQL: column search_vector (tsvector แบบ GENERATED ... STORED) + GIN index
+#   DB คำนวณใหม่เองทุกครั้งที่ INSERT/UPDATE จึงตรงกับข้อมูลเสมอ (รวม bulk_create / update())
+# - SQLite (dev / test): ตาราง FTS5 แยก (external content) + trigger ทำ sync ตอน INSERT/UPDATE/DELETE
+#   ใช้ tokenizer trigram เพราะภาษาไทยไม่มีช่องว่างระหว่างคำ (ค้นเป็น substring ได้)
+# - DB อื่น: ถอยไปใช้ icontains (ไม่มี index)
+# ทั้งสองแบบไม่มี field ใน Model (ORM ไม่รู้จัก column/ตารางนี้) จึงอ้างถึงผ่าน RawSQL / extra() เท่านั้น
+
+ITEM_TABLE = PortfolioItem._meta.db_table
+FTS_TABLE = f'{ITEM_TABLE}_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_INDEX_NAME = 'portfolios_item_search_gin'
+
+# ใช้ config 'simple' (ไม่ตัด stem) เพราะเนื้อหาปนกันทั้งไทยและอังกฤษ / title มีน้ำหนักมากกว่า description
+POSTGRES_CONFIG = 'simple'
+
+# น้ำหนักของ title : description ใน bm25 ของ FTS5 (ให้ title สำคัญกว่าเหมือนฝั่ง PostgreSQL)
+FTS_BM25_WEIGHTS = (10.0, 1.0)
+
+# trigram ต้องมีอย่างน้อย 3 ตัวอักษรต่อคำ (สั้นกว่านี้ FTS5 หาไม่เจอ)
+FTS_MIN_TERM_LENGTH = 3
+
+POSTGRES_INSTALL_SQL = [
+    f"""
+    ALTER TABLE {ITEM_TABLE} ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} ON {ITEM_TABLE} USING GIN ({SEARCH_VECTOR_COLUMN})",
+]
+POSTGRES_UNINSTALL_SQL = [
+    f"DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}",
+    f"ALTER TABLE {ITEM_TABLE} DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}",
+]
+
+SQLITE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, content='{ITEM_TABLE}', content_rowid='id', tokenize='trigram'
+    )
+"""
+SQLITE_TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {ITEM_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {ITEM_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    # แก้เฉพาะ column อื่น (สถานะรูป ฯลฯ) ไม่ต้องทำ index ใหม่
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON {ITEM_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+SQLITE_UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ('ai', 'ad', 'au')
+] + [f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+
+
+def install_search_index(connection, rebuild=False):
+    """
+    สร้าง index สำหรับค้นหา (เรียกจาก migration และหลัง migrate ทุกครั้ง เรียกซ้ำได้)
+    SQLite: migration ที่สร้างตาราง portfolioitem ใหม่ (เช่นเพิ่ม column) จะลบ trigger ทิ้งไปด้วย
+    จึงต้องสร้างคืนหลัง migrate / rebuild=True อ่านข้อมูลทั้งตารางมาทำ index ใหม่
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_INSTALL_SQL:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(SQLITE_TABLE_SQL)
+            for sql in SQLITE_TRIGGER_SQL:
+                cursor.execute(sql)
+            if rebuild:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(connection):
+    sql_list = {'postgresql': POSTGRES_UNINSTALL_SQL, 'sqlite': SQLITE_UNINSTALL_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in sql_list:
+            cursor.execute(sql)
+
+
+def ensure_search_index(sender, using, plan=None, **kwargs):
+    """รับ signal post_migrate: สร้าง trigger ของ SQLite คืนถ้ามี migration ของผลงานที่สร้างตารางใหม่"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or ITEM_TABLE not in connection.introspection.table_names():
+        return
+    touched_items = any(
+        not backwards and migration.app_label == 'portfolios' for migration, backwards in (plan or [])
+    )
+    install_search_index(connection, rebuild=touched_items)
+
+
+def fts_match_expression(text):
+    """แปลงข้อความที่ผู้ใช้พิมพ์เป็น query ของ FTS5: แต่ละคำต้องเจอ (AND) และห้ามตีความเป็น syntax"""
+    terms = [term for term in text.split() if len(term) >= FTS_MIN_TERM_LENGTH]
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def terms_filter(terms):
+    """ทุกคำต้องเจอใน title หรือ description (AND) แบบ icontains ทีละคำ"""
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+    return condition
+
+
+def short_terms_filter(text):
+    """
+    คำที่สั้นกว่า FTS_MIN_TERM_LENGTH (FTS5 trigram หาไม่ได้) ต้องเจอทุกคำเช่นกัน -> icontains ทีละคำ
+    ใช้คู่กับ MATCH ของคำยาว เพื่อไม่ให้ "ab design" กลายเป็นค้นแค่ "design"
+    """
+    return terms_filter(term for term in text.split() if len(term) < FTS_MIN_TERM_LENGTH)
+
+
+def search_items(queryset, text):
+    """
+    กรอง queryset ของ PortfolioItem ด้วยข้อความค้นหา เรียงจากเกี่ยวข้องมากไปน้อย (ใหม่ก่อนถ้าเท่ากัน)
+    คืนค่า queryset ที่ยังต่อ filter / select_related / only ได้
+    """
+    text = text.strip()
+    if not text:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+        query = SearchQuery(text, config=POSTGRES_CONFIG, search_type='websearch')
+        vector = RawSQL(f'"{ITEM_TABLE}"."{SEARCH_VECTOR_COLUMN}"', [], output_field=SearchVectorField())
+        return (
+            queryset.alias(search=vector)
+            .filter(search=query)
+            .annotate(rank=SearchRank(vector, query))
+            .order_by('-rank', '-event_date', '-pk')
+        )
+
+    if vendor == 'sqlite':
+        match = fts_match_expression(text)
+        if match:
+            # JOIN กับตาราง FTS ตรงๆ (ORM JOIN virtual table ไม่ได้ จึงใช้ extra())
+            # ถ้าใช้ pk__in + subquery หา bm25 ทีละแถว FTS5 จะต้อง MATCH ใหม่ทุกแถว (ช้าแบบ O(n^2))
+            # bm25 ยิ่งติดลบมากยิ่งเกี่ยวข้อง
+            weights = ', '.join(str(weight) for weight in FTS_BM25_WEIGHTS)
+            return (
+                queryset.filter(short_terms_filter(text))
+                .extra(
+                    tables=[FTS_TABLE],
+                    where=[f'{FTS_TABLE}.rowid = "{ITEM_TABLE}"."id"', f'{FTS_TABLE} MATCH %s'],
+                    params=[match],
+                    select={'rank': f'bm25({FTS_TABLE}, {weights})'},
+                )
+                .order_by('rank', '-event_date', '-pk')
+            )
+        # ทุกคำสั้นกว่า 3 ตัวอักษร (trigram ใช้ไม่ได้) -> ถอยไปใช้ icontains ทีละคำ เหมือนคำสั้นในกรณีที่มีคำยาว
+
+    return queryset.filter(terms_filter(text.split())).order_by('-event_date', '-pk')
+
+
+def public_items(queryset=None):
+    """ผลงานที่คนทั่วไปค้นเจอได้: เฉพาะเจ้าของที่เปิด Public ไว้"""
+    if queryset is None:
+        queryset = PortfolioItem.objects.all()
+    return queryset.filter(owner__profile__is_public=True)
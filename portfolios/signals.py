@@ -0,0 +1,165 @@
+import os
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users.models import Profile
+
+from . import page_cache, stats
+from .image_store import store_image
+from .media_gc import queue_file_cleanup
+from .models import Category, ImageUpload, PortfolioImage, PortfolioItem, StoredImage
+
+User = get_user_model()
+
+
+# ==========================================
+# ล้าง Full-page Cache ของหน้า Public Portfolio เมื่อข้อมูลที่แสดงเปลี่ยน
+# ==========================================
+
+@receiver(pre_save, sender=User)
+def remember_old_username(sender, instance, **kwargs):
+    # เปลี่ยน username แล้ว หน้าของ URL เก่าต้องหมดอายุด้วย (ไม่งั้นลิงก์เก่ายังเปิดได้จาก Cache)
+    # DirtyFieldsMixin จำค่าที่โหลดมาไว้แล้ว ไม่ต้อง SELECT
+    if not instance._state.adding and instance.is_dirty('username'):
+        instance._old_username = instance.previous_value('username')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_pages(sender, instance, update_fields=None, **kwargs):
+    old_username = instance.__dict__.pop('_old_username', None)
+    # Login อัปเดตแค่ last_login ไม่มีผลกับหน้า Public
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    page_cache.invalidate_username(instance.username, old_username)
+
+
+def owner_id_of(instance):
+    """id ของเจ้าของข้อมูล (Profile / ผลงาน / รูป Gallery)"""
+    if isinstance(instance, Profile):
+        return instance.user_id
+    if isinstance(instance, PortfolioImage):
+        # formset / view มักโหลดผลงานไว้แล้ว ใช้ค่านั้นได้เลย ไม่ต้อง SELECT
+        if PortfolioImage.portfolio_item.is_cached(instance):
+            return instance.portfolio_item.owner_id
+        if not hasattr(instance, '_owner_id'):
+            instance._owner_id = (
+                PortfolioItem.objects.filter(pk=instance.portfolio_item_id).values_list('owner_id', flat=True).first()
+            )
+        return instance._owner_id
+    return instance.owner_id
+
+
+def invalidate_owner_pages(instance):
+    """ล้าง Cache หน้าของเจ้าของข้อมูล (Profile / ผลงาน / รูป Gallery)"""
+    owner_id = owner_id_of(instance)
+    if owner_id is not None:
+        page_cache.invalidate_user(owner_id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=PortfolioItem)
+@receiver(post_delete, sender=PortfolioItem)
+@receiver(post_save, sender=PortfolioImage)
+@receiver(post_delete, sender=PortfolioImage)
+def invalidate_content_pages(sender, instance, **kwargs):
+    invalidate_owner_pages(instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_all_pages(sender, instance, **kwargs):
+    # ชื่อหมวดหมู่แสดงอยู่ในหน้าของทุกคน
+    page_cache.invalidate_all()
+
+
+# ==========================================
+# อัปเดตสถิติผลงานของ User (PortfolioStats / CategoryStats)
+# ==========================================
+
+@receiver(pre_save, sender=PortfolioItem)
+def remember_previous_category(sender, instance, **kwargs):
+    # DirtyFieldsMixin ยังจำค่าเดิมไว้จนกว่าจะ save เสร็จ
+    if not instance._state.adding and instance.is_dirty('category'):
+        instance._previous_category_id = instance.previous_value('category')
+
+
+@receiver(post_save, sender=PortfolioItem)
+def update_item_stats(sender, instance, created, **kwargs):
+    previous_category_id = getattr(instance, '_previous_category_id', instance.category_id)
+    stats.item_saved(instance, created, previous_category_id)
+    instance.__dict__.pop('_previous_category_id', None)
+
+
+@receiver(post_delete, sender=PortfolioItem)
+def update_item_stats_on_delete(sender, instance, **kwargs):
+    stats.item_deleted(instance)
+
+
+@receiver(post_save, sender=PortfolioImage)
+def update_image_stats(sender, instance, created, **kwargs):
+    owner_id = owner_id_of(instance)
+    if owner_id is not None:
+        stats.image_changed(owner_id, 1 if created else 0)
+
+
+@receiver(post_delete, sender=PortfolioImage)
+def update_image_stats_on_delete(sender, instance, **kwargs):
+    owner_id = owner_id_of(instance)
+    if owner_id is not None:
+        stats.image_changed(owner_id, -1)
+
+
+# ==========================================
+# นับการอ้างถึงไฟล์รูปแบบ content-addressed (StoredImage.refcount)
+# ==========================================
+# แถวที่ชี้ไปที่ไฟล์ใน images/ ถูกสร้าง / เปลี่ยนรูป / ลบ -> เพิ่ม/ลด refcount ใน transaction เดียวกัน
+# (รูปปก / Gallery ที่อัปโหลดใหม่ยังเป็นไฟล์ดิบจนกว่า Worker จะประมวลผลเสร็จ ซึ่งจะนับเองตอนนั้น)
+# ไฟล์เดิมที่ไม่มีใครใช้แล้วลบหลัง commit (ดู media_gc.py)
+
+IMAGE_FIELDS = {PortfolioItem: 'cover_image', PortfolioImage: 'image', Profile: 'avatar', ImageUpload: 'file'}
+
+
+@receiver(pre_save, sender=Profile)
+def store_uploaded_avatar(sender, instance, **kwargs):
+    # รูปโปรไฟล์ไม่ผ่าน Worker: เก็บแบบ content-addressed ตอนบันทึกเลย (คนที่ใช้รูปเดียวกันใช้ไฟล์เดียวกัน)
+    avatar = instance.avatar
+    if avatar and not avatar._committed:
+        extension = os.path.splitext(avatar.name)[1].lstrip('.').lower() or 'jpg'
+        instance.avatar = store_image(avatar.file, extension).file.name
+
+
+@receiver(pre_save, sender=PortfolioItem)
+@receiver(pre_save, sender=PortfolioImage)
+@receiver(pre_save, sender=Profile)
+def remember_previous_image(sender, instance, **kwargs):
+    field_name = IMAGE_FIELDS[sender]
+    if not instance._state.adding and instance.is_dirty(field_name):
+        instance._previous_image = instance.previous_value(field_name)
+
+
+@receiver(post_save, sender=PortfolioItem)
+@receiver(post_save, sender=PortfolioImage)
+@receiver(post_save, sender=Profile)
+def count_image_reference(sender, instance, created, **kwargs):
+    name = getattr(instance, IMAGE_FIELDS[sender]).name
+    if created:
+        StoredImage.retain(name)
+    elif '_previous_image' in instance.__dict__:
+        previous = instance.__dict__.pop('_previous_image')
+        if previous != name:
+            StoredImage.release(previous)
+            StoredImage.retain(name)
+            queue_file_cleanup(previous)
+
+
+@receiver(post_delete, sender=PortfolioItem)
+@receiver(post_delete, sender=PortfolioImage)
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=ImageUpload)
+def release_image_reference(sender, instance, **kwargs):
+    name = getattr(instance, IMAGE_FIELDS[sender]).name
+    StoredImage.release(name)
+    queue_file_cleanup(name)
@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+from urllib.parse import unquote
+
+import brotli
+import zopfli.gzip
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+# ไฟล์ที่บีบอัดแล้วได้ผล (รูป / ฟอนต์ woff2 / zip บีบอัดมาแล้ว บีบซ้ำไม่ได้อะไร)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf')
+# เก็บไฟล์ที่บีบอัดไว้เฉพาะตอนที่เล็กลงอย่างน้อย 5%
+MIN_COMPRESSION_RATIO = 0.95
+# Content-Encoding -> นามสกุลไฟล์ (เรียงตามลำดับที่อยากส่ง: brotli เล็กกว่า gzip)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+# ==========================================
+# 1. collectstatic: ชื่อไฟล์มี hash + เขียนไฟล์ .br / .gz ไว้ล่วงหน้า
+# ==========================================
+
+def compressed_variants(data):
+    """{'.br': ..., '.gz': ...} เฉพาะแบบที่เล็กลงจริง (brotli สูงสุด / zopfli: gzip ที่เล็กที่สุดที่ browser เดิมอ่านได้)"""
+    variants = {}
+    if not data:
+        return variants
+    for suffix, compress in (
+        ('.br', lambda: brotli.compress(data, quality=11)),
+        ('.gz', lambda: zopfli.gzip.compress(data)),
+    ):
+        compressed = compress()
+        if len(compressed) <= len(data) * MIN_COMPRESSION_RATIO:
+            variants[suffix] = compressed
+    return variants
+
+
+def compress_file(path, cache=None):
+    """
+    เขียน path.br / path.gz ไว้ข้างไฟล์เดิม
+    cache: dict ของ sha256 -> variants ใช้ร่วมกันระหว่างไฟล์ที่เนื้อหาเหมือนกัน
+    (collectstatic เก็บทั้งชื่อเดิมและชื่อที่มี hash ซึ่งเป็นไฟล์เดียวกัน zopfli ช้า ไม่ควรบีบซ้ำ)
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if cache is not None and digest in cache:
+        variants = cache[digest]
+    else:
+        variants = compressed_variants(data)
+        if cache is not None:
+            cache[digest] = variants
+
+    for _, suffix in ENCODINGS:
+        if suffix in variants:
+            with open(path + suffix, 'wb') as f:
+                f.write(variants[suffix])
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)  # ไฟล์บีบอัดของรุ่นเก่าที่ค้างอยู่
+    return [path + suffix for suffix in variants]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage (ชื่อไฟล์มี hash ของเนื้อหา เช่น styles.3f2a9c1b.css)
+    ที่เขียนไฟล์ .br / .gz ของทุกไฟล์ที่บีบอัดได้ไว้ข้างกันตอน collectstatic
+    """
+
+    def stored_name(self, name):
+        # ยังไม่เคย collectstatic (dev / test ที่ DEBUG ปิด) ไม่มี manifest ให้ใช้ชื่อเดิมไปก่อน
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        collected = set(paths)
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                collected.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        cache = {}
+        for name in sorted(collected):
+            if name.lower().endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name), cache)
+
+
+# ==========================================
+# 2. Middleware เสิร์ฟไฟล์ใน STATIC_ROOT (แทน WhiteNoise)
+# ==========================================
+
+class StaticFile:
+    """ข้อมูลของไฟล์ Static หนึ่งไฟล์ + ไฟล์ที่บีบอัดไว้ (อ่านครั้งเดียวตอนเริ่ม Server)"""
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.last_modified = int(os.stat(path).st_mtime)
+        self.immutable = immutable
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'image/svg+xml'):
+            self.content_type += '; charset=utf-8'
+
+        # ETag จาก hash ของเนื้อหา (ไม่ใช้ mtime: ทุก Server ที่ deploy ไฟล์เดียวกันได้ ETag เดียวกัน)
+        # และแยกตาม encoding (เนื้อหาที่ส่งจริงต่างกัน cache ของ proxy จะได้ไม่ปนกัน)
+        with open(path, 'rb') as f:
+            base_etag = hashlib.file_digest(f, 'sha256').hexdigest()[:16]
+        self.variants = {None: (path, f'"{base_etag}"')}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                self.variants[encoding] = (path + suffix, f'"{base_etag}-{encoding}"')
+
+    def negotiate(self, accept_encoding):
+        """เลือกไฟล์ที่จะส่งตาม Accept-Encoding ของ browser: br > gzip > ไม่บีบอัด"""
+        accepted = {
+            part.split(';')[0].strip().lower()
+            for part in accept_encoding.split(',')
+            if not part.strip().endswith(('q=0', 'q=0.0'))
+        }
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return encoding, *self.variants[encoding]
+        return None, *self.variants[None]
+
+
+def hashed_file_names():
+    """ชื่อไฟล์ที่มี hash แล้ว (จาก manifest ของ collectstatic) ไฟล์เหล่านี้เนื้อหาไม่มีวันเปลี่ยน"""
+    return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def scan_static_root(root, immutable_names):
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                continue  # ไฟล์บีบอัด เป็น variant ของไฟล์หลัก
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[name] = StaticFile(path, immutable=name in immutable_names)
+    return files
+
+
+class StaticFilesMiddleware:
+    """
+    เสิร์ฟไฟล์ใน STATIC_ROOT ก่อนถึง URL Routing / Session / Auth
+    - เลือกไฟล์ .br / .gz ที่บีบอัดไว้แล้วตาม Accept-Encoding (ไม่บีบอัดตอนส่ง)
+    - ไฟล์ที่ชื่อมี hash: Cache-Control immutable 1 ปี (browser / CDN ไม่ต้องถามกลับมาอีก)
+    - ไฟล์อื่น: cache สั้นๆ + ETag / Last-Modified (ได้ 304 ถ้าไม่เปลี่ยน)
+    รายชื่อไฟล์อ่านครั้งเดียวตอนเริ่ม Server (collectstatic ใหม่แล้วต้อง restart เหมือน deploy ปกติ)
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        root = settings.STATIC_ROOT
+        if not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed("ยังไม่มี STATIC_ROOT (ยังไม่ได้ collectstatic)")
+
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+        self.files = scan_static_root(root, hashed_file_names())
+        logger.info("StaticFilesMiddleware: %d files from %s", len(self.files), root)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        static_file = self.match(request)
+        if static_file is not None:
+            return self.serve(request, static_file)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # ASGI: ตอบไฟล์ Static ใน Event Loop เลย (หาไฟล์จาก dict ที่อ่านไว้แล้ว ไม่ต้องส่งไปทำใน Thread)
+        static_file = self.match(request)
+        if static_file is not None:
+            return self.serve(request, static_file)
+        return await self.get_response(request)
+
+    def match(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            return self.find(request.path_info[len(self.prefix):])
+        return None
+
+    def find(self, name):
+        name = posixpath.normpath(unquote(name)).lstrip('/')
+        if name.startswith('..'):
+            return None
+        return self.files.get(name)
+
+    def serve(self, request, static_file):
+        encoding, path, etag = static_file.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+        response = get_conditional_response(request, etag=etag, last_modified=static_file.last_modified)
+        if response is None:
+            response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+            del response['Content-Disposition']  # FileResponse ใส่ชื่อไฟล์ (.br/.gz) มาให้ ไม่ต้องใช้
+            if encoding:
+                response['Content-Encoding'] = encoding
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(static_file.last_modified)
+        if len(static_file.variants) > 1:
+            patch_vary_headers(response, ['Accept-Encoding'])
+        if static_file.immutable:
+            patch_cache_control(response, public=True, max_age=settings.STATIC_IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=settings.STATIC_MAX_AGE)
+        return response
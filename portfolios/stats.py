@@ -0,0 +1,99 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .models import CategoryStats, PortfolioImage, PortfolioItem, PortfolioStats
+
+
+# ==========================================
+# สถิติผลงานต่อ User: อัปเดตด้วย F() ตอน save/delete (ไม่ต้อง COUNT ทั้งตาราง)
+# ถ้ายังไม่มีแถวสถิติ (user เก่า / ข้อมูลที่สร้างด้วย bulk_create) get_stats จะคำนวณใหม่ทั้งหมดครั้งเดียว
+# ==========================================
+
+def rebuild_stats(owner_id):
+    """คำนวณสถิติของ user ใหม่ทั้งหมดจากข้อมูลจริง คืนค่าเป็น PortfolioStats"""
+    items = PortfolioItem.objects.filter(owner_id=owner_id)
+    totals = items.aggregate(count=Count('pk'), last=Max('updated_at'))
+    image_count = PortfolioImage.objects.filter(portfolio_item__owner_id=owner_id).count()
+
+    with transaction.atomic():
+        stats, _ = PortfolioStats.objects.update_or_create(owner_id=owner_id, defaults={
+            'item_count': totals['count'],
+            'image_count': image_count,
+            'last_updated': totals['last'],
+        })
+        CategoryStats.objects.filter(owner_id=owner_id).delete()
+        CategoryStats.objects.bulk_create([
+            CategoryStats(owner_id=owner_id, category_id=row['category'], item_count=row['count'])
+            for row in items.filter(category__isnull=False).values('category').annotate(count=Count('pk'))
+        ])
+    return stats
+
+
+def get_stats(owner):
+    stats = PortfolioStats.objects.filter(owner=owner).first()
+    return stats if stats is not None else rebuild_stats(owner.pk)
+
+
+def update_stats(owner_id, **deltas):
+    """
+    เพิ่ม/ลดตัวนับของ user เช่น update_stats(1, item_count=1)
+    คืนค่า False ถ้ายังไม่มีแถวสถิติ (ไม่สร้างให้ตรงนี้ เพราะอาจอยู่ระหว่างลบ user -> get_stats จะคำนวณให้ตอนใช้)
+    """
+    changes = {name: F(name) + delta for name, delta in deltas.items()}
+    return bool(PortfolioStats.objects.filter(owner_id=owner_id).update(last_updated=timezone.now(), **changes))
+
+
+def update_category_count(owner_id, category_id, delta):
+    if category_id is None:
+        return  # ผลงานที่ไม่มีหมวดหมู่ คำนวณจากผลต่าง ไม่ได้เก็บแยก
+
+    updated = CategoryStats.objects.filter(owner_id=owner_id, category_id=category_id).update(
+        item_count=F('item_count') + delta,
+    )
+    if not updated and delta > 0:
+        try:
+            with transaction.atomic():
+                CategoryStats.objects.create(owner_id=owner_id, category_id=category_id, item_count=delta)
+        except IntegrityError:
+            # มีอีก request สร้างแถวนี้ไปก่อนพอดี
+            CategoryStats.objects.filter(owner_id=owner_id, category_id=category_id).update(
+                item_count=F('item_count') + delta,
+            )
+
+
+def category_breakdown(stats):
+    """จำนวนผลงานแยกหมวดหมู่ [(ชื่อหมวด, จำนวน)] รวม "ทั่วไป" (ไม่มีหมวดหมู่) ไว้ท้ายสุด"""
+    rows = (
+        CategoryStats.objects.filter(owner_id=stats.owner_id, item_count__gt=0)
+        .select_related('category').order_by('category__name')
+    )
+    breakdown = [(row.category.name, row.item_count) for row in rows]
+    uncategorized = stats.item_count - sum(count for _, count in breakdown)
+    if uncategorized > 0:
+        breakdown.append((None, uncategorized))
+    return breakdown
+
+
+# ------------------------------------------
+# เรียกจาก signals
+# ------------------------------------------
+
+def item_saved(item, created, previous_category_id=None):
+    if created:
+        if update_stats(item.owner_id, item_count=1):
+            update_category_count(item.owner_id, item.category_id, 1)
+        return
+
+    if update_stats(item.owner_id) and previous_category_id != item.category_id:
+        update_category_count(item.owner_id, previous_category_id, -1)
+        update_category_count(item.owner_id, item.category_id, 1)
+
+
+def item_deleted(item):
+    if update_stats(item.owner_id, item_count=-1):
+        update_category_count(item.owner_id, item.category_id, -1)
+
+
+def image_changed(owner_id, delta):
+    update_stats(owner_id, image_count=delta)
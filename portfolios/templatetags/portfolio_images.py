@@ -0,0 +1,51 @@
+from django import template
+from django.utils.html import format_html
+
+from portfolios.imaging import DERIVATIVE_WIDTHS, derivative_url
+from portfolios.models import ImageStatus
+
+register = template.Library()
+
+
+def is_ready(image):
+    """รูปบีบอัดเสร็จแล้วหรือยัง (ดูจาก field <ชื่อ field รูป>_status ของ Model)"""
+    status = getattr(image.instance, f"{image.field.name}_status", ImageStatus.READY)
+    return status == ImageStatus.READY
+
+
+@register.filter
+def srcset(image, fmt='jpeg'):
+    """
+    สร้างค่า srcset จากรูป (ImageField) เช่น
+    {{ item.cover_image|srcset:"webp" }} -> "/img/320/webp/... 320w, /img/640/webp/... 640w, ..."
+    """
+    if not image:
+        return ''
+    return ', '.join(f"{derivative_url(image.name, width, fmt)} {width}w" for width in DERIVATIVE_WIDTHS)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', css_class='', alt='', loading='lazy'):
+    """
+    แท็ก <picture> ที่มี WebP + JPEG หลายขนาด ให้ browser เลือกไฟล์ที่เล็กที่สุดที่พอดีกับช่อง
+    (รูปที่อยู่บนสุดของหน้า ให้ส่ง loading="eager" จะได้ไม่หน่วงการแสดงผล)
+    ใช้: {% responsive_image item.cover_image sizes="(min-width: 1024px) 33vw, 100vw" css_class="w-full h-40 object-cover" %}
+    """
+    if not image:
+        return ''
+
+    # ยังประมวลผลไม่เสร็จ -> แสดงไฟล์ต้นฉบับไปก่อน (ยังไม่มีรูปย่อ)
+    if not is_ready(image):
+        return format_html(
+            '<img src="{}" class="{}" alt="{}" loading="{}" decoding="async">',
+            image.url, css_class, alt, loading,
+        )
+
+    return format_html(
+        '<picture class="contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="{}" decoding="async">'
+        '</picture>',
+        srcset(image, 'webp'), sizes,
+        image.url, srcset(image, 'jpeg'), sizes, css_class, alt, loading,
+    )
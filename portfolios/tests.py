@@ -1,3 +1,1665 @@
-from django.test import TestCase
+import base64
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+import brotli
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.signals import post_save
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from users.models import Profile
+
+from .archives import MANIFEST_NAME, file_sha256
+from .benchmarks import compare_to_baseline
+from .checks import check_page_cache_backend
+from .executors import blocking_executor, run_blocking
+from .image_store import storage_report, store_image
+from .imaging import DERIVATIVE_FORMATS, DERIVATIVE_WIDTHS, process_uploaded_image
+from .instrumentation import PROCESS_COUNT_KEY, SampleBuffer, performance_stats, sample_buffer
+from .jobs import claim_pending_images, claim_pending_jobs, process_pdf_job
+from .management.commands.render_pdfs import Command as RenderPdfsCommand
+from .models import (Category, ImageDerivative, ImageStatus, ImageTooLarge, ImageUpload, MediaGcRun, PdfExportJob,
+                     PortfolioImage, PortfolioImportRun, PortfolioItem, PortfolioQrCode, StoredImage, compress_image,
+                     open_bounded_image, parse_video_link, validate_image_size)
+from .pdf import HTML, LocalUrlFetcher, PdfRenderResult, portfolio_fingerprint, render_portfolio_pdf
+from .qr import create_qr_code, get_qr_code, site_base_url
+from .query_plans import analyze, plan_problems, supports_plan_checks
+from .search import search_items
+from .static_assets import StaticFilesMiddleware
+from .stats import category_breakdown, get_stats, rebuild_stats
+from .views import DASHBOARD_ITEMS_PER_PAGE, PORTFOLIO_ITEMS_PER_CATEGORY
+
+User = get_user_model()
+
+
+def create_items(owner, count, categories):
+    """สร้างผลงานทีละมากๆ ด้วย bulk_create (ไม่ผ่าน save() จึงไม่มีการประมวลผลรูป)"""
+    start = datetime.date(2024, 1, 1)
+    PortfolioItem.objects.bulk_create([
+        PortfolioItem(
+            owner=owner,
+            title=f"Item {i}",
+            description="รายละเอียด " * 100,
+            cover_image=f"portfolio_covers/item_{i}.jpg",
+            category=categories[i % len(categories)],
+            event_date=start + datetime.timedelta(days=i),
+        )
+        for i in range(count)
+    ])
+
+
+def use_shared_cache(testcase):
+    """Cache ที่ทุก Process ใช้ร่วมกัน (ไฟล์ใน temp) ให้ Page Cache ทำงาน (locmem จะปิด Page Cache ไว้)"""
+    cache_dir = tempfile.TemporaryDirectory()
+    testcase.addCleanup(cache_dir.cleanup)
+    settings_override = override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir.name,
+    }})
+    settings_override.enable()
+    testcase.addCleanup(settings_override.disable)
+
+
+class PublicPortfolioQueryTests(TestCase):
+    """หน้า Public Portfolio ต้องใช้จำนวน query คงที่ ไม่ว่าผู้ใช้จะมีผลงานกี่ชิ้น"""
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [
+            Category.objects.create(name="Web", slug="web"),
+            Category.objects.create(name="Design", slug="design"),
+            None,  # ผลงานที่ไม่มีหมวดหมู่
+        ]
+
+    def create_owner(self, item_count):
+        owner = User.objects.create_user(
+            username=f"owner{item_count}", email=f"owner{item_count}@example.com", password="pw",
+        )
+        create_items(owner, item_count, self.categories)
+        return owner
+
+    def assert_page_queries(self, item_count):
+        owner = self.create_owner(item_count)
+        url = reverse('public_portfolio', args=[owner.username])
+
+        # 1. User + Profile, 2. ผลงานหน้าแรกของทุกหมวดหมู่
+        with self.assertNumQueries(2):
+            response = self.client.get(url, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        groups = response.context['category_groups']
+        self.assertEqual(len(groups), min(item_count, len(self.categories)))
+        self.assertEqual(sum(group['total'] for group in groups), item_count)
+        for group in groups:
+            self.assertLessEqual(len(group['items']), PORTFOLIO_ITEMS_PER_CATEGORY)
+            self.assertEqual(group['next_url'] is not None, group['total'] > PORTFOLIO_ITEMS_PER_CATEGORY)
+
+    def test_10_items(self):
+        self.assert_page_queries(10)
+
+    def test_100_items(self):
+        self.assert_page_queries(100)
+
+    def test_1000_items(self):
+        self.assert_page_queries(1000)
+
+    def test_items_without_category_are_listed_last(self):
+        owner = self.create_owner(10)
+        response = self.client.get(reverse('public_portfolio', args=[owner.username]), secure=True)
+
+        groups = response.context['category_groups']
+        self.assertEqual([g['category'].name if g['category'] else None for g in groups], ["Design", "Web", None])
+
+    def test_items_are_newest_first_within_category(self):
+        owner = self.create_owner(30)
+        response = self.client.get(reverse('public_portfolio', args=[owner.username]), secure=True)
+
+        for group in response.context['category_groups']:
+            dates = [item.event_date for item in group['items']]
+            self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_load_more_pages_through_category(self):
+        owner = self.create_owner(100)
+        web = self.categories[0]
+        expected = list(
+            PortfolioItem.objects.filter(owner=owner, category=web)
+            .order_by('-event_date').values_list('pk', flat=True)
+        )
+
+        response = self.client.get(reverse('public_portfolio', args=[owner.username]), secure=True)
+        group = next(g for g in response.context['category_groups'] if g['category'] == web)
+        seen = [item.pk for item in group['items']]
+
+        next_url = group['next_url']
+        while next_url:
+            # 1. User + Profile, 2. นับจำนวน (Paginator), 3. ผลงานของหน้านั้น
+            with self.assertNumQueries(3):
+                response = self.client.get(next_url, secure=True)
+            self.assertEqual(response.status_code, 200)
+            seen += [item.pk for item in response.context['items']]
+            next_url = response.context['next_url']
+
+        self.assertEqual(seen, expected)
+
+    def test_load_more_uncategorized(self):
+        owner = self.create_owner(30)
+        url = reverse('portfolio_category_items', args=[owner.username])
+
+        response = self.client.get(url, {'category': 'none', 'page': 1}, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(item.category_id is None for item in response.context['items']))
+
+    def test_private_portfolio_is_hidden(self):
+        owner = self.create_owner(10)
+        owner.profile.is_public = False
+        owner.profile.save()
+
+        response = self.client.get(reverse('public_portfolio', args=[owner.username]), secure=True)
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(
+            reverse('portfolio_category_items', args=[owner.username]), {'category': 'none'}, secure=True,
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class DirtyFieldsTests(TestCase):
+    """DirtyFieldsMixin: save() เขียนเฉพาะ field ที่เปลี่ยน ไม่ต้อง SELECT ค่าเก่า"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="dirty", email="dirty@example.com", password="pw")
+        create_items(self.owner, 1, [None])
+        self.item = PortfolioItem.objects.get(owner=self.owner)
+
+    def item_updates(self, queries):
+        return [q["sql"] for q in queries if q["sql"].startswith('UPDATE "portfolios_portfolioitem"')]
+
+    def test_save_without_changes_is_skipped(self):
+        saved = []
+
+        def receiver(sender, **kwargs):
+            saved.append(sender)
+
+        post_save.connect(receiver, sender=PortfolioItem)
+        self.addCleanup(post_save.disconnect, receiver, sender=PortfolioItem)
+
+        with self.assertNumQueries(0):
+            self.item.save()
+            self.owner.profile.save()
+        # ไม่มีอะไรเปลี่ยน: ไม่มี post_save (Cache / สถิติไม่ต้องอัปเดต)
+        self.assertEqual(saved, [])
+
+    def test_update_writes_dirty_and_auto_now_fields(self):
+        self.item.title = "ชื่อใหม่"
+        self.assertEqual(self.item.get_dirty_fields(), {"title"})
+        with CaptureQueriesContext(connection) as queries:
+            self.item.save()
+
+        [sql] = self.item_updates(queries)
+        columns = sql.split(" SET ")[1].split(" WHERE ")[0]
+        self.assertEqual(sorted(part.split(" = ")[0] for part in columns.split(", ")), ['"title"', '"updated_at"'])
+        self.assertEqual(PortfolioItem.objects.get().title, "ชื่อใหม่")
+
+    def test_deferred_fields(self):
+        item = PortfolioItem.objects.only("id", "title").get()
+        self.assertEqual(item.get_dirty_fields(), set())
+
+        item.description = "รายละเอียดใหม่"  # field ที่ถูก defer: ตั้งค่าแล้วถือว่าเปลี่ยน
+        self.assertEqual(item.get_dirty_fields(), {"description"})
+        with CaptureQueriesContext(connection) as queries:
+            item.save()
+        [sql] = self.item_updates(queries)
+        self.assertNotIn('"title"', sql)
+        self.assertEqual(PortfolioItem.objects.values_list("title", "description").get(),
+                         (self.item.title, "รายละเอียดใหม่"))
+
+    def test_uncommitted_file_is_dirty(self):
+        # ไฟล์ที่เพิ่งอัปโหลดชื่อซ้ำกับของเดิมก็ยังนับว่าเปลี่ยน
+        name = Path(self.item.cover_image.name).name
+        self.item.cover_image = SimpleUploadedFile(name, jpeg_bytes(), content_type="image/jpeg")
+        self.assertEqual(self.item.get_dirty_fields(), {"cover_image"})
+
+    def test_snapshot_after_save_and_refresh(self):
+        self.item.title = "รอบแรก"
+        self.item.save()
+        self.assertEqual(self.item.get_dirty_fields(), set())
+        self.assertEqual(self.item.previous_value("title"), "รอบแรก")
+
+        PortfolioItem.objects.filter(pk=self.item.pk).update(title="จากที่อื่น")
+        self.item.description = "ยังไม่ได้ save"
+        self.item.refresh_from_db(fields=["title"])
+        self.assertEqual(self.item.previous_value("title"), "จากที่อื่น")
+        self.assertEqual(self.item.get_dirty_fields(), {"description"})
+
+
+class PublicPageCacheTests(TestCase):
+    """Full-page Cache ของหน้า Public: ใช้กับผู้ชมที่ไม่ได้ล็อกอินและหน้าที่เปิด Public เท่านั้น"""
+
+    def setUp(self):
+        use_shared_cache(self)
+        self.owner = User.objects.create_user(username="alice", email="alice@example.com", password="pw")
+        create_items(self.owner, 3, [None])
+        self.item = PortfolioItem.objects.filter(owner=self.owner).first()
+        self.urls = [
+            reverse('public_portfolio', args=[self.owner.username]),
+            reverse('portfolio_detail', args=[self.owner.username, self.item.pk]),
+        ]
+
+    def get(self, url):
+        return self.client.get(url, secure=True)
+
+    def test_second_anonymous_hit_is_served_from_cache(self):
+        # Hit แล้วไม่ต้องแตะ DB เลย
+        for url in self.urls:
+            self.assertEqual(self.get(url)['X-Page-Cache'], 'MISS')
+            with self.assertNumQueries(0):
+                response = self.get(url)
+            self.assertEqual(response['X-Page-Cache'], 'HIT')
+            self.assertContains(response, self.item.title)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_disables_page_cache(self):
+        # locmem: การล้าง Cache จาก Process อื่น (Worker ที่บีบอัดรูปเสร็จ / Web Worker ตัวอื่น) มาไม่ถึง
+        for url in self.urls:
+            self.assertEqual(self.get(url)['X-Page-Cache'], 'BYPASS')
+            self.assertEqual(self.get(url)['X-Page-Cache'], 'BYPASS')
+
+        # รูปปกเปลี่ยนใน Process อื่น (ไม่มี signal มาถึง Process นี้) หน้าถัดไปต้องเห็นทันที
+        PortfolioItem.objects.filter(pk=self.item.pk).update(cover_image="images/ab/processed.jpg")
+        self.assertContains(self.get(self.urls[1]), "images/ab/processed.jpg")
+
+        self.assertEqual([warning.id for warning in check_page_cache_backend(None)], ['portfolios.W002'])
+
+    def test_item_change_invalidates_cache(self):
+        for url in self.urls:
+            self.get(url)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.item.title = f"Changed for {url}"
+                self.item.save()
+            response = self.get(url)
+            self.assertEqual(response['X-Page-Cache'], 'MISS')
+            self.assertContains(response, f"Changed for {url}")
+
+    def test_private_profile_is_never_cached(self):
+        for url in self.urls:
+            self.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.profile.is_public = False
+            self.owner.profile.save()
+
+        for url in self.urls:
+            self.assertEqual(self.get(url).status_code, 404)
+            self.assertEqual(self.get(url).status_code, 404)
+
+    def test_username_change_expires_old_url(self):
+        old_url = self.urls[0]
+        self.get(old_url)
+
+        owner = User.objects.get(pk=self.owner.pk)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            owner.username = "alice2"
+            owner.save()
+
+        # username เดิมมาจากค่าที่โหลดไว้ ไม่ต้อง SELECT แถว User ซ้ำ
+        self.assertFalse([q for q in queries if q["sql"].startswith('SELECT') and '"users_user"' in q["sql"]])
+        self.assertEqual(self.get(old_url).status_code, 404)
+
+    def test_logged_in_owner_bypasses_cache(self):
+        self.get(self.urls[0])
+        self.client.force_login(self.owner)
+
+        response = self.get(self.urls[0])
+
+        self.assertEqual(response['X-Page-Cache'], 'BYPASS')
+
+
+class AsyncPublicViewsTests(TestCase):
+    """หน้า Public แบบ async ผ่าน ASGI (AsyncClient): ORM แบบ async + Page Cache + สิทธิ์การเข้าชม"""
+
+    def setUp(self):
+        use_shared_cache(self)
+        self.owner = User.objects.create_user(username="alice", email="alice@example.com", password="pw")
+        create_items(self.owner, 3, [Category.objects.create(name="Robotics", slug="robotics")])
+        self.item = PortfolioItem.objects.filter(owner=self.owner).first()
+        self.urls = [
+            reverse('public_portfolio', args=[self.owner.username]),
+            reverse('portfolio_detail', args=[self.owner.username, self.item.pk]),
+        ]
+
+    async def test_anonymous_pages_render_and_cache(self):
+        response = await self.async_client.get(reverse('home'), secure=True)
+        self.assertEqual(response.status_code, 200)
+
+        for url in self.urls:
+            response = await self.async_client.get(url, secure=True)
+            self.assertContains(response, "Robotics")
+            self.assertEqual(response['X-Page-Cache'], 'MISS')
+            response = await self.async_client.get(url, secure=True)
+            self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+    async def test_private_portfolio_visible_only_to_owner(self):
+        self.owner.profile.is_public = False
+        await self.owner.profile.asave()
+
+        for url in self.urls:
+            response = await self.async_client.get(url, secure=True)
+            self.assertEqual(response.status_code, 404)
+
+        await self.async_client.aforce_login(self.owner)
+        for url in self.urls:
+            response = await self.async_client.get(url, secure=True)
+            self.assertContains(response, self.item.title)
+            self.assertEqual(response['X-Page-Cache'], 'BYPASS')
+
+    async def test_image_derivative_follows_media_access(self):
+        width, fmt = DERIVATIVE_WIDTHS[0], next(iter(DERIVATIVE_FORMATS))
+        source = self.item.cover_image.name
+        await ImageDerivative.objects.acreate(source=source, width=width, format=fmt, file=f"derivatives/{source}.{fmt}")
+        url = reverse('image_derivative', args=[width, fmt, source])
+
+        response = await self.async_client.get(url, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('public', response['Cache-Control'])
+
+        self.owner.profile.is_public = False
+        await self.owner.profile.asave()
+        # คนอื่นสั่งย่อรูปที่ยังไม่มีรูปย่อก็ไม่ได้ (ตอบ 404 ก่อนถึง Pillow)
+        other = reverse('image_derivative', args=[width, fmt, "portfolio_covers/item_1.jpg"])
+        for path in (url, other):
+            self.assertEqual((await self.async_client.get(path, secure=True)).status_code, 404)
+
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(url, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('max-age', response['Cache-Control'])
+
+    async def test_blocking_work_runs_in_bounded_pool(self):
+        thread_name = await run_blocking(lambda: threading.current_thread().name)
+
+        self.assertTrue(thread_name.startswith('blocking'))
+        self.assertEqual(blocking_executor()._max_workers, settings.BLOCKING_EXECUTOR_WORKERS)
+
+
+class PerformanceStatsTests(TestCase):
+    """ตัวอย่างเวลาของ PerformanceMiddleware: เก็บใน Memory ของ Process แล้วส่งขึ้น Cache เป็นชุด"""
+
+    def setUp(self):
+        cache.clear()
+        sample_buffer.reset()
+        self.addCleanup(sample_buffer.reset)
+
+    @override_settings(PERF_FLUSH_SECONDS=3600, PERF_SAMPLES_PER_URL=2)
+    def test_samples_are_buffered_and_merged_across_processes(self):
+        for _ in range(4):
+            response = self.client.get(reverse("home"), secure=True)
+            self.assertIn("total;dur=", response["Server-Timing"])
+        # ระหว่าง request ไม่เขียนตัวอย่างลง Cache
+        self.assertIsNone(cache.get(PROCESS_COUNT_KEY))
+
+        other_process = SampleBuffer()
+        other_process.add("home", {"total_ms": 9.0, "sql_ms": 1.0, "sql_count": 1})
+        other_process.flush()
+
+        stats = performance_stats()["home"]
+        self.assertEqual(stats["samples"], 3)  # 2 ล่าสุดของ Process นี้ + 1 ของอีก Process
+        self.assertEqual(stats["total_ms"]["p99"], 9.0)
+
+
+class QrCodeTests(TestCase):
+    """QR Code ของหน้า Public: ใช้ไฟล์เดิมซ้ำ / โดเมนจาก Sites framework หรือจาก request ถ้ายังไม่ได้ตั้ง"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tmp = Path(media_root.name)
+        self.owner = User.objects.create_user(username="qr", email="qr@example.com", password="pw")
+
+    def test_default_site_domain_falls_back_to_request_host(self):
+        request = RequestFactory().get(reverse("portfolio_qr_code", args=[self.owner.username]), secure=True)
+        qr_code = get_qr_code(self.owner, site_base_url(request))
+        self.assertEqual(qr_code.target_url, "https://testserver/qr/")
+
+        # งานที่ไม่มี request (เช่น render_pdfs) ต้องไม่เขียนไฟล์ใหม่เป็น example.com
+        self.assertEqual(get_qr_code(self.owner).png.name, qr_code.png.name)
+        self.assertEqual(PortfolioQrCode.objects.get().target_url, "https://testserver/qr/")
+
+        Site.objects.filter(pk=settings.SITE_ID).update(domain="smafolio.com")
+        Site.objects.clear_cache()
+        self.addCleanup(Site.objects.clear_cache)
+        self.assertEqual(site_base_url(request), "https://smafolio.com/")
+        self.assertEqual(get_qr_code(self.owner).target_url, "https://smafolio.com/qr/")
+        self.assertEqual(len(list((self.tmp / "qr_codes").iterdir())), 2)
+
+    def test_pdf_job_uses_origin_recorded_at_enqueue(self):
+        self.client.force_login(self.owner)
+        job = self.client.get(reverse("download_portfolio_pdf"), secure=True).context["job"]
+        self.assertEqual(job.base_url, "https://testserver/")
+
+        # Worker สร้าง QR Code จากค่าที่เก็บไว้ ไฟล์ตรงกับที่หน้า qr.png ใช้ ไม่ต้องเขียนใหม่สลับกันไปมา
+        # (เรียกแบบเดียวกับ View qr.png: Thread Pool ของ async view เขียน DB ใน TestCase ไม่ได้)
+        qr_code = get_qr_code(self.owner, job.base_url)
+        request = RequestFactory().get(reverse("portfolio_qr_code", args=[self.owner.username]), secure=True)
+        self.assertEqual(get_qr_code(self.owner, site_base_url(request)).png.name, qr_code.png.name)
+        self.assertEqual(job.fingerprint, portfolio_fingerprint(self.owner, job.base_url))
+
+    def test_concurrent_first_request_reuses_winner(self):
+        winner = get_qr_code(self.owner)
+        # request ที่สองไม่เจอแถวตอนค้นหา แล้วมา insert ทีหลัง (OneToOne ชนกัน)
+        loser = create_qr_code(self.owner, winner.target_url)
+        self.assertEqual(loser.pk, winner.pk)
+        self.assertEqual(
+            sorted(path.name for path in (self.tmp / "qr_codes").iterdir()),
+            sorted(Path(name).name for name in (winner.png.name, winner.svg.name)),
+        )
+
+
+class VideoLinkTests(TestCase):
+    """video_provider / video_id แยกจากลิงก์ตอนบันทึก และหน้ารายละเอียดแสดงรูปปกแทน iframe"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice", email="alice@example.com", password="pw")
+
+    def test_parse_video_link(self):
+        cases = {
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10": ('youtube', 'dQw4w9WgXcQ'),
+            "https://youtu.be/dQw4w9WgXcQ?si=abc": ('youtube', 'dQw4w9WgXcQ'),
+            "https://m.youtube.com/shorts/dQw4w9WgXcQ": ('youtube', 'dQw4w9WgXcQ'),
+            "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ": ('youtube', 'dQw4w9WgXcQ'),
+            "https://www.youtube.com/watch?v=<script>": ('', ''),
+            "https://vimeo.com/12345": ('', ''),
+            "http://[broken": ('', ''),
+            None: ('', ''),
+        }
+        for url, expected in cases.items():
+            self.assertEqual(parse_video_link(url), expected, url)
+
+    def test_video_fields_follow_link_on_save(self):
+        item = PortfolioItem.objects.create(
+            owner=self.owner, title="Robot", description="x", cover_image="portfolio_covers/a.jpg",
+            video_link="https://youtu.be/dQw4w9WgXcQ",
+        )
+        self.assertEqual((item.video_provider, item.video_id), ('youtube', 'dQw4w9WgXcQ'))
+
+        item = PortfolioItem.objects.get(pk=item.pk)
+        item.video_link = "https://vimeo.com/12345"
+        item.save()
+
+        item.refresh_from_db()
+        self.assertEqual((item.video_provider, item.video_id), ('', ''))
+        self.assertFalse(PortfolioItem.objects.exclude(video_provider='').exists())
+
+    def test_detail_page_renders_facade_instead_of_iframe(self):
+        item = PortfolioItem.objects.create(
+            owner=self.owner, title="Robot", description="x", cover_image="portfolio_covers/a.jpg",
+            video_link="https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        )
+
+        response = self.client.get(reverse('portfolio_detail', args=[self.owner.username, item.pk]), secure=True)
+
+        self.assertContains(response, "https://i.ytimg.com/vi/dQw4w9WgXcQ/hqdefault.jpg")
+        self.assertContains(response, 'data-video-embed="https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ')
+        self.assertNotContains(response, "<iframe")
+
+
+class PortfolioStatsTests(TestCase):
+    """สถิติต่อ User ต้องตรงกับการคำนวณใหม่จากข้อมูลจริงเสมอ"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="carol", email="carol@example.com", password="pw")
+        self.web = Category.objects.create(name="Web", slug="web")
+        self.design = Category.objects.create(name="Design", slug="design")
+        get_stats(self.owner)  # สร้างแถวสถิติ (ยังไม่มีผลงาน)
+
+    def create_item(self, category):
+        # ไม่ใช้ save() ปกติกับไฟล์จริง: ตั้งชื่อไฟล์เฉยๆ (ไม่ใช่ไฟล์ใหม่ที่ต้องประมวลผล)
+        item = PortfolioItem(owner=self.owner, title="t", description="d", category=category,
+                             cover_image="portfolio_covers/x.jpg", event_date=datetime.date(2024, 1, 1))
+        item.save()
+        return item
+
+    def assert_matches_rebuild(self):
+        stats = get_stats(self.owner)
+        counts = (stats.item_count, stats.image_count, category_breakdown(stats))
+        rebuilt = rebuild_stats(self.owner.pk)
+        self.assertEqual(counts, (rebuilt.item_count, rebuilt.image_count, category_breakdown(rebuilt)))
+        return stats
+
+    def test_counts_follow_saves_and_deletes(self):
+        first = self.create_item(self.web)
+        second = self.create_item(self.web)
+        self.create_item(None)
+        PortfolioImage.objects.create(portfolio_item=first, image="portfolio_gallery/a.jpg")
+        PortfolioImage.objects.create(portfolio_item=first, image="portfolio_gallery/b.jpg")
+
+        stats = self.assert_matches_rebuild()
+        self.assertEqual((stats.item_count, stats.image_count), (3, 2))
+        self.assertEqual(category_breakdown(stats), [("Web", 2), (None, 1)])
+
+        # ย้ายหมวดหมู่ (ใช้ค่าเดิมจาก DirtyFieldsMixin)
+        second = PortfolioItem.objects.get(pk=second.pk)
+        second.category = self.design
+        second.save()
+        self.assertEqual(category_breakdown(self.assert_matches_rebuild()), [("Design", 1), ("Web", 1), (None, 1)])
+
+        # ลบผลงานที่มีรูป -> รูปถูกลบตามด้วย
+        first.delete()
+        stats = self.assert_matches_rebuild()
+        self.assertEqual((stats.item_count, stats.image_count), (2, 0))
+
+    def test_deleted_category_counts_as_uncategorized(self):
+        self.create_item(self.web)
+        self.web.delete()
+
+        self.assertEqual(category_breakdown(self.assert_matches_rebuild()), [(None, 1)])
+
+    def test_dashboard_query_count_is_flat(self):
+        query_counts = []
+        for count in (5, 500):
+            owner = User.objects.create_user(username=f"dash{count}", email=f"dash{count}@example.com", password="pw")
+            create_items(owner, count, [self.web, self.design, None])
+            rebuild_stats(owner.pk)
+            self.client.force_login(owner)
+
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('dashboard'), secure=True)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['page_obj'].object_list), min(count, DASHBOARD_ITEMS_PER_PAGE))
+            query_counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        # จำนวนหน้ามาจาก PortfolioStats (KnownCountPaginator) ไม่ต้อง COUNT ตารางผลงาน
+        self.assertFalse([q for q in ctx.captured_queries if "COUNT(" in q["sql"]])
+
+    def test_gallery_image_save_uses_loaded_item_owner(self):
+        item = self.create_item(self.web)
+        with CaptureQueriesContext(connection) as ctx:
+            PortfolioImage.objects.create(portfolio_item=item, image="images/ab/ab.jpg")
+        self.assertFalse([q for q in ctx.captured_queries
+                          if q["sql"].startswith("SELECT") and '"portfolios_portfolioitem"' in q["sql"]])
+        self.assert_matches_rebuild()
+
+
+class PortfolioSearchTests(TestCase):
+    """Full-text Search: index ต้องตามทันการแก้ไข และหน้าค้นหาต้องไม่แสดงผลงานของ Portfolio ที่ปิด Public"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.web = Category.objects.create(name="Web", slug="web")
+        cls.owner = User.objects.create_user(username="dave", email="dave@example.com", password="pw")
+        cls.hidden = User.objects.create_user(username="erin", email="erin@example.com", password="pw")
+        cls.hidden.profile.is_public = False
+        cls.hidden.profile.save()
+
+        def item(owner, title, description, category=None, day=1):
+            return PortfolioItem.objects.create(
+                owner=owner, title=title, description=description, category=category,
+                cover_image="portfolio_covers/x.jpg", event_date=datetime.date(2024, 1, day),
+            )
+
+        cls.robot = item(cls.owner, "หุ่นยนต์เดินตามเส้น", "แข่งขัน Robotics ระดับภาค", cls.web, day=5)
+        cls.website = item(cls.owner, "เว็บไซต์โรงเรียน", "ทำด้วย Django และหุ่นยนต์ตอบแชท", cls.web, day=20)
+        cls.poem = item(cls.owner, "กลอนวันแม่", "ประกวดกลอน", None, day=10)
+        cls.secret = item(cls.hidden, "หุ่นยนต์ลับ", "ไม่เปิดเผย", cls.web, day=1)
+
+    def search(self, **params):
+        response = self.client.get(reverse('search'), params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return [item.pk for item in response.context['page_obj'].object_list]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search(q="หุ่นยนต์"), [self.robot.pk, self.website.pk])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search(q="หุ่นยนต์ Django"), [self.website.pk])
+
+    def test_short_terms_still_filter_alongside_long_terms(self):
+        # "JS" สั้นเกินกว่า trigram จะหาได้ แต่ต้องไม่ถูกทิ้งไปเฉยๆ เมื่อมีคำยาวอยู่ด้วย
+        PortfolioItem.objects.filter(pk=self.website.pk).update(description="ทำด้วย Django, JS และหุ่นยนต์ตอบแชท")
+        self.assertEqual(self.search(q="หุ่นยนต์ JS"), [self.website.pk])
+        self.assertEqual(self.search(q="หุ่นยนต์ Qx"), [])
+
+    def test_only_short_terms_match_each_word(self):
+        # ทุกคำสั้น -> icontains ทีละคำ ไม่ใช่ทั้งวลี ("JS Dj" ไม่ได้อยู่ติดกันในคำอธิบาย)
+        PortfolioItem.objects.filter(pk=self.website.pk).update(description="ทำด้วย Django, JS และหุ่นยนต์ตอบแชท")
+        self.assertEqual(self.search(q="JS Dj"), [self.website.pk])
+        self.assertEqual(self.search(q="JS Qx"), [])
+
+    def test_category_and_date_filters(self):
+        self.assertEqual(self.search(q="หุ่นยนต์", date_from="2024-01-10"), [self.website.pk])
+        self.assertEqual(self.search(q="กลอน", category="web"), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        PortfolioItem.objects.filter(pk=self.poem.pk).update(title="ดาราศาสตร์")
+        self.assertEqual(list(search_items(PortfolioItem.objects.all(), "ดาราศาสตร์")), [self.poem])
+        self.assertEqual(self.search(q="กลอนวันแม่"), [])
+
+        self.robot.delete()
+        self.assertEqual(self.search(q="หุ่นยนต์"), [self.website.pk])
+
+    def test_private_portfolios_are_excluded(self):
+        self.assertNotIn(self.secret.pk, self.search(q="หุ่นยนต์"))
+        self.assertEqual(list(search_items(PortfolioItem.objects.all(), "หุ่นยนต์ลับ")), [self.secret])
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN ทุก query ของหน้าหลักบนข้อมูลจำลอง: ห้ามอ่านตารางใหญ่ทั้งตาราง (Seq Scan)
+    และห้ามเรียงแถวจากตารางใหญ่เอง (filesort) ต้องมี index รองรับเสมอ
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [Category.objects.create(name=f"Plan {i}", slug=f"plan-{i}") for i in range(4)] + [None]
+        cls.owners = []
+        for i in range(5):
+            owner = User.objects.create_user(username=f"plan{i}", email=f"plan{i}@example.com", password="pw")
+            create_items(owner, 200, categories)
+            rebuild_stats(owner.pk)
+            cls.owners.append(owner)
+        cls.owner = cls.owners[0]
+        cls.item = PortfolioItem.objects.filter(owner=cls.owner).first()
+        PortfolioImage.objects.bulk_create([
+            PortfolioImage(portfolio_item=item, image=f"portfolio_gallery/{n}.jpg")
+            for item in PortfolioItem.objects.all() for n in range(item.pk % 3)
+        ])
+        analyze()
+
+    def setUp(self):
+        if not supports_plan_checks():
+            self.skipTest(f"ไม่รองรับการตรวจ query plan บน {connection.vendor}")
+        cache.clear()
+
+    def assert_indexed(self, url, login=False):
+        if login:
+            self.client.force_login(self.owner)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, secure=True)
+        self.assertIn(response.status_code, (200, 302))
+
+        problems = plan_problems(ctx.captured_queries)
+        self.assertFalse(problems, "\n\n".join(f"{sql}\n  -> {'; '.join(found)}" for sql, found in problems))
+
+    def test_dashboard(self):
+        self.assert_indexed(reverse('dashboard'), login=True)
+        self.assert_indexed(reverse('dashboard') + "?page=3", login=True)
+
+    def test_public_portfolio(self):
+        self.assert_indexed(reverse('public_portfolio', args=[self.owner.username]))
+
+    def test_category_items(self):
+        url = reverse('portfolio_category_items', args=[self.owner.username])
+        self.assert_indexed(f"{url}?category={self.item.category_id or 'none'}&page=2")
+        self.assert_indexed(f"{url}?category=none&page=2")
+
+    def test_portfolio_detail(self):
+        self.assert_indexed(reverse('portfolio_detail', args=[self.owner.username, self.item.pk]))
+
+    def test_download_pdf(self):
+        self.assert_indexed(reverse('download_portfolio_pdf'), login=True)
+
+    def test_pdf_render_queries(self):
+        # หน้าดาวน์โหลดแค่สั่งงานแล้ว redirect: query ของ Worker (fingerprint + render) ต้อง EXPLAIN ตรงนี้
+        # ไม่ต้อง layout PDF จริง (ช้า และไม่ได้ยิง query)
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        with mock.patch.object(HTML, 'write_pdf', return_value=b'%PDF-1.7 test'):
+            with CaptureQueriesContext(connection) as ctx:
+                portfolio_fingerprint(self.owner)
+                self.assertEqual(render_portfolio_pdf(self.owner), b'%PDF-1.7 test')
+
+        problems = plan_problems(ctx.captured_queries)
+        self.assertFalse(problems, "\n\n".join(f"{sql}\n  -> {'; '.join(found)}" for sql, found in problems))
+
+
+class StaticAssetsTests(SimpleTestCase):
+    """collectstatic -> ชื่อไฟล์มี hash + .br/.gz / Middleware เลือก encoding + cache header"""
+
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        css = "body { color: #334155; }\n" * 200
+        Path(source.name, "app.css").write_text(css)
+        Path(source.name, "logo.png").write_bytes(b"\x89PNG" + bytes(range(256)) * 4)
+
+        settings_override = override_settings(
+            STATIC_ROOT=root.name,
+            STATICFILES_DIRS=[source.name],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self.root = Path(root.name)
+        self.css = css.encode()
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse("app"))
+        self.factory = RequestFactory()
+
+    def get(self, name, **headers):
+        return self.middleware(self.factory.get(f"/static/{name}", headers=headers))
+
+    def hashed_name(self, name):
+        return staticfiles_storage.stored_name(name)
+
+    def test_collectstatic_writes_compressed_variants(self):
+        hashed = self.hashed_name("app.css")
+        self.assertNotEqual(hashed, "app.css")
+        self.assertTrue((self.root / f"{hashed}.br").exists())
+        self.assertTrue((self.root / f"{hashed}.gz").exists())
+        # รูปบีบอัดซ้ำไม่ได้อะไร ไม่ต้องมี .br/.gz
+        self.assertFalse(list(self.root.glob("logo*.br")))
+
+    def test_negotiates_encoding(self):
+        hashed = self.hashed_name("app.css")
+        response = self.get(hashed, accept_encoding="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(b"".join(response.streaming_content)), self.css)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.get(hashed, accept_encoding="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.css)
+
+        response = self.get(hashed)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response.streaming_content), self.css)
+
+    def test_cache_headers_and_etag(self):
+        hashed = self.hashed_name("app.css")
+        response = self.get(hashed, accept_encoding="br")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+        # ETag ของแต่ละ encoding ต่างกัน และส่งกลับมาได้ 304
+        etag = response["ETag"]
+        self.assertNotEqual(etag, self.get(hashed, accept_encoding="gzip")["ETag"])
+        self.assertEqual(self.get(hashed, accept_encoding="br", if_none_match=etag).status_code, 304)
+
+        # ชื่อเดิม (ไม่มี hash) cache สั้นๆ
+        response = self.get("app.css")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=300", response["Cache-Control"])
+
+    def test_unknown_paths_fall_through(self):
+        self.assertEqual(self.get("missing.css").content, b"app")
+        self.assertEqual(self.get("../settings.py").content, b"app")
+
+
+class MediaServingTests(TestCase):
+    """/media/: เช็ค is_public ของเจ้าของ / ETag + 304 / Range / ส่งต่อให้ proxy"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, MEDIA_SENDFILE="")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.content = bytes(range(256)) * 8
+        Path(media_root.name, "portfolio_covers").mkdir()
+        Path(media_root.name, "portfolio_covers", "item_0.jpg").write_bytes(self.content)
+        Path(media_root.name, "pdf_exports").mkdir()
+        Path(media_root.name, "pdf_exports", "secret.pdf").write_bytes(b"%PDF")
+
+        self.owner = User.objects.create_user(username="mediaowner", email="media@example.com", password="pw")
+        create_items(self.owner, 1, [None])
+        self.url = reverse("media", args=["portfolio_covers/item_0.jpg"])
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers, secure=True)
+
+    def set_public(self, is_public):
+        self.owner.profile.is_public = is_public
+        self.owner.profile.save()
+
+    def test_public_file_with_conditional_get(self):
+        response = self.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("public", response["Cache-Control"])
+
+        response = self.get(self.url, if_none_match=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.get(self.url, range="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.content)}")
+        self.assertEqual(b"".join(response.streaming_content), self.content[10:20])
+
+        response = self.get(self.url, range="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), self.content[-5:])
+
+        response = self.get(self.url, range=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+
+        # If-Range ไม่ตรง (ไฟล์เปลี่ยนแล้ว) -> ส่งทั้งไฟล์
+        response = self.get(self.url, range="bytes=0-9", if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    async def test_asgi_streams_file_in_chunks(self):
+        # ใต้ ASGI ต้องเป็น async iterator ไม่อย่างนั้น Django อ่านทั้งไฟล์เข้า memory ก่อนส่ง
+        response = await self.async_client.get(self.url, secure=True)
+        self.assertTrue(response.is_async)
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content]), self.content)
+
+        response = await self.async_client.get(self.url, headers={"range": "bytes=10-19"}, secure=True)
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content]), self.content[10:20])
+
+    def test_private_owner_only(self):
+        self.set_public(False)
+        self.assertEqual(self.get(self.url).status_code, 404)
+
+        self.client.force_login(self.owner)
+        response = self.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_unserved_paths(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.get(reverse("media", args=["pdf_exports/secret.pdf"])).status_code, 404)
+        self.assertEqual(self.get(reverse("media", args=["portfolio_covers/../pdf_exports/secret.pdf"])).status_code, 404)
+        self.assertEqual(self.get(reverse("media", args=["portfolio_covers/missing.jpg"])).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect", MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_accel_redirect(self):
+        response = self.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/portfolio_covers/item_0.jpg")
+        self.assertEqual(response.content, b"")
+
+
+def jpeg_bytes(size=(64, 48), color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def png_claiming_size(width, height):
+    """PNG เล็กๆ ที่ header บอกขนาด width x height (ข้อมูลจริงไม่ครบ ถอดรหัสไม่ได้)"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (1, 1)).save(buffer, format="PNG")
+    data = bytearray(buffer.getvalue())
+    # IHDR อยู่ต่อจาก signature 8 bytes: length(4) type(4) width(4) height(4) ... CRC ของ type + data
+    data[16:24] = struct.pack(">II", width, height)
+    data[29:33] = struct.pack(">I", zlib.crc32(bytes(data[12:29])))
+    return bytes(data)
+
+
+class ImageBoundsTests(SimpleTestCase):
+    """ถอดรหัสรูปแบบจำกัดหน่วยความจำ: เช็ค header ก่อน / JPEG ย่อตั้งแต่ตอนถอดรหัส / หมุนตาม EXIF"""
+
+    @override_settings(IMAGE_MAX_PIXELS=1_000_000)
+    def test_oversized_header_rejected_before_decode(self):
+        data = png_claiming_size(2000, 2000)
+        with self.assertRaises(ImageTooLarge):
+            open_bounded_image(io.BytesIO(data), (1200, 1200))
+        with self.assertRaises(ValidationError):
+            validate_image_size(SimpleUploadedFile("huge.png", data, content_type="image/png"))
+
+    def test_jpeg_is_drafted_to_target_size(self):
+        data = jpeg_bytes(size=(2400, 1800))
+        # bitmap เต็มขนาดเกินเพดาน แต่ draft ย่อลงตั้งแต่ถอดรหัสจึงผ่าน
+        with override_settings(IMAGE_MAX_DECODE_BYTES=2400 * 1800 * 4 - 1):
+            img = open_bounded_image(io.BytesIO(data), (300, 300))
+            self.assertEqual(img.size, (600, 450))
+            img.load()
+
+    def test_exif_orientation_survives_thumbnail(self):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: หมุน 90 องศา (ถ่ายแนวตั้งจากมือถือ)
+        Image.new("RGB", (400, 200), "red").save(buffer, format="JPEG", exif=exif)
+
+        compressed = compress_image(SimpleUploadedFile("phone.jpg", buffer.getvalue()), max_size=(100, 100))
+        with Image.open(compressed) as img:
+            self.assertEqual(img.size, (50, 100))
+
+
+class PortfolioArchiveTests(TestCase):
+    """import_portfolios (ZIP + manifest.jsonl, ทำต่อจาก checkpoint ได้) / Export ZIP แบบ stream"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tmp = Path(media_root.name)
+
+        self.category = Category.objects.create(name="Web", slug="web")
+        self.student = User.objects.create_user(username="student1", email="s1@example.com", password="pw")
+
+    def build_archive(self, entries, files):
+        path = self.tmp / "import.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr(MANIFEST_NAME, "".join(json.dumps(entry) + "\n" for entry in entries))
+            for name, data in files.items():
+                archive.writestr(name, data)
+        return path
+
+    def entry(self, title, **extra):
+        return {"username": "student1", "title": title, "description": "งานกลุ่ม", "category": "web",
+                "event_date": "2024-03-01", "cover_image": "media/a.png", "images": ["media/b.jpg"], **extra}
+
+    def test_import_in_batches(self):
+        png = io.BytesIO()
+        Image.new("RGBA", (2000, 1000), "blue").save(png, format="PNG")
+        path = self.build_archive(
+            [
+                self.entry("ผลงาน 1"),
+                self.entry("ผลงาน 2", images=[]),
+                self.entry("ไม่มีผู้ใช้", username="nobody"),
+                self.entry("ไม่มีไฟล์", cover_image="media/missing.jpg"),
+                self.entry("ผลงาน 3", username="student2", email="s2@example.com", category=None),
+            ],
+            {"media/a.png": png.getvalue(), "media/b.jpg": jpeg_bytes()},
+        )
+
+        call_command("import_portfolios", str(path), workers=0, batch_size=2, create_users=True, stdout=io.StringIO(), stderr=io.StringIO())
+
+        run = PortfolioImportRun.objects.get()
+        self.assertEqual(run.status, PortfolioImportRun.Status.DONE)
+        self.assertEqual((run.lines_done, run.items_created, run.images_created), (5, 3, 2))
+        self.assertEqual([error["line"] for error in run.errors], [3, 4])
+
+        item = PortfolioItem.objects.get(title="ผลงาน 1")
+        self.assertEqual((item.owner, item.category, item.event_date), (self.student, self.category, datetime.date(2024, 3, 1)))
+        # รูปถูกบีบอัด/ย่อแบบเดียวกับที่อัปโหลดผ่านเว็บ
+        with Image.open(item.cover_image.path) as cover:
+            self.assertEqual((cover.format, cover.width), ("JPEG", 1200))
+        self.assertEqual(item.images.count(), 1)
+        self.assertEqual(get_stats(self.student).item_count, 2)
+        self.assertTrue(User.objects.filter(username="student2", email="s2@example.com").exists())
+
+        # ไฟล์เดิมสั่งซ้ำ: เสร็จไปแล้ว ไม่เพิ่มซ้ำ
+        call_command("import_portfolios", str(path), workers=0, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(PortfolioItem.objects.count(), 3)
+
+    def test_resumes_from_checkpoint(self):
+        path = self.build_archive(
+            [self.entry("ผลงาน 1"), self.entry("ผลงาน 2")],
+            {"media/a.png": jpeg_bytes(), "media/b.jpg": jpeg_bytes()},
+        )
+        # จำลองรอบก่อนที่พังหลังบันทึกบรรทัดแรกไปแล้ว
+        PortfolioImportRun.objects.create(
+            archive_name="import.zip", archive_sha256=file_sha256(path), lines_done=1, items_created=1,
+            status=PortfolioImportRun.Status.FAILED,
+        )
+
+        call_command("import_portfolios", str(path), workers=0, stdout=io.StringIO())
+
+        self.assertEqual(list(PortfolioItem.objects.values_list("title", flat=True)), ["ผลงาน 2"])
+        run = PortfolioImportRun.objects.get()
+        self.assertEqual((run.status, run.lines_done, run.items_created), (PortfolioImportRun.Status.DONE, 2, 2))
+
+    def test_export_streams_importable_archive(self):
+        storage_names = {}
+        for name, data in (("portfolio_covers/c.jpg", jpeg_bytes()), ("portfolio_gallery/g.jpg", jpeg_bytes(color="green"))):
+            (self.tmp / name).parent.mkdir(exist_ok=True)
+            (self.tmp / name).write_bytes(data)
+            storage_names[name] = data
+        item = PortfolioItem.objects.create(owner=self.student, title="ส่งออก", description="d",
+                                            category=self.category, cover_image="portfolio_covers/c.jpg")
+        PortfolioImage.objects.create(portfolio_item=item, image="portfolio_gallery/g.jpg")
+
+        self.client.force_login(self.student)
+        response = self.client.get(reverse("export_portfolio_archive"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment", response["Content-Disposition"])
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+            manifest = [json.loads(line) for line in archive.read(MANIFEST_NAME).decode().splitlines()]
+            self.assertEqual(manifest[0]["title"], "ส่งออก")
+            self.assertEqual(manifest[0]["category"], "web")
+            self.assertEqual(archive.read(manifest[0]["cover_image"]), storage_names["portfolio_covers/c.jpg"])
+            self.assertEqual(archive.read(manifest[0]["images"][0]), storage_names["portfolio_gallery/g.jpg"])
+            self.assertEqual(json.loads(archive.read("profile.json"))["username"], "student1")
+
+    async def test_export_streams_under_asgi(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse("export_portfolio_archive"), secure=True)
+        self.assertTrue(response.is_async)
+
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(json.loads(archive.read("profile.json"))["username"], "student1")
+            self.assertEqual(archive.read(MANIFEST_NAME), b"")
+
+
+def render_or_crash(user_id):
+    """(รันใน Process ลูก) แทน render_pdf_task: user #2 ทำให้ Process ตายทันทีเหมือนหน่วยความจำไม่พอ"""
+    if user_id == 2:
+        os._exit(1)
+    return PdfRenderResult(user_id, f"user{user_id}", b"%PDF-1.7", None, 0.0)
+
+
+class RenderPdfsCommandTests(TestCase):
+    """manage.py render_pdfs: เลือกผู้ใช้ตามหมวดหมู่ / รายชื่อ แล้วเขียนลงโฟลเดอร์หรือ ZIP"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tmp = Path(media_root.name)
+
+        web = Category.objects.create(name="Web", slug="web")
+        design = Category.objects.create(name="Design", slug="design")
+        self.web_students = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"grad{i}", email=f"grad{i}@example.com", password="pw")
+            create_items(user, 2, [web if i < 2 else design])
+            if i < 2:
+                self.web_students.append(user)
+
+    def test_category_to_zip(self):
+        path = self.tmp / "cohort.zip"
+        out = io.StringIO()
+        call_command("render_pdfs", category="web", zip=str(path), workers=0, stdout=out, stderr=io.StringIO())
+
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["Portfolio_grad0.pdf", "Portfolio_grad1.pdf"])
+        self.assertIn("สำเร็จ 2/2", out.getvalue())
+
+    def test_user_list_to_directory(self):
+        call_command("render_pdfs", users=["grad2"], output_dir=str(self.tmp / "pdfs"), workers=0,
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertTrue((self.tmp / "pdfs" / "Portfolio_grad2.pdf").exists())
+
+        with self.assertRaises(CommandError):
+            call_command("render_pdfs", users=["nobody"], output_dir=str(self.tmp / "pdfs"), workers=0)
+
+    def test_crashed_process_fails_only_its_user(self):
+        # Process ลูกตายทำให้ทั้ง Pool พัง: คนอื่นในรุ่นต้องยังได้ PDF
+        results = list(RenderPdfsCommand().results([1, 2, 3, 4, 5], workers=2, task=render_or_crash))
+
+        self.assertEqual(sorted(result.user_id for result in results), [1, 2, 3, 4, 5])
+        failed = [result for result in results if result.error]
+        self.assertEqual([result.user_id for result in failed], [2])
+        self.assertIn("BrokenProcessPool", failed[0].error)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalUrlFetcherTests(SimpleTestCase):
+    """URL Fetcher ของ PDF: อ่าน MEDIA / STATIC จาก Storage ตรงๆ และปฏิเสธ host ที่ไม่ได้อนุญาต (กัน SSRF)"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        static_dir = tempfile.TemporaryDirectory()
+        static_root = tempfile.TemporaryDirectory()
+        fonts = tempfile.TemporaryDirectory()
+        for directory in (media_root, static_dir, static_root, fonts):
+            self.addCleanup(directory.cleanup)
+        Path(media_root.name, "portfolio_covers").mkdir()
+        Path(media_root.name, "portfolio_covers", "cover.jpg").write_bytes(b"jpeg")
+        Path(static_dir.name, "pdf.css").write_text("body {}")
+        Path(fonts.name, "font.woff2").write_bytes(b"woff2")
+
+        # Server ฟอนต์จำลองบนเครื่อง (แทน fonts.gstatic.com)
+        self.font_server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=fonts.name))
+        threading.Thread(target=self.font_server.serve_forever, daemon=True).start()
+        self.addCleanup(self.font_server.server_close)
+        self.addCleanup(self.font_server.shutdown)
+
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root.name, STATIC_ROOT=static_root.name, STATICFILES_DIRS=[static_dir.name],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            PDF_FETCH_ALLOWED_HOSTS=["127.0.0.1"],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # โดเมนนี้ไม่มีอยู่จริง ถ้ายิง HTTP ออกไปจะพังทันที
+        self.fetcher = LocalUrlFetcher("https://smafolio.invalid/")
+
+    def test_media_and_static_read_from_storage(self):
+        result = self.fetcher("https://smafolio.invalid/media/portfolio_covers/cover.jpg")
+        self.assertEqual((result["string"], result["mime_type"]), (b"jpeg", "image/jpeg"))
+        self.assertEqual(self.fetcher("/static/pdf.css")["string"], b"body {}")
+
+    def test_allowed_host_is_fetched(self):
+        url = f"http://127.0.0.1:{self.font_server.server_port}/font.woff2"
+        self.assertEqual(self.fetcher(url)["string"], b"woff2")
+
+    def test_other_hosts_are_refused(self):
+        for url in (
+            "http://169.254.169.254/latest/meta-data/",
+            "https://evil.example.com/media/portfolio_covers/cover.jpg",
+            "https://smafolio.invalid/admin/",
+            "file:///etc/passwd",
+        ):
+            with self.subTest(url), self.assertRaises(ValueError):
+                self.fetcher(url)
+
+
+class PdfExportJobTests(TransactionTestCase):
+    """
+    คิวงานสร้าง PDF: Worker จองงานแล้ว render / หน้ารอดาวน์โหลดเช็คสถานะเป็น JSON / เห็นได้เฉพาะเจ้าของ
+    ใช้ TransactionTestCase เพราะ process_pdf_job ปิด DB connection ทุกครั้งที่ทำงานเสร็จ
+    ไม่ render PDF จริง (ทดสอบแยกไว้แล้ว และช้า)
+    """
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.owner = User.objects.create_user(username="worker", email="worker@example.com", password="pw")
+        self.client.force_login(self.owner)
+
+    def enqueue(self):
+        response = self.client.get(reverse("download_portfolio_pdf"), secure=True)
+        self.assertTemplateUsed(response, "portfolios/pdf_export.html")
+        return response.context["job"]
+
+    def status(self, job):
+        response = self.client.get(reverse("pdf_export_status", args=[job.pk]), secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_worker_claims_and_renders_job(self):
+        job = self.enqueue()
+        self.assertEqual(self.status(job), {"status": PdfExportJob.Status.PENDING})
+
+        self.assertEqual(claim_pending_jobs(5), [job.pk])
+        self.assertEqual(claim_pending_jobs(5), [])  # Worker อื่นจองซ้ำไม่ได้
+        self.assertEqual(self.status(job), {"status": PdfExportJob.Status.RUNNING})
+
+        with mock.patch("portfolios.jobs.render_portfolio_pdf", return_value=b"%PDF-1.7 worker") as render:
+            self.assertEqual(process_pdf_job(job.pk), PdfExportJob.Status.DONE)
+        render.assert_called_once_with(self.owner, base_url="https://testserver/")
+
+        download_url = reverse("pdf_export_download", args=[job.pk])
+        self.assertEqual(self.status(job), {"status": PdfExportJob.Status.DONE, "download_url": download_url})
+        response = self.client.get(download_url, secure=True)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.7 worker")
+
+    def test_failed_render_is_reported(self):
+        job = self.enqueue()
+        claim_pending_jobs(5)
+
+        with mock.patch("portfolios.jobs.render_portfolio_pdf", side_effect=RuntimeError("ฟอนต์หาย")), \
+                self.assertLogs("portfolios.jobs", "ERROR"):
+            self.assertEqual(process_pdf_job(job.pk), PdfExportJob.Status.FAILED)
+
+        self.assertEqual(self.status(job), {"status": PdfExportJob.Status.FAILED, "error": "ฟอนต์หาย"})
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(
+            self.client.get(reverse("pdf_export_download", args=[job.pk]), secure=True).status_code, 404
+        )
+
+    def test_jobs_are_visible_only_to_their_owner(self):
+        job = self.enqueue()
+        claim_pending_jobs(5)
+        with mock.patch("portfolios.jobs.render_portfolio_pdf", return_value=b"%PDF-1.7 worker"):
+            process_pdf_job(job.pk)
+
+        other = User.objects.create_user(username="other", email="other@example.com", password="pw")
+        self.client.force_login(other)
+        for name in ("pdf_export_status", "pdf_export_download"):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name, args=[job.pk]), secure=True).status_code, 404)
+
+
+class PdfExportCacheTests(TestCase):
+    """ดาวน์โหลด PDF: ข้อมูลไม่เปลี่ยนใช้ไฟล์เดิม (304 ได้) / แก้ข้อมูลแล้ว fingerprint เปลี่ยน สั่งสร้างใหม่"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, PROCESS_IMAGES_IN_BACKGROUND=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.owner = User.objects.create_user(username="pdf", email="pdf@example.com", password="pw")
+        create_items(self.owner, 2, [None])
+        self.item = PortfolioItem.objects.filter(owner=self.owner).first()
+        self.client.force_login(self.owner)
+        self.url = reverse("download_portfolio_pdf")
+
+    def finish(self, job):
+        """ทำแทน Worker (ไม่ต้อง render PDF จริง)"""
+        job.file.save(f"Portfolio_{self.owner.username}.pdf", ContentFile(b"%PDF-1.7 test"), save=False)
+        job.status = PdfExportJob.Status.DONE
+        job.finished_at = timezone.now()
+        job.save()
+        return job
+
+    def test_unchanged_data_serves_cached_export(self):
+        response = self.client.get(self.url, secure=True)
+        self.assertTemplateUsed(response, "portfolios/pdf_export.html")
+        job = self.finish(response.context["job"])
+
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.7 test")
+        self.assertEqual(PdfExportJob.objects.count(), 1)
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url, secure=True, headers={"If-None-Match": etag}).status_code, 304)
+        response = self.client.get(self.url, secure=True, headers={"If-Modified-Since": response["Last-Modified"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(job.fingerprint, portfolio_fingerprint(self.owner, "https://testserver/"))
+
+    def test_edits_change_fingerprint_and_export(self):
+        image = PortfolioImage.objects.create(portfolio_item=self.item, image="portfolio_gallery/a.jpg")
+        profile = self.owner.profile
+
+        def edit_item():
+            self.item.title = "ชื่อใหม่"
+            self.item.save()
+
+        def edit_image():
+            image.image = "portfolio_gallery/b.jpg"
+            image.save()
+
+        def edit_profile():
+            profile.bio = "แนะนำตัวใหม่"
+            profile.save()
+
+        def rename_user():
+            self.owner.username = "pdf2"
+            self.owner.save()
+
+        def rename_category():
+            # ชื่อหมวดหมู่พิมพ์อยู่ใน PDF แต่การแก้หมวดหมู่ไม่แตะ updated_at ของผลงาน
+            category.name = "หมวดใหม่"
+            category.save()
+
+        category = Category.objects.create(name="กิจกรรม", slug="activity")
+        PortfolioItem.objects.filter(pk=self.item.pk).update(category=category)
+
+        for edit in (edit_item, edit_image, edit_profile, rename_user, rename_category):
+            with self.subTest(edit.__name__):
+                self.finish(self.client.get(self.url, secure=True).context["job"])
+                before = portfolio_fingerprint(self.owner)
+                edit()
+                self.assertNotEqual(portfolio_fingerprint(self.owner), before)
+
+                response = self.client.get(self.url, secure=True)
+                self.assertTemplateUsed(response, "portfolios/pdf_export.html")
+                self.assertEqual(response.context["job"].status, PdfExportJob.Status.PENDING)
+
+
+class BackgroundImageTests(TestCase):
+    """รูปที่อัปโหลดบันทึกไว้ก่อน (pending) แล้ว Worker มาจองไปบีบอัด"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, PROCESS_IMAGES_IN_BACKGROUND=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.owner = User.objects.create_user(username="bg", email="bg@example.com", password="pw")
+        self.client.force_login(self.owner)
+
+    def upload(self, name, color):
+        return SimpleUploadedFile(name, jpeg_bytes(size=(2400, 1800), color=color), content_type="image/jpeg")
+
+    def test_worker_claims_and_compresses_pending_images(self):
+        item = PortfolioItem.objects.create(owner=self.owner, title="t", description="d",
+                                            cover_image=self.upload("cover.jpg", "red"))
+        PortfolioImage.objects.create(portfolio_item=item, image=self.upload("gallery.jpg", "blue"))
+        status_url = reverse("portfolio_image_status", args=[item.pk])
+
+        status = self.client.get(status_url, secure=True).json()
+        self.assertEqual((status["cover"], status["done"]), (ImageStatus.PENDING, False))
+
+        claimed = claim_pending_images(10)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(claim_pending_images(10), [])  # Worker อื่นจองซ้ำไม่ได้
+
+        for model_label, pk in claimed:
+            self.assertEqual(process_uploaded_image(model_label, pk), ImageStatus.READY)
+
+        status = self.client.get(status_url, secure=True).json()
+        self.assertTrue(status["done"])
+        item.refresh_from_db()
+        self.assertLessEqual(max(item.cover_image.width, item.cover_image.height), 1200)
+
+    @override_settings(PROCESS_IMAGES_IN_BACKGROUND=False)
+    def test_without_worker_processes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = PortfolioItem.objects.create(owner=self.owner, title="t", description="d",
+                                                cover_image=self.upload("cover.jpg", "green"))
+        item.refresh_from_db()
+        self.assertEqual(item.cover_image_status, ImageStatus.READY)
+
+
+class BenchmarkBaselineTests(SimpleTestCase):
+    """manage.py benchmark --baseline: นับเป็น regression เมื่อแย่ลงเกิน threshold / query เพิ่มแม้แต่ตัวเดียว"""
+
+    def results(self, median_ms, queries, images_per_sec, peak_rss_mb):
+        return {
+            'views': {'dashboard': {'median_ms': median_ms, 'queries': queries}},
+            'compress_image': {'12mp': {'images_per_sec': images_per_sec, 'peak_rss_mb': peak_rss_mb}},
+        }
+
+    def test_compare_to_baseline(self):
+        baseline = self.results(median_ms=10.0, queries=5, images_per_sec=4.0, peak_rss_mb=100.0)
+
+        self.assertEqual(compare_to_baseline(self.results(11.9, 5, 3.3, 119.0), baseline, threshold=0.2), [])
+
+        regressions = compare_to_baseline(self.results(12.5, 6, 3.0, 130.0), baseline, threshold=0.2)
+        self.assertEqual(len(regressions), 4)
+        self.assertIn("dashboard: median 10.0 -> 12.5 ms (+25%)", regressions)
+        self.assertIn("dashboard: queries 5 -> 6", regressions)
+
+        # ผลที่ baseline ไม่มี (เช่นหน้าที่เพิ่งเพิ่ม) ไม่นับ
+        self.assertEqual(compare_to_baseline(self.results(99.0, 50, 0.1, 999.0), {}), [])
+
+
+class StoredImageTests(TestCase):
+    """รูปแบบ content-addressed: ไฟล์เนื้อหาเดียวกันเก็บครั้งเดียว + นับการอ้างถึง (refcount)"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, PROCESS_IMAGES_IN_BACKGROUND=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tmp = Path(media_root.name)
+        self.owner = User.objects.create_user(username="cert", email="cert@example.com", password="pw")
+        self.certificate = jpeg_bytes(size=(1600, 1200))
+
+    def upload(self, title):
+        item = PortfolioItem.objects.create(
+            owner=self.owner, title=title, description="d",
+            cover_image=SimpleUploadedFile("cert.jpg", self.certificate, content_type="image/jpeg"),
+        )
+        self.assertEqual(process_uploaded_image("portfolios.PortfolioItem", item.pk), ImageStatus.READY)
+        item.refresh_from_db()
+        return item
+
+    def test_duplicate_uploads_share_one_file(self):
+        first = self.upload("ใบเกียรติบัตร 1")
+        second = self.upload("ใบเกียรติบัตร 2")
+        stored = StoredImage.objects.get()
+
+        self.assertEqual(first.cover_image.name, stored.file.name)
+        self.assertEqual(second.cover_image.name, stored.file.name)
+        self.assertTrue(stored.file.name.startswith("images/"))
+        stored.refresh_from_db()
+        self.assertEqual(stored.refcount, 2)
+        # ไฟล์ดิบที่อัปโหลดมาถูกลบ เหลือไฟล์เดียวใน images/
+        self.assertEqual(list((self.tmp / "portfolio_covers").iterdir()), [])
+
+        first.delete()
+        stored.refresh_from_db()
+        self.assertEqual(stored.refcount, 1)
+
+        out = io.StringIO()
+        call_command("image_storage_report", recount=True, stdout=out)
+        self.assertIn("ประหยัดพื้นที่ได้", out.getvalue())
+        self.assertEqual(storage_report()["saved_bytes"], 0)
+
+        PortfolioImage.objects.create(portfolio_item=second, image=stored.file.name)
+        self.assertEqual(storage_report()["saved_bytes"], stored.size)
+
+    def test_known_source_skips_compression(self):
+        # ไฟล์ต้นฉบับนี้เคยประมวลผลแล้ว: ต้องได้ไฟล์เดิมกลับมาตรงๆ (ถ้าบีบอัดใหม่จะได้ hash อื่น)
+        processed = store_image(jpeg_bytes(color="green"), "jpg", hashlib.sha256(self.certificate).hexdigest())
+        item = self.upload("ใบเกียรติบัตร")
+        self.assertEqual(item.cover_image.name, processed.file.name)
+        processed.refresh_from_db()
+        self.assertEqual(processed.refcount, 1)
+
+    def test_duplicate_avatars_dedupe(self):
+        other = User.objects.create_user(username="twin", email="twin@example.com", password="pw")
+        for user in (self.owner, other):
+            user.profile.avatar = SimpleUploadedFile("me.jpg", jpeg_bytes(color="blue"), content_type="image/jpeg")
+            user.profile.save()
+
+        stored = StoredImage.objects.get()
+        self.assertEqual(stored.refcount, 2)
+        self.assertEqual(
+            set(Profile.objects.filter(user__in=[self.owner, other]).values_list("avatar", flat=True)),
+            {stored.file.name},
+        )
+
+        self.owner.profile.avatar = SimpleUploadedFile("new.jpg", jpeg_bytes(color="green"), content_type="image/jpeg")
+        self.owner.profile.save()
+        stored.refresh_from_db()
+        self.assertEqual(stored.refcount, 1)
+
+
+class MediaGcTests(TestCase):
+    """ลบไฟล์เก่าหลัง commit (ลบผลงาน / เปลี่ยนรูป) + manage.py gc_media (dry-run / quarantine / checkpoint)"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, PROCESS_IMAGES_IN_BACKGROUND=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tmp = Path(media_root.name)
+        self.owner = User.objects.create_user(username="gc", email="gc@example.com", password="pw")
+
+    def write(self, name, data=b"x" * 10, age=None):
+        path = self.tmp / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        if age is not None:
+            old = time.time() - age
+            os.utime(path, (old, old))
+        return name
+
+    def exists(self, name):
+        return (self.tmp / name).exists()
+
+    def test_delete_and_replace_remove_files_after_commit(self):
+        cover = self.write("portfolio_covers/old.jpg")
+        derivative = ImageDerivative.objects.create(
+            source=cover, width=320, format="webp", file=self.write("derivatives/portfolio_covers/old_320w.webp"),
+        )
+        item = PortfolioItem.objects.create(owner=self.owner, title="t", description="d", cover_image=cover)
+        gallery = PortfolioImage.objects.create(portfolio_item=item, image=self.write("portfolio_gallery/g.jpg"))
+
+        item.cover_image = self.write("portfolio_covers/new.jpg")
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assertFalse(self.exists(cover))
+        self.assertFalse(self.exists(derivative.file.name))
+        self.assertFalse(ImageDerivative.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertFalse(self.exists("portfolio_covers/new.jpg"))
+        self.assertFalse(self.exists(gallery.image.name))
+
+        # รูปโปรไฟล์ค่าเริ่มต้นใช้ร่วมกันทุกคน ห้ามลบ
+        self.write("avatars/default.png")
+        self.owner.profile.avatar = SimpleUploadedFile("me.jpg", jpeg_bytes(), content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.profile.save()
+        self.assertTrue(self.exists("avatars/default.png"))
+
+    def test_gc_media(self):
+        day = 60 * 60 * 24 * 2
+        kept = self.write("portfolio_covers/kept.jpg", age=day)
+        PortfolioItem.objects.bulk_create([
+            PortfolioItem(owner=self.owner, title="t", description="d", cover_image=kept),
+        ])
+        orphan = self.write("portfolio_gallery/orphan.jpg", b"o" * 100, age=day)
+        fresh = self.write("portfolio_gallery/fresh.jpg")
+        released = store_image(jpeg_bytes(color="blue"), "jpg")
+        os.utime(self.tmp / released.file.name, (time.time() - day,) * 2)
+        self.write("avatars/default.png", age=day)
+        self.write("unrelated/notes.txt", age=day)
+
+        out = io.StringIO()
+        call_command("gc_media", dry_run=True, stdout=out)
+        self.assertIn("ลบได้ (dry-run) 2 ไฟล์", out.getvalue())
+        self.assertTrue(self.exists(orphan))
+
+        quarantine = self.tmp.parent / f"{self.tmp.name}-quarantine"
+        self.addCleanup(shutil.rmtree, quarantine, ignore_errors=True)
+        call_command("gc_media", quarantine=str(quarantine), batch_size=2, stdout=io.StringIO())
+        run = MediaGcRun.objects.get(dry_run=False)
+        self.assertEqual((run.status, run.orphans, run.bytes_reclaimed), (MediaGcRun.Status.DONE, 2, 100 + released.size))
+        self.assertEqual((quarantine / orphan).read_bytes(), b"o" * 100)
+        self.assertFalse(self.exists(orphan))
+        self.assertFalse(StoredImage.objects.exists())
+        for name in (kept, fresh, "avatars/default.png", "unrelated/notes.txt"):
+            self.assertTrue(self.exists(name), name)
+
+    def test_resumes_from_checkpoint(self):
+        day = 60 * 60 * 24 * 2
+        before = self.write("portfolio_gallery/a.jpg", age=day)
+        after = self.write("portfolio_gallery/b.jpg", age=day)
+        MediaGcRun.objects.create(last_name=before, files_scanned=1, status=MediaGcRun.Status.FAILED)
+
+        call_command("gc_media", stdout=io.StringIO())
+
+        self.assertTrue(self.exists(before))
+        self.assertFalse(self.exists(after))
+        run = MediaGcRun.objects.get()
+        self.assertEqual((run.status, run.files_scanned, run.last_name), (MediaGcRun.Status.DONE, 2, after))
+
+
+class ChunkedUploadTests(TestCase):
+    """อัปโหลดรูปทีละ chunk (tus) แล้วส่งฟอร์มผลงานด้วย token แทนไฟล์"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, PROCESS_IMAGES_IN_BACKGROUND=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.owner = User.objects.create_user(username="tus", email="tus@example.com", password="pw")
+        self.client.force_login(self.owner)
+
+    def start(self, data, filename="photo.jpg", sha256=None):
+        metadata = ",".join(
+            f"{key} {base64.b64encode(value.encode()).decode()}"
+            for key, value in (("filename", filename), ("sha256", sha256 or hashlib.sha256(data).hexdigest()))
+        )
+        return self.client.post(
+            reverse("image_uploads"), secure=True,
+            headers={"Tus-Resumable": "1.0.0", "Upload-Length": str(len(data)), "Upload-Metadata": metadata},
+        )
+
+    def patch(self, location, chunk, offset):
+        return self.client.patch(
+            location, chunk, content_type="application/offset+octet-stream", secure=True,
+            headers={"Tus-Resumable": "1.0.0", "Upload-Offset": str(offset)},
+        )
+
+    def upload(self, data):
+        """อัปโหลดครบ 2 chunk แล้วบีบอัด (เหมือน Worker) คืนค่า token"""
+        created = self.start(data)
+        self.assertEqual(created.status_code, 201)
+        location = created["Location"]
+        half = len(data) // 2
+        self.assertEqual(self.patch(location, data[:half], 0).status_code, 204)
+        self.assertEqual(self.patch(location, data[half:], half).status_code, 204)
+        upload = ImageUpload.objects.get(token=created.json()["token"])
+        self.assertEqual(process_uploaded_image("portfolios.ImageUpload", upload.pk), ImageStatus.READY)
+        return upload.token
+
+    def test_resume_after_partial_chunk(self):
+        data = jpeg_bytes(size=(320, 240))
+        location = self.start(data)["Location"]
+
+        # ส่งไปได้แค่ส่วนแรก: HEAD บอก offset ที่ได้รับไว้แล้ว ส่ง offset อื่นได้ 409
+        self.assertEqual(self.patch(location, data[:100], 0)["Upload-Offset"], "100")
+        self.assertEqual(self.client.head(location, secure=True)["Upload-Offset"], "100")
+        self.assertEqual(self.patch(location, data[50:], 50).status_code, 409)
+
+        response = self.patch(location, data[100:], 100)
+        self.assertEqual((response.status_code, response["Upload-Offset"]), (204, str(len(data))))
+        upload = ImageUpload.objects.get()
+        self.assertEqual(upload.file_status, ImageStatus.PENDING)
+        self.assertEqual(upload.file.read(), data)
+
+        # token ของคนอื่นใช้ไม่ได้
+        self.client.force_login(User.objects.create_user(username="other", email="o@example.com", password="pw"))
+        self.assertEqual(self.client.head(location, secure=True).status_code, 404)
+
+    def test_checksum_mismatch_restarts(self):
+        data = jpeg_bytes()
+        location = self.start(data, sha256="0" * 64)["Location"]
+        response = self.patch(location, data, 0)
+        self.assertEqual((response.status_code, response["Upload-Offset"]), (460, "0"))
+        self.assertEqual(ImageUpload.objects.get().file_status, ImageStatus.UPLOADING)
+        self.assertEqual(self.start(data, sha256="abc").status_code, 400)
+
+    def test_form_accepts_upload_tokens(self):
+        cover = self.upload(jpeg_bytes(size=(800, 600), color="blue"))
+        gallery = self.upload(jpeg_bytes(size=(800, 600), color="green"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("create_portfolio"), {
+                "title": "ผลงาน", "description": "d", "cover_upload": cover,
+                "images-TOTAL_FORMS": "4", "images-INITIAL_FORMS": "0",
+                "images-MIN_NUM_FORMS": "0", "images-MAX_NUM_FORMS": "4",
+                "images-0-upload": gallery,
+            }, secure=True)
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+
+        item = PortfolioItem.objects.get()
+        self.assertEqual(item.cover_image.name, ImageUpload.objects.get(token=cover).file.name)
+        self.assertEqual(item.cover_image_status, ImageStatus.READY)
+        self.assertEqual(item.images.get().image.name, ImageUpload.objects.get(token=gallery).file.name)
+        # แถวของ upload + แถวของผลงานอ้างถึงไฟล์เดียวกัน
+        self.assertEqual(list(StoredImage.objects.values_list("refcount", flat=True)), [2, 2])
+
+        response = self.client.post(reverse("create_portfolio"), {
+            "title": "x", "description": "d", "cover_upload": "missing",
+            "images-TOTAL_FORMS": "0", "images-INITIAL_FORMS": "0",
+        }, secure=True)
+        self.assertIn("ไม่พบไฟล์ที่อัปโหลด", response.context["form"].errors["cover_image"][0])
@@ -0,0 +1,166 @@
+import base64
+import logging
+import os
+import re
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .image_store import content_sha256
+from .models import ImageStatus, ImageUpload, queue_image_processing
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================
+# อัปโหลดรูปทีละ chunk (tus 1.0.0: core + creation)
+# ==========================================
+# 1. POST   /portfolio/uploads/          Upload-Length + Upload-Metadata (filename, sha256) -> 201 + Location / token
+# 2. PATCH  /portfolio/uploads/<token>/  Upload-Offset + body (application/offset+octet-stream) -> 204 + Upload-Offset
+#    เน็ตหลุด: ส่วนที่ได้รับแล้วถูกเก็บไว้ client ถาม offset ด้วย HEAD แล้วส่งต่อจากตรงนั้น
+# 3. chunk สุดท้าย: ตรวจ SHA-256 ทั้งไฟล์ ตรง -> เข้าคิวบีบอัดทันที / ไม่ตรง -> 460 และเริ่มส่งใหม่จาก 0
+# 4. ส่งฟอร์มผลงานด้วย token แทนไฟล์ (ดู upload_field_value)
+# body ของ PATCH อ่านทีละ UPLOAD_CHUNK_SIZE เขียนต่อท้ายไฟล์เลย ไม่เก็บทั้ง request ไว้ใน memory
+
+TUS_VERSION = '1.0.0'
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+SHA256_RE = re.compile(r'[0-9a-f]{64}')
+EXTENSION_RE = re.compile(r'\.[a-z0-9]{1,5}')
+
+
+class UploadConflict(Exception):
+    """offset ที่ client ส่งมาไม่ตรงกับที่ได้รับไว้ (หรือมี PATCH อื่นของไฟล์เดียวกันเขียนไปก่อน)"""
+
+
+def parse_metadata(header):
+    """Upload-Metadata: "filename ZnVuLmpwZw==,sha256 YWJj..." (ค่าเข้ารหัส base64)"""
+    metadata = {}
+    for pair in filter(None, (part.strip() for part in header.split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode() if value else ''
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError(f"Upload-Metadata ของ {key!r} ไม่ใช่ base64")
+    return metadata
+
+
+def create_upload(user, length, metadata):
+    """เริ่มอัปโหลดไฟล์ใหม่ (ไฟล์เปล่าใน UPLOAD_DIR) คืนค่า ImageUpload"""
+    try:
+        length = int(length)
+    except (TypeError, ValueError):
+        raise ValueError("ต้องระบุ Upload-Length")
+    if not 0 < length <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise ValueError(f"ขนาดไฟล์ต้องไม่เกิน {settings.CHUNKED_UPLOAD_MAX_SIZE // 1024 // 1024} MB")
+
+    sha256 = metadata.get('sha256', '').lower()
+    if not SHA256_RE.fullmatch(sha256):
+        raise ValueError("ต้องระบุ sha256 (hex) ของไฟล์ใน Upload-Metadata")
+
+    filename = os.path.basename(metadata.get('filename', '').replace('\\', '/'))[:255] or 'upload'
+    extension = os.path.splitext(filename)[1].lower()
+    token = secrets.token_urlsafe(32)
+
+    upload = ImageUpload(owner=user, token=token, filename=filename, upload_length=length, sha256=sha256)
+    upload.file.save(token + (extension if EXTENSION_RE.fullmatch(extension) else ''), ContentFile(b''), save=False)
+    upload.save()
+    return upload
+
+
+def append_chunk(upload, stream):
+    """
+    อ่าน stream (body ของ PATCH) ทีละ chunk เขียนต่อท้ายไฟล์ที่ upload_offset จนหมดหรือครบ upload_length
+    ถ้าการเชื่อมต่อหลุดกลางทาง ส่วนที่ได้รับแล้วยังนับ (offset เลื่อนตามจริง) คืนค่า offset ใหม่
+    """
+    start = upload.upload_offset
+    # Storage เป็น FileSystemStorage (เขียนต่อท้ายไฟล์เดิมได้ ไม่ต้องเขียนใหม่ทั้งไฟล์)
+    with open(default_storage.path(upload.file.name), 'r+b') as f:
+        f.seek(start)
+        f.truncate()  # ทิ้งส่วนที่เขียนค้างไว้แต่ไม่ได้นับ (PATCH ก่อนหน้าที่พังก่อนอัปเดต offset)
+        remaining = upload.upload_length - start
+        try:
+            while remaining > 0:
+                chunk = stream.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        except OSError:
+            logger.info("Upload %s: connection dropped at %d bytes", upload.pk, f.tell())
+        offset = f.tell()
+
+    updated = ImageUpload.objects.filter(pk=upload.pk, upload_offset=start).update(
+        upload_offset=offset, updated_at=timezone.now(),
+    )
+    if not updated:
+        raise UploadConflict()
+    upload.upload_offset = offset
+    return offset
+
+
+def finish_upload(upload):
+    """
+    ได้รับครบแล้ว: ตรวจ SHA-256 ทั้งไฟล์ ตรง -> เข้าคิวบีบอัด (คืนค่า True)
+    ไม่ตรง -> ล้างไฟล์ให้ client ส่งใหม่ตั้งแต่ต้น (คืนค่า False)
+    """
+    with upload.file.open('rb'):
+        digest = content_sha256(upload.file)
+    if digest != upload.sha256:
+        with open(default_storage.path(upload.file.name), 'r+b') as f:
+            f.truncate()
+        upload.upload_offset = 0
+        upload.save(update_fields=['upload_offset', 'updated_at'])
+        return False
+
+    upload.file_status = ImageStatus.PENDING
+    upload.save(update_fields=['file_status', 'updated_at'])
+    queue_image_processing(upload)
+    return True
+
+
+def upload_status(upload):
+    return {
+        'token': upload.token,
+        'offset': upload.upload_offset,
+        'length': upload.upload_length,
+        'status': upload.file_status,
+    }
+
+
+def upload_field_value(user, token):
+    """
+    ค่าที่ใส่ให้ ImageField ของฟอร์มแทนไฟล์ที่แนบมากับ POST
+    - บีบอัดเสร็จแล้ว: ชื่อไฟล์ใน images/ (บันทึกแล้วพร้อมใช้ ไม่ต้องประมวลผลซ้ำ)
+    - ยังอยู่ในคิว: สำเนาของไฟล์ต้นฉบับ (เข้าคิวของผลงานตามปกติ ถ้าคิวของ upload เสร็จก่อนจะใช้ผลนั้นเลยจาก source_hash)
+    """
+    upload = ImageUpload.objects.filter(owner=user, token=token).first()
+    if upload is None:
+        raise ValidationError("ไม่พบไฟล์ที่อัปโหลด (อาจหมดอายุแล้ว) กรุณาเลือกรูปใหม่")
+    if upload.file_status == ImageStatus.UPLOADING:
+        raise ValidationError("ไฟล์ยังอัปโหลดไม่ครบ")
+    if upload.file_status == ImageStatus.FAILED:
+        raise ValidationError("ไฟล์ที่อัปโหลดไม่ใช่รูปภาพที่ใช้ได้")
+
+    if upload.file_status != ImageStatus.READY:
+        try:
+            return File(upload.file.open('rb'), name=upload.filename)
+        except FileNotFoundError:
+            # เพิ่งบีบอัดเสร็จพอดี (ไฟล์ต้นฉบับถูกแทนด้วยไฟล์ใน images/ แล้ว)
+            upload.refresh_from_db()
+    return upload.file.name
+
+
+def purge_expired_uploads():
+    """ลบการอัปโหลดที่ไม่ได้แตะนานเกิน CHUNKED_UPLOAD_EXPIRY_SECONDS (ไฟล์ถูกลบหลัง commit ผ่าน signal)"""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY_SECONDS)
+    purged = 0
+    for upload in ImageUpload.objects.filter(updated_at__lt=cutoff).iterator():
+        upload.delete()
+        purged += 1
+    return purged
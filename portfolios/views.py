@@ -1,37 +1,107 @@
-import base64 # ✅ เพิ่ม
-import qrcode # ✅ เพิ่ม
-from django.urls import reverse # ✅ เพิ่ม
-from io import BytesIO
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseForbidden
+import hashlib
+from asgiref.sync import sync_to_async
+from itertools import groupby
+from operator import attrgetter
+from urllib.parse import urlencode
+from django.urls import reverse
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse,
+                         StreamingHttpResponse)
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_http_methods
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from .models import PortfolioItem, PortfolioImage
-from .forms import PortfolioItemForm
+from django.core.paginator import Paginator
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber, Substr
+from django.utils.functional import cached_property
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, quote_etag
+from .models import ImageDerivative, ImageStatus, ImageUpload, PortfolioItem, PortfolioImage, PdfExportJob
+from .forms import PortfolioImageForm, PortfolioItemForm, PortfolioSearchForm
+from .archives import stream_portfolio_archive
+from .executors import run_blocking, stream_for_server
+from .media import PUBLIC, media_access, media_file_response, normalize_media_path
+from .jobs import enqueue_pdf_export, find_cached_export, image_processing_status
+from .instrumentation import performance_stats
+from .page_cache import cache_public_page, mark_cacheable, page_cache_stats
+from .pdf import portfolio_fingerprint
+from .qr import get_qr_code, site_base_url
+from .search import public_items, search_items
+from .stats import category_breakdown, get_stats
+from .imaging import DERIVATIVE_FORMATS, DERIVATIVE_SOURCES, DERIVATIVE_WIDTHS, get_derivative
+from .uploads import (TUS_VERSION, UploadConflict, append_chunk, create_upload, finish_upload, parse_metadata,
+                      upload_status)
 # Import Form จาก users app
 from users.forms import UserUpdateForm, ProfileUpdateForm
 from django.forms import inlineformset_factory
-from weasyprint import HTML
-from django.http import HttpResponse
-from django.template.loader import render_to_string
 
 
 
 User = get_user_model()
 
-def home(request):
+# QR Code เปลี่ยนเฉพาะตอนเปลี่ยน username/โดเมน จึง cache ได้นาน (30 วัน, มี ETag ไว้ตรวจซ้ำ)
+QR_CODE_MAX_AGE = 60 * 60 * 24 * 30
+
+# รูปย่อของไฟล์ต้นฉบับเดิมไม่มีวันเปลี่ยน (cache 1 ปี)
+DERIVATIVE_MAX_AGE = 60 * 60 * 24 * 365
+
+# หน้า Dashboard: จำนวนผลงานต่อหน้า
+DASHBOARD_ITEMS_PER_PAGE = 12
+
+# หน้า Public Portfolio: จำนวนผลงานที่แสดงต่อหมวดหมู่ในแต่ละรอบ (ที่เหลือกด "ดูเพิ่มเติม")
+PORTFOLIO_ITEMS_PER_CATEGORY = 8
+# column ที่การ์ดผลงานใช้ และความยาวคำอธิบายที่ตัดมาแสดงบนการ์ด
+PORTFOLIO_CARD_FIELDS = ('title', 'cover_image', 'cover_image_status', 'event_date', 'category', 'category__name')
+PORTFOLIO_EXCERPT_LENGTH = 300
+# ลำดับผลงานในหมวดหมู่: ใหม่ -> เก่า (ผลงานที่ไม่ระบุวันที่อยู่ท้าย) ใช้ลำดับเดียวกับ Model เพื่อให้ตรงกับ index
+PORTFOLIO_ITEM_ORDER = PortfolioItem._meta.ordering
+
+# หน้าค้นหาผลงาน: จำนวนผลลัพธ์ต่อหน้า
+SEARCH_RESULTS_PER_PAGE = 12
+
+async def aload_user(request):
+    """
+    โหลด request.user ด้วย ORM แบบ async ไว้ก่อน (สำหรับ async view)
+    template / context processor ที่ใช้ user จะได้ไม่ต้องยิง query แบบ sync ใน Event Loop
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+async def home(request):
+    await aload_user(request)
     return render(request, 'home.html')
 
+class KnownCountPaginator(Paginator):
+    """Paginator ที่รู้จำนวนทั้งหมดอยู่แล้ว (จาก PortfolioStats) ไม่ต้องยิง COUNT"""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
+
+
 @login_required # บังคับว่าต้องล็อกอินก่อนถึงจะเข้าหน้านี้ได้
 def dashboard(request):
     """หน้าจัดการข้อมูลส่วนตัวและผลงาน"""
-    
-    # ดึงผลงานทั้งหมดของ user คนนี้มาแสดง
-    my_portfolios = PortfolioItem.objects.filter(owner=request.user)
+
+    # สถิติที่เก็บไว้แล้ว (จำนวนผลงาน / รูป / แยกหมวดหมู่) ไม่ต้อง COUNT ใหม่
+    stats = get_stats(request.user)
+
+    # ดึงผลงานของ user คนนี้ทีละหน้า (JOIN หมวดหมู่ + โหลดเฉพาะ column ที่การ์ดใช้)
+    my_portfolios = portfolio_cards(request.user).order_by(*PORTFOLIO_ITEM_ORDER)
+    paginator = KnownCountPaginator(my_portfolios, DASHBOARD_ITEMS_PER_PAGE, count=stats.item_count)
 
     return render(request, 'portfolios/dashboard.html', {
-        'portfolios': my_portfolios
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'stats': stats,
+        'category_counts': category_breakdown(stats),
     })
 
 @login_required
@@ -59,16 +129,17 @@ def edit_profile(request):
 @login_required
 def create_portfolio(request):
     # สร้าง Formset: บอกว่าให้มีรูปเพิ่มได้สูงสุด 4 รูป (extra=4 คือโชว์ช่องว่าง 4 ช่องเลย)
+    # รูปแต่ละช่องส่งมาเป็นไฟล์ หรือ token ของไฟล์ที่อัปโหลดทีละ chunk ไว้ก่อนแล้วก็ได้ (ดู image_uploads)
     ImageFormSet = inlineformset_factory(
-        PortfolioItem, PortfolioImage, 
+        PortfolioItem, PortfolioImage, form=PortfolioImageForm,
         fields=('image',), 
         extra=4, max_num=4, can_delete=False
     )
 
     if request.method == 'POST':
-        form = PortfolioItemForm(request.POST, request.FILES)
+        form = PortfolioItemForm(request.POST, request.FILES, user=request.user)
         # รับข้อมูลรูปภาพเพิ่มเติม
-        formset = ImageFormSet(request.POST, request.FILES)
+        formset = ImageFormSet(request.POST, request.FILES, form_kwargs={'user': request.user})
         
         if form.is_valid() and formset.is_valid():
             portfolio_item = form.save(commit=False)
@@ -82,8 +153,8 @@ def create_portfolio(request):
             messages.success(request, 'เพิ่มผลงานและรูปภาพเรียบร้อยแล้ว!')
             return redirect('dashboard')
     else:
-        form = PortfolioItemForm()
-        formset = ImageFormSet() # สร้างฟอร์มเปล่าๆ
+        form = PortfolioItemForm(user=request.user)
+        formset = ImageFormSet(form_kwargs={'user': request.user}) # สร้างฟอร์มเปล่าๆ
 
     return render(request, 'portfolios/create_portfolio.html', {
         'form': form,
@@ -91,32 +162,142 @@ def create_portfolio(request):
     })
 
 
-def portfolio_view(request, username):
-    """หน้าแสดง Portfolio สาธารณะของ user นั้นๆ"""
+def can_view_portfolio(request, owner):
+    """เจ้าของปิด Public (is_public=False) -> ดูได้เฉพาะเจ้าของเอง"""
+    return owner.profile.is_public or request.user == owner
+
+
+def portfolio_cards(owner):
+    """
+    ผลงานของ owner สำหรับแสดงเป็นการ์ด: JOIN หมวดหมู่มาใน query เดียว
+    และโหลดเฉพาะ column ที่การ์ดใช้ (คำอธิบายตัดมาแค่ช่วงต้นพอสำหรับ excerpt)
+    """
+    return (
+        PortfolioItem.objects.filter(owner=owner)
+        .select_related('category')
+        .only(*PORTFOLIO_CARD_FIELDS)
+        .annotate(excerpt=Substr('description', 1, PORTFOLIO_EXCERPT_LENGTH))
+    )
+
+
+def category_items_url(owner, category_id, page):
+    """URL สำหรับปุ่ม "ดูเพิ่มเติม" ของหมวดหมู่ (ผลงานที่ไม่มีหมวดหมู่ใช้ category=none)"""
+    query = urlencode({'category': category_id or 'none', 'page': page})
+    return f"{reverse('portfolio_category_items', args=[owner.username])}?{query}"
+
+
+@cache_public_page('portfolio')
+async def portfolio_view(request, username):
+    """หน้าแสดง Portfolio สาธารณะของ user นั้นๆ (async: query ทั้งหมดใช้ ORM แบบ async)"""
     
-    # 1. ค้นหา User จาก username (ถ้าไม่เจอให้เด้ง 404)
-    portfolio_owner = get_object_or_404(User, username=username)
+    # 1. ค้นหา User จาก username (ถ้าไม่เจอให้เด้ง 404) / ดึง Profile มาใน query เดียวกัน
+    portfolio_owner = await aget_object_or_404(User.objects.select_related('profile'), username=username)
+    await aload_user(request)
     
     # 2. ตรวจสอบสิทธิ์การเข้าชม (Privacy Check)
     # ถ้าเจ้าของปิด Public (is_public=False) และคนดูไม่ใช่เจ้าของเอง -> ห้ามดู
-    if not portfolio_owner.profile.is_public:
-        if request.user != portfolio_owner:
-            return render(request, '404_private.html', status=404) # สร้างหน้าแจ้งเตือนว่าส่วนตัว (เดี๋ยวทำเพิ่ม)
-            # หรือจะใช้บรรทัดล่างนี้เพื่อเด้งไปหน้าแรกเลยก็ได้
-            # return redirect('home')
+    if not can_view_portfolio(request, portfolio_owner):
+        return render(request, '404_private.html', status=404) # สร้างหน้าแจ้งเตือนว่าส่วนตัว (เดี๋ยวทำเพิ่ม)
+        # หรือจะใช้บรรทัดล่างนี้เพื่อเด้งไปหน้าแรกเลยก็ได้
+        # return redirect('home')
+
+    # 3. ดึงผลงานหน้าแรกของทุกหมวดหมู่ใน query เดียว
+    # - position: ลำดับของผลงานในหมวดหมู่ (ใหม่ -> เก่า) เอาไว้ตัดแค่หน้าแรกของแต่ละหมวด
+    # - category_total: จำนวนผลงานทั้งหมดในหมวด (ไว้แสดงจำนวน / ปุ่มดูเพิ่มเติม)
+    items = (
+        portfolio_cards(portfolio_owner)
+        .annotate(
+            position=Window(RowNumber(), partition_by=[F('category')], order_by=PORTFOLIO_ITEM_ORDER),
+            category_total=Window(Count('pk'), partition_by=[F('category')]),
+        )
+        .filter(position__lte=PORTFOLIO_ITEMS_PER_CATEGORY)
+        # เรียงตามชื่อหมวดหมู่ (ผลงานที่ไม่มีหมวดหมู่อยู่ท้ายสุด) แล้วตามลำดับในหมวด
+        .order_by(F('category__name').asc(nulls_last=True), 'category', 'position')
+    )
 
-    # 3. ดึงผลงานทั้งหมดของคนนี้
-    # แก้ไขตรงนี้: เรียงตาม 'หมวดหมู่' ก่อน แล้วค่อยเรียงตาม 'วันที่'
-    # เพื่อให้ template ใช้คำสั่ง regroup ได้ถูกต้อง
-    items = portfolio_owner.portfolio_items.all().order_by('category__name', '-event_date')
+    # 4. จัดกลุ่มตามหมวดหมู่ (ข้อมูลเรียงมาแล้ว วนรอบเดียวจบ)
+    items = [item async for item in items]
+    category_groups = []
+    for category_id, rows in groupby(items, key=attrgetter('category_id')):
+        rows = list(rows)
+        total = rows[0].category_total
+        category_groups.append({
+            'category': rows[0].category,
+            'items': rows,
+            'total': total,
+            'next_url': category_items_url(portfolio_owner, category_id, 2) if total > len(rows) else None,
+        })
 
     context = {
         'owner': portfolio_owner,
-        'items': items,
+        'category_groups': category_groups,
     }
     
     # สังเกตว่าเราจะเก็บไฟล์ไว้ในโฟลเดอร์ย่อย portfolios/
-    return render(request, 'portfolios/public_portfolio.html', context)
+    response = render(request, 'portfolios/public_portfolio.html', context)
+    if portfolio_owner.profile.is_public:
+        mark_cacheable(response)
+    return response
+
+
+@cache_public_page('category_items', query_params=('category', 'page'))
+def portfolio_category_items(request, username):
+    """ผลงานหน้าถัดไปของหมวดหมู่หนึ่ง (HTML การ์ดสำหรับปุ่ม "ดูเพิ่มเติม" ในหน้า Public Portfolio)"""
+    portfolio_owner = get_object_or_404(User.objects.select_related('profile'), username=username)
+    if not can_view_portfolio(request, portfolio_owner):
+        raise Http404
+
+    items = portfolio_cards(portfolio_owner).order_by(*PORTFOLIO_ITEM_ORDER)
+
+    category = request.GET.get('category', '')
+    if category == 'none':
+        items = items.filter(category__isnull=True)
+    elif category.isdigit():
+        items = items.filter(category_id=int(category))
+    else:
+        raise Http404
+
+    page = Paginator(items, PORTFOLIO_ITEMS_PER_CATEGORY).get_page(request.GET.get('page'))
+    next_url = None
+    if page.has_next():
+        next_url = category_items_url(portfolio_owner, category if category != 'none' else None, page.next_page_number())
+
+    response = render(request, 'portfolios/partials/portfolio_cards.html', {
+        'owner': portfolio_owner,
+        'items': page.object_list,
+        'next_url': next_url,
+    })
+    if portfolio_owner.profile.is_public:
+        mark_cacheable(response)
+    return response
+
+
+def search(request):
+    """ค้นหาผลงานจากทุก Portfolio ที่เปิด Public (Full-text Search + กรองหมวดหมู่ / ช่วงวันที่)"""
+    form = PortfolioSearchForm(request.GET or None)
+    page_obj = None
+
+    if form.is_valid() and form.cleaned_data['q']:
+        data = form.cleaned_data
+        items = public_items(
+            PortfolioItem.objects.select_related('owner', 'category')
+            .only(*PORTFOLIO_CARD_FIELDS, 'owner__username')
+            .annotate(excerpt=Substr('description', 1, PORTFOLIO_EXCERPT_LENGTH))
+        )
+        if data['category']:
+            items = items.filter(category=data['category'])
+        if data['date_from']:
+            items = items.filter(event_date__gte=data['date_from'])
+        if data['date_to']:
+            items = items.filter(event_date__lte=data['date_to'])
+
+        items = search_items(items, data['q'])
+        page_obj = Paginator(items, SEARCH_RESULTS_PER_PAGE).get_page(request.GET.get('page'))
+
+    return render(request, 'portfolios/search.html', {
+        'form': form,
+        'page_obj': page_obj,
+    })
 
 
 @login_required
@@ -127,14 +308,14 @@ def edit_portfolio(request, pk):
 
     # สำหรับหน้า Edit: extra=0 คือไม่ต้องเพิ่มช่องว่างถ้ารูปเต็มแล้ว, can_delete=True คือให้ลบรูปเก่าได้
     ImageFormSet = inlineformset_factory(
-        PortfolioItem, PortfolioImage, 
+        PortfolioItem, PortfolioImage, form=PortfolioImageForm,
         fields=('image',), 
         extra=1, max_num=4, can_delete=True
     )
 
     if request.method == 'POST':
-        form = PortfolioItemForm(request.POST, request.FILES, instance=portfolio_item)
-        formset = ImageFormSet(request.POST, request.FILES, instance=portfolio_item)
+        form = PortfolioItemForm(request.POST, request.FILES, instance=portfolio_item, user=request.user)
+        formset = ImageFormSet(request.POST, request.FILES, instance=portfolio_item, form_kwargs={'user': request.user})
         
         if form.is_valid() and formset.is_valid():
             form.save()
@@ -142,8 +323,8 @@ def edit_portfolio(request, pk):
             messages.success(request, 'แก้ไขผลงานเรียบร้อยแล้ว!')
             return redirect('dashboard')
     else:
-        form = PortfolioItemForm(instance=portfolio_item)
-        formset = ImageFormSet(instance=portfolio_item)
+        form = PortfolioItemForm(instance=portfolio_item, user=request.user)
+        formset = ImageFormSet(instance=portfolio_item, form_kwargs={'user': request.user})
 
     return render(request, 'portfolios/edit_portfolio.html', {
         'form': form, 
@@ -172,78 +353,252 @@ def delete_portfolio(request, pk):
     return render(request, 'portfolios/delete_confirm.html', {'item': portfolio_item})
 
 
-def portfolio_detail(request, username, pk):
-    """หน้าแสดงรายละเอียดผลงานแบบเต็ม"""
+@login_required
+def portfolio_image_status(request, pk):
+    """API เช็คว่ารูปของผลงานบีบอัดเสร็จหรือยัง (เฉพาะเจ้าของ)"""
+    portfolio_item = get_object_or_404(PortfolioItem, pk=pk, owner=request.user)
+    return JsonResponse(image_processing_status(portfolio_item))
+
+
+def tus_response(response):
+    response['Tus-Resumable'] = TUS_VERSION
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+@require_http_methods(['OPTIONS', 'POST'])
+def image_uploads(request):
+    """
+    เริ่มอัปโหลดรูปทีละ chunk (tus: creation) ได้ Location + token กลับไป
+    token ใช้แทนไฟล์ในฟอร์มเพิ่ม/แก้ไขผลงานได้เมื่ออัปโหลดครบแล้ว
+    """
+    if request.method == 'OPTIONS':
+        response = HttpResponse(status=204)
+        response['Tus-Version'] = TUS_VERSION
+        response['Tus-Extension'] = 'creation'
+        response['Tus-Max-Size'] = settings.CHUNKED_UPLOAD_MAX_SIZE
+        return tus_response(response)
+
+    try:
+        metadata = parse_metadata(request.headers.get('Upload-Metadata', ''))
+        upload = create_upload(request.user, request.headers.get('Upload-Length'), metadata)
+    except ValueError as e:
+        return tus_response(JsonResponse({'error': str(e)}, status=400))
+
+    location = reverse('image_upload', args=[upload.token])
+    response = JsonResponse({**upload_status(upload), 'location': location}, status=201)
+    response['Location'] = location
+    return tus_response(response)
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PATCH'])
+def image_upload(request, token):
+    """
+    HEAD / GET: ได้รับไปแล้วกี่ bytes (ส่งต่อจากตรงนั้นหลังเน็ตหลุด) + สถานะการบีบอัด
+    PATCH: ส่ง chunk ถัดไป (Upload-Offset ต้องตรงกับที่ได้รับไว้)
+    """
+    upload = get_object_or_404(ImageUpload, token=token, owner=request.user)
+
+    if request.method == 'PATCH':
+        if request.content_type != 'application/offset+octet-stream':
+            return tus_response(JsonResponse({'error': "Content-Type ต้องเป็น application/offset+octet-stream"}, status=415))
+        if upload.file_status != ImageStatus.UPLOADING or request.headers.get('Upload-Offset') != str(upload.upload_offset):
+            return tus_response(JsonResponse(upload_status(upload), status=409))
+        try:
+            append_chunk(upload, request)
+        except UploadConflict:
+            upload.refresh_from_db()
+            return tus_response(JsonResponse(upload_status(upload), status=409))
+
+        if upload.is_complete and not finish_upload(upload):
+            # 460 Checksum Mismatch (tus): ไฟล์ถูกล้างแล้ว ให้ส่งใหม่ตั้งแต่ต้น (Upload-Offset: 0)
+            response = JsonResponse({**upload_status(upload), 'error': "SHA-256 ไม่ตรงกับไฟล์ที่ได้รับ"},
+                                    status=460, reason='Checksum Mismatch')
+        else:
+            response = HttpResponse(status=204)
+    else:
+        response = JsonResponse(upload_status(upload))
+
+    response['Upload-Offset'] = upload.upload_offset
+    response['Upload-Length'] = upload.upload_length
+    return tus_response(response)
+
+
+@cache_public_page('detail')
+async def portfolio_detail(request, username, pk):
+    """หน้าแสดงรายละเอียดผลงานแบบเต็ม (async)"""
     # ค้นหาผลงานจาก ID (pk) และต้องตรงกับเจ้าของ (username) ด้วย
-    item = get_object_or_404(PortfolioItem, pk=pk, owner__username=username)
+    # ดึงเจ้าของ + Profile + หมวดหมู่มาใน query เดียวกัน (ใช้เช็ค is_public) และรูป Gallery ทั้งหมดในอีก query เดียว
+    # (template จะได้ไม่ต้อง query เพิ่มเอง เพราะ ORM แบบ sync ใช้ใน Event Loop ไม่ได้)
+    item = await aget_object_or_404(
+        PortfolioItem.objects.select_related('owner__profile', 'category').prefetch_related('images'),
+        pk=pk, owner__username=username,
+    )
+    await aload_user(request)
     
     # Check Privacy: ถ้าเจ้าของปิด Public และคนดูไม่ใช่เจ้าของ -> ห้ามดู
     if not item.owner.profile.is_public:
         if request.user != item.owner:
             return render(request, '404_private.html', status=404)
 
-    return render(request, 'portfolios/portfolio_detail.html', {'item': item})
+    response = render(request, 'portfolios/portfolio_detail.html', {'item': item})
+    if item.owner.profile.is_public:
+        mark_cacheable(response)
+    return response
+
+
+@staff_member_required
+def page_cache_stats_view(request):
+    """API สำหรับ Admin: ตัวนับ Hit / Miss ของ Full-page Cache หน้า Public Portfolio"""
+    return JsonResponse(page_cache_stats())
+
+
+@staff_member_required
+def performance_stats_view(request):
+    """API สำหรับ Admin: percentile ของเวลาตอบสนองแยกตามชื่อ URL (จาก PerformanceMiddleware)"""
+    return JsonResponse(performance_stats())
+
+
+
+def pdf_file_response(request, job):
+    """ส่งไฟล์ PDF จาก cache พร้อม ETag/Last-Modified (ถ้า browser มีไฟล์เดิมอยู่แล้วจะได้ 304)"""
+    etag = quote_etag(job.fingerprint) if job.fingerprint else None
+    last_modified = int(job.finished_at.timestamp()) if job.finished_at else None
 
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        filename = f"Portfolio_{job.owner.username}.pdf"
+        response = FileResponse(job.file.open('rb'), content_type='application/pdf', filename=filename)
+
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # ให้ browser ถามกลับทุกครั้ง (ได้ 304 ถ้าไม่มีอะไรเปลี่ยน) และห้าม proxy เก็บไฟล์ส่วนตัว
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
 def download_portfolio_pdf(request):
-    """สร้างไฟล์ PDF Portfolio พร้อม QR Code"""
-    user = request.user
-    
-    try:
-        profile = user.profile  
-    except:
-        profile = None
+    """
+    ดาวน์โหลดไฟล์ PDF Portfolio
+    - ถ้าข้อมูลไม่เปลี่ยนตั้งแต่ครั้งก่อน ส่งไฟล์เดิมจาก cache ทันที (หรือ 304)
+    - ถ้ามีการแก้ไข สั่งสร้างใหม่ใน Background Worker แล้วพาไปหน้ารอดาวน์โหลด
+    """
+    # Worker ไม่มี request: เก็บโดเมนไว้กับงาน ให้ PDF / QR Code / fingerprint ใช้ค่าเดียวกัน
+    base_url = site_base_url(request)
+    fingerprint = portfolio_fingerprint(request.user, base_url)
 
-    items = PortfolioItem.objects.filter(owner=user).order_by('-event_date')
+    cached = find_cached_export(request.user, fingerprint)
+    if cached is not None:
+        return pdf_file_response(request, cached)
 
-    # ==========================================
-    # ✅ 1. สร้าง QR Code
-    # ==========================================
-    
-    # สร้าง URL ของหน้า Public Portfolio แบบเต็ม (รวม http://domain.com)
-    public_url = request.build_absolute_uri(reverse('public_portfolio', args=[user.username]))
-    
-    # สร้างรูป QR Code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_M, # M = กู้คืนข้อมูลได้ 15% (เผื่อปริ้นท์ไม่ชัด)
-        box_size=10,
-        border=2,
-    )
-    qr.add_data(public_url)
-    qr.make(fit=True)
+    # ถ้ามีงานที่กำลังสร้างอยู่แล้ว จะใช้งานเดิม ไม่สร้างซ้ำ
+    job = enqueue_pdf_export(request.user, fingerprint, base_url)
 
-    img = qr.make_image(fill_color="black", back_color="white")
+    return render(request, 'portfolios/pdf_export.html', {'job': job})
 
-    # บันทึกลง Buffer (Memory) แทนการลงไฟล์
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    
-    # แปลงเป็น Base64 string เพื่อส่งไปแปะใน HTML ได้เลย
-    qr_image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
 
+@login_required
+def export_portfolio_archive(request):
+    """
+    ดาวน์โหลดผลงานทั้งหมด (manifest.jsonl + รูปต้นฉบับ) เป็นไฟล์ ZIP
+    สร้าง ZIP ไปพร้อมกับส่ง (stream) ไม่ต้องสร้างทั้งไฟล์ใน memory / import กลับด้วย manage.py import_portfolios ได้
+    ใต้ ASGI ส่งทีละ chunk ผ่าน stream_for_server (iterator แบบ sync จะถูกอ่านจนหมดก่อนส่ง)
+    """
+    response = StreamingHttpResponse(stream_portfolio_archive(request.user), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, f"Portfolio_{request.user.username}.zip")
+    patch_cache_control(response, private=True, no_store=True)
+    return stream_for_server(request, response)
 
-    # ==========================================
-    # 2. เตรียม Context และ Render
-    # ==========================================
-    context = {
-        'user': user,
-        'profile': profile,
-        'items': items,
-        'request': request,
-        'qr_code': qr_image_base64, # ✅ ส่ง QR Code ไปที่ Template
-    }
 
-    html_string = render_to_string('portfolios/pdf_template.html', context)
-    base_url = request.build_absolute_uri('/')
+@login_required
+def pdf_export_status(request, pk):
+    """API สำหรับเช็คสถานะงานสร้าง PDF (หน้ารอดาวน์โหลดจะเรียกทุกๆ 2 วินาที)"""
+    job = get_object_or_404(PdfExportJob, pk=pk, owner=request.user)
+
+    data = {'status': job.status}
+    if job.status == PdfExportJob.Status.DONE:
+        data['download_url'] = reverse('pdf_export_download', args=[job.pk])
+    elif job.status == PdfExportJob.Status.FAILED:
+        data['error'] = job.error
 
-    html = HTML(string=html_string, base_url=base_url)
-    pdf_file = html.write_pdf()
+    return JsonResponse(data)
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    filename = f"Portfolio_{user.username}.pdf"
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    
-    return response
\ No newline at end of file
+
+@login_required
+def pdf_export_download(request, pk):
+    """ส่งไฟล์ PDF ที่สร้างเสร็จแล้ว"""
+    job = get_object_or_404(
+        PdfExportJob.objects.select_related('owner'),
+        pk=pk, owner=request.user, status=PdfExportJob.Status.DONE,
+    )
+    return pdf_file_response(request, job)
+
+
+async def portfolio_qr_code(request, username):
+    """รูป QR Code (PNG) ลิงก์หน้า Public Portfolio ใช้ไฟล์ที่สร้างเก็บไว้ ให้ browser/CDN cache ได้นาน"""
+    owner = await aget_object_or_404(User.objects.select_related('profile'), username=username)
+
+    if not owner.profile.is_public and await aload_user(request) != owner:
+        return render(request, '404_private.html', status=404)
+
+    # สร้างรูปด้วย Pillow (ครั้งแรก / URL เปลี่ยน) ใน Thread Pool ที่จำกัดจำนวน ไม่บล็อก Event Loop
+    base_url = await sync_to_async(site_base_url)(request)
+    qr_code = await run_blocking(get_qr_code, owner, base_url)
+    etag = quote_etag(hashlib.sha256(qr_code.target_url.encode('utf-8')).hexdigest()[:32])
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(qr_code.png.open('rb'), content_type='image/png')
+
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=QR_CODE_MAX_AGE)
+    return response
+
+
+async def image_derivative(request, width, fmt, path):
+    """
+    ส่งรูปย่อตามขนาด/format ที่ขอ (ใช้ใน srcset)
+    ถ้ายังไม่เคยสร้าง จะสร้างให้ตอนนี้ครั้งเดียว แล้ว redirect ไปที่ไฟล์จริงใน MEDIA
+    """
+    if width not in DERIVATIVE_WIDTHS or fmt not in DERIVATIVE_FORMATS or not path.startswith(DERIVATIVE_SOURCES):
+        raise Http404
+
+    # สิทธิ์เดียวกับรูปต้นฉบับใน /media/ (รูปของคนที่ปิด Public ห้ามคนอื่นสั่งย่อ / ดูรูปย่อ)
+    access = await sync_to_async(media_access)(request, path)
+    if access is None:
+        raise Http404
+
+    # มีอยู่แล้ว (เกือบทุกครั้ง) -> query แบบ async ไม่ต้องรอคิว Thread Pool
+    derivative = await ImageDerivative.objects.filter(source=path, width=width, format=fmt).afirst()
+    if derivative is None:
+        # ยังไม่มี -> ย่อรูปด้วย Pillow ใน Thread Pool ที่จำกัดจำนวน (Event Loop รับ request อื่นต่อได้)
+        derivative = await run_blocking(get_derivative, path, width, fmt)
+    if derivative is None:
+        raise Http404
+
+    response = redirect(derivative.file.url)
+    if access == PUBLIC:
+        # รูปต้นฉบับแต่ละไฟล์ไม่เปลี่ยนเนื้อหา ให้ browser จำ redirect นี้ไว้ได้นาน
+        patch_cache_control(response, public=True, max_age=DERIVATIVE_MAX_AGE)
+    else:
+        # รูปของเจ้าของที่ปิด Public: ห้าม proxy / CDN เก็บ (เจ้าของเปิด Public ทีหลังก็ยังถามใหม่ได้)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def serve_media(request, path):
+    """
+    ไฟล์ที่ผู้ใช้อัปโหลด (/media/...) รองรับ 304 / Range และส่งต่อให้ nginx ได้ (MEDIA_SENDFILE)
+    ไฟล์ของเจ้าของที่ปิด Public ดูได้เฉพาะเจ้าของ / คนอื่นได้ 404 เหมือนไม่มีไฟล์
+    """
+    name = normalize_media_path(path)
+    access = media_access(request, name)
+    if access is None:
+        raise Http404
+    return media_file_response(request, name, access)
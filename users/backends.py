@@ -0,0 +1,34 @@
+from allauth.account.auth_backends import AuthenticationBackend
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class ProfileUserMixin:
+    """
+    โหลด User ที่ล็อกอินอยู่ (request.user) พร้อม Profile ใน query เดียว (JOIN)
+    หน้าที่ใช้ user.profile (Dashboard, แก้ไข Profile ฯลฯ) จะได้ไม่ต้องยิง query แยกอีกรอบ
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await UserModel._default_manager.select_related('profile').aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class ProfileModelBackend(ProfileUserMixin, ModelBackend):
+    """ModelBackend ของ Django (Login หน้า Admin)"""
+
+
+class ProfileAuthenticationBackend(ProfileUserMixin, AuthenticationBackend):
+    """Backend ของ allauth (Login ด้วยอีเมล)"""
@@ -2,10 +2,13 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 
+from portfolios.mixins import DirtyFieldsMixin
 
-class User(AbstractUser):
+
+class User(DirtyFieldsMixin, AbstractUser):
     """
     Custom User Model: ใช้อีเมลในการ Login แทน Username
+    (DirtyFieldsMixin: รู้ username เดิมตอนเปลี่ยนโดยไม่ต้อง SELECT ใหม่ ดู portfolios/signals.py)
     """
     email = models.EmailField(_('email address'), unique=True)
 
@@ -18,12 +21,12 @@ class User(AbstractUser):
     
 
 
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     """
     เก็บข้อมูลเพิ่มเติมของ User เช่น รูปภาพ, Bio, และการตั้งค่า
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
-    avatar = models.ImageField(upload_to='avatars/', default='avatars/default.png', blank=True)
+    avatar = models.ImageField(upload_to='avatars/', default='avatars/default.png', blank=True, db_index=True)
     bio = models.TextField(max_length=500, blank=True, help_text="เขียนแนะนำตัวสั้นๆ")
     
     # Settings
@@ -33,6 +36,8 @@ class Profile(models.Model):
     facebook_link = models.URLField(blank=True)
     github_link = models.URLField(blank=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return f'{self.user.username} Profile'
     
@@ -44,11 +49,9 @@ class Profile(models.Model):
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+# (ไม่ save Profile ตามทุกครั้งที่ save User: ตอน Login ก็มีการ save last_login
+#  ใครแก้ Profile ให้ save Profile เอง เช่น ProfileUpdateForm / ProfileInline ใน Admin)
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
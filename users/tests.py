@@ -1,3 +1,71 @@
+from allauth.account.models import EmailAddress
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from portfolios.models import PortfolioItem
+from portfolios.stats import rebuild_stats
+from .models import Profile, User
+
+
+class ProfileQueryTests(TestCase):
+    """
+    Profile ต้องไม่ถูก SELECT / UPDATE แยกเอง: Login ไม่แตะ Profile เลย
+    และทุกหน้าที่ใช้ user.profile ได้ Profile มาจาก JOIN ตอนโหลด User
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="frank", email="frank@example.com", password="pw-12345")
+        EmailAddress.objects.create(user=self.user, email=self.user.email, verified=True, primary=True)
+        self.item = PortfolioItem.objects.create(
+            owner=self.user, title="t", description="d", cover_image="portfolio_covers/x.jpg",
+        )
+        rebuild_stats(self.user.pk)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return ctx.captured_queries
+
+    def assert_no_separate_profile_query(self, queries):
+        table = Profile._meta.db_table
+        for query in queries:
+            sql = query['sql']
+            self.assertFalse(sql.startswith(('UPDATE', 'INSERT')) and f'"{table}"' in sql.split('SET')[0], sql)
+            self.assertNotIn(f'FROM "{table}"', sql)
+
+    def test_login_does_not_touch_profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('account_login'), {'login': self.user.email, 'password': 'pw-12345'}, secure=True,
+            )
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assert_no_separate_profile_query(ctx.captured_queries)
+
+    def test_saving_user_does_not_save_profile(self):
+        self.user.first_name = "Frank"
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.save()
+        self.assert_no_separate_profile_query(ctx.captured_queries)
+
+    def test_logged_in_views_load_profile_with_user(self):
+        self.client.force_login(self.user)
+        urls = {
+            # session, User + Profile, สถิติ, สถิติแยกหมวดหมู่, ผลงานหน้าแรก
+            reverse('dashboard'): 5,
+            # session, User + Profile
+            reverse('edit_profile'): 2,
+            # session, User + Profile (request.user), เจ้าของ + Profile, ผลงาน
+            reverse('public_portfolio', args=[self.user.username]): 4,
+            # session, User + Profile (request.user), ผลงาน + เจ้าของ + Profile, รูป Gallery
+            reverse('portfolio_detail', args=[self.user.username, self.item.pk]): 4,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                queries = self.get(url)
+                self.assert_no_separate_profile_query(queries)
+                self.assertEqual(len(queries), expected, "\n".join(q['sql'] for q in queries))